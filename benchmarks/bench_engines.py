@@ -0,0 +1,132 @@
+"""Execution engine benchmark: the tree-walker against the other engines.
+
+Runs the same resolved programs (recursive calls, arithmetic loops,
+closures, method calls and string building) on every engine of
+``lox.engines`` and reports the best time of each and its speedup over
+the tree-walker. Compiling is part of every run, as it is when running a
+script. With --infer-types, static type inference runs on every program
+before it does (see ``lox.inference``); only the tree-walking engines
+use what it proves.
+
+Usage:
+    PYTHONPATH=src python benchmarks/bench_engines.py [--scale N] [--repeat N]
+        [--engine NAME ...] [--infer-types]
+"""
+
+import argparse
+import contextlib
+import io
+import time
+
+from lox.engines import ENGINES
+from lox.inference import infer_types
+from lox.parser import Parser
+from lox.resolver import Resolver
+from lox.scanner import RegexScanner
+
+PROGRAMS = {
+    "fib": """
+fun fib(n) {{
+  if (n < 2) return n;
+  return fib(n - 1) + fib(n - 2);
+}}
+print fib({fib});
+""",
+    "loops": """
+fun run() {{
+  var total = 0;
+  for (var i = 0; i < {loops}; i = i + 1) {{
+    var j = 0;
+    while (j < 10) {{
+      if (j == 5) total = total - i; else total = total + j * 2;
+      j = j + 1;
+    }}
+  }}
+  return total;
+}}
+print run();
+""",
+    "closures": """
+fun counter() {{
+  var count = 0;
+  fun increment(by) {{
+    count = count + by;
+    return count;
+  }}
+  return increment;
+}}
+var increment = counter();
+for (var i = 0; i < {calls}; i = i + 1) increment(i);
+print increment(0);
+""",
+    "methods": """
+class Point {{
+  init(x, y) {{ this.x = x; this.y = y; }}
+  add(other) {{ return Point(this.x + other.x, this.y + other.y); }}
+}}
+class Origin < Point {{
+  init() {{ super.init(0, 0); }}
+}}
+var p = Origin();
+for (var i = 0; i < {calls}; i = i + 1) p = p.add(Point(1, 2));
+print p.x + p.y;
+""",
+    "strings": """
+var s = "";
+for (var i = 0; i < {calls}; i = i + 1) {{
+  if (s == "ab" or s == "") s = "a"; else s = s + "b";
+}}
+print s;
+""",
+}
+
+
+def run(engine: str, source: str, repeat: int, infer: bool = False) -> float:
+    statements = Parser(RegexScanner(source).scan_tokens()).parse()
+    interpreter = ENGINES[engine]()
+    Resolver(interpreter).resolve(statements)
+    if infer:
+        infer_types(statements)
+    best = float("inf")
+    for _ in range(repeat):
+        with contextlib.redirect_stdout(io.StringIO()):
+            start = time.perf_counter()
+            interpreter.interpret(statements)
+            best = min(best, time.perf_counter() - start)
+    return best
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--scale", type=int, default=1)
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument(
+        "--engine", action="append", choices=list(ENGINES), dest="engines"
+    )
+    parser.add_argument("--infer-types", action="store_true")
+    args = parser.parse_args()
+
+    engines = args.engines or list(ENGINES)
+    if "tree" not in engines:
+        engines.insert(0, "tree")
+    sizes = {
+        "fib": 18 + args.scale,
+        "loops": 1000 * args.scale,
+        "calls": 5000 * args.scale,
+    }
+    print(f"{'program':>10}" + "".join(f"{engine:>18}" for engine in engines))
+    for name, template in PROGRAMS.items():
+        source = template.format(**sizes)
+        times = {
+            engine: run(engine, source, args.repeat, args.infer_types)
+            for engine in engines
+        }
+        cells = []
+        for engine in engines:
+            speedup = times["tree"] / times[engine]
+            cells.append(f"{times[engine]:>9.3f}s {speedup:>5.2f}x")
+        print(f"{name:>10}" + "".join(f"{cell:>18}" for cell in cells))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,137 @@
+"""Variable access micro-benchmark: recursive calls and loop-heavy locals.
+
+Times a recursive ``fib`` (parameter reads, one frame per call), nested
+loops over block-local variables (reads and writes several scopes out),
+loops that do little but read locals or globals, and a counter bumped
+through a closure, so changes to how frames store and find variables show
+up directly. Each case also reports how many cells (captured variables)
+one run allocates, and how many of its calls reused a pooled frame.
+
+Usage:
+    PYTHONPATH=src python benchmarks/bench_environment.py [--fib N] [--loops N] [--reads N]
+        [--globals N] [--closure N]
+"""
+
+import argparse
+import time
+
+from lox.environment import Cell
+from lox.interpreter import Interpreter
+from lox.parser import Parser
+from lox.resolver import Resolver
+from lox.scanner import RegexScanner
+
+FIB = """
+fun fib(n) {{
+  if (n < 2) return n;
+  return fib(n - 1) + fib(n - 2);
+}}
+fib({n});
+"""
+
+LOOPS = """
+fun run() {{
+  var total = 0;
+  for (var i = 0; i < {n}; i = i + 1) {{
+    var a = i;
+    {{
+      var b = a * 2;
+      for (var j = 0; j < 10; j = j + 1) {{
+        total = total + b - j + a;
+      }}
+    }}
+  }}
+  return total;
+}}
+run();
+"""
+
+
+READS = """
+fun run() {{
+  var a = 1;
+  var b = 2;
+  var sum = 0;
+  for (var i = 0; i < {n}; i = i + 1) {{
+    sum = a + b + a + b + a + b + a + b + a + b + a + b + a + b + a + b;
+  }}
+  return sum;
+}}
+run();
+"""
+
+GLOBALS = """
+var a = 1;
+var b = 2;
+var sum = 0;
+for (var i = 0; i < {n}; i = i + 1) {{
+  sum = a + b + a + b + a + b + a + b + a + b + a + b + a + b + a + b;
+}}
+"""
+
+CLOSURE = """
+fun counter() {{
+  var count = 0;
+  fun increment() {{
+    count = count + 1;
+  }}
+  return increment;
+}}
+var increment = counter();
+for (var i = 0; i < {n}; i = i + 1) {{
+  increment();
+}}
+"""
+
+
+def run(name: str, source: str, repeat: int) -> None:
+    statements = Parser(RegexScanner(source).scan_tokens()).parse()
+    interpreter = Interpreter()
+    Resolver(interpreter).resolve(statements)
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        interpreter.interpret(statements)
+        best = min(best, time.perf_counter() - start)
+
+    allocations = 0
+    original_init = Cell.__init__
+
+    def counting_init(self, *args, **kwargs):
+        nonlocal allocations
+        allocations += 1
+        original_init(self, *args, **kwargs)
+
+    pool = interpreter.frames
+    hits, misses = pool.hits, pool.misses
+    Cell.__init__ = counting_init
+    try:
+        interpreter.interpret(statements)
+    finally:
+        Cell.__init__ = original_init
+    hits, misses = pool.hits - hits, pool.misses - misses
+    print(
+        f"{name:>14}: {best:.3f}s, {allocations} cells, "
+        f"{hits}/{hits + misses} frames from the pool"
+    )
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--fib", type=int, default=20)
+    parser.add_argument("--loops", type=int, default=2000)
+    parser.add_argument("--reads", type=int, default=5000)
+    parser.add_argument("--globals", type=int, default=5000)
+    parser.add_argument("--closure", type=int, default=5000)
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+
+    run(f"fib({args.fib})", FIB.format(n=args.fib), args.repeat)
+    run(f"loops({args.loops})", LOOPS.format(n=args.loops), args.repeat)
+    run(f"reads({args.reads})", READS.format(n=args.reads), args.repeat)
+    run(f"globals({args.globals})", GLOBALS.format(n=args.globals), args.repeat)
+    run(f"closure({args.closure})", CLOSURE.format(n=args.closure), args.repeat)
+
+
+if __name__ == "__main__":
+    main()
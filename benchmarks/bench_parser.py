@@ -0,0 +1,96 @@
+"""Parser throughput on expression-heavy generated sources.
+
+Reports parsed AST nodes per second for a few expression shapes, plus the
+deepest parenthesised expression the parser accepts before hitting
+Python's recursion limit.
+
+Usage:
+    PYTHONPATH=src python benchmarks/bench_parser.py [--statements N]
+"""
+
+import argparse
+import random
+import time
+from dataclasses import fields
+
+from lox.abc import Expr, Stmt
+from lox.parser import Parser
+from lox.scanner import RegexScanner
+
+OPERATORS = ["+", "-", "*", "/", "<", "<=", ">", ">=", "==", "!=", "and", "or"]
+
+
+def flat_expression(rng: random.Random, terms: int) -> str:
+    parts = [str(rng.randint(0, 99))]
+    for _ in range(terms - 1):
+        parts.append(rng.choice(OPERATORS))
+        parts.append(rng.choice(["a", "b.c", "f(1, x)", str(rng.random())[:4]]))
+    return " ".join(parts)
+
+
+def nested_expression(rng: random.Random, depth: int) -> str:
+    if depth == 0:
+        return rng.choice(["1", "x", "-y", "!z"])
+    op = rng.choice(OPERATORS)
+    return f"({nested_expression(rng, depth - 1)} {op} {nested_expression(rng, depth - 1)})"
+
+
+SHAPES = {
+    "literals": lambda rng: " + ".join(str(rng.randint(0, 9)) for _ in range(2)),
+    "flat": lambda rng: flat_expression(rng, 40),
+    "nested": lambda rng: nested_expression(rng, 6),
+}
+
+
+def make_source(shape: str, statements: int, seed: int = 0) -> str:
+    rng = random.Random(seed)
+    make = SHAPES[shape]
+    return "".join(f"print {make(rng)};\n" for _ in range(statements))
+
+
+def count_nodes(node) -> int:
+    if isinstance(node, list):
+        return sum(count_nodes(item) for item in node)
+    if not isinstance(node, (Expr, Stmt)):
+        return 0
+    return 1 + sum(count_nodes(getattr(node, f.name)) for f in fields(node))
+
+
+def parse(source: str):
+    return Parser(RegexScanner(source).scan_tokens()).parse()
+
+
+def max_nesting(limit: int = 100_000) -> int:
+    """Binary search the deepest ``((...(1)...))`` that parses."""
+    low, high = 1, limit
+    while low < high:
+        mid = (low + high + 1) // 2
+        try:
+            parse("print " + "(" * mid + "1" + ")" * mid + ";")
+            low = mid
+        except RecursionError:
+            high = mid - 1
+    return low
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--statements", type=int, default=1000)
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+
+    for shape in SHAPES:
+        source = make_source(shape, args.statements)
+        tokens = RegexScanner(source).scan_tokens()
+        best = float("inf")
+        for _ in range(args.repeat):
+            start = time.perf_counter()
+            statements = Parser(tokens).parse()
+            best = min(best, time.perf_counter() - start)
+        nodes = count_nodes(statements)
+        print(f"{shape:>9}: {nodes} nodes in {best:.3f}s ({nodes / best:,.0f} nodes/s)")
+    print(f"max nesting: {max_nesting()} parentheses")
+
+
+if __name__ == "__main__":
+    main()
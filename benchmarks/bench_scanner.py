@@ -0,0 +1,73 @@
+"""Throughput comparison between ``Scanner``, ``RegexScanner`` and ``StreamScanner``.
+
+Usage:
+    PYTHONPATH=src python benchmarks/bench_scanner.py [--size CHARS] [--repeat N]
+"""
+
+import argparse
+import io
+import time
+
+from lox.scanner import RegexScanner, Scanner, StreamScanner
+
+SNIPPET = """// Compute some values
+var total = 0;
+fun add_values(first, second) {
+  return first + second * 2.5 - 1;
+}
+class Point {
+  init(x, y) { this.x = x; this.y = y; }
+  norm() { return this.x * this.x + this.y * this.y; }
+}
+for (var i = 0; i < 10; i = i + 1) {
+  if (i >= 5 and i != 7) total = add_values(total, i);
+  print "iteration " + "done";
+}
+"""
+
+
+def make_source(size: int) -> str:
+    return SNIPPET * max(1, size // len(SNIPPET))
+
+
+def scan_stream(source: str) -> int:
+    return sum(1 for _ in StreamScanner(io.StringIO(source)))
+
+
+SCANNERS = {
+    "Scanner": lambda source: len(Scanner(source).scan_tokens()),
+    "RegexScanner": lambda source: len(RegexScanner(source).scan_tokens()),
+    "StreamScanner": scan_stream,
+}
+
+
+def measure(scan, source: str, repeat: int):
+    best = float("inf")
+    count = 0
+    for _ in range(repeat):
+        start = time.perf_counter()
+        count = scan(source)
+        best = min(best, time.perf_counter() - start)
+    return count, best
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--size", type=int, default=1_000_000)
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+
+    source = make_source(args.size)
+    print(f"source: {len(source)} characters")
+    baseline = None
+    for name, scan in SCANNERS.items():
+        count, elapsed = measure(scan, source, args.repeat)
+        baseline = baseline or elapsed
+        print(
+            f"{name:>14}: {count} tokens in {elapsed:.3f}s "
+            f"({count / elapsed:,.0f} tokens/s, {baseline / elapsed:.2f}x)"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,67 @@
+"""Bytes retained per token: the old ``@dataclass`` token vs the slotted ``Token``.
+
+Usage:
+    PYTHONPATH=src python benchmarks/bench_token_memory.py [--size CHARS]
+"""
+
+import argparse
+import gc
+import tracemalloc
+from dataclasses import dataclass
+
+from bench_scanner import make_source
+from lox.scanner import RegexScanner
+from lox.token import TokenType
+
+
+@dataclass
+class DataclassToken:
+    """Replica of the token layout before tokens were slotted."""
+
+    type: TokenType
+    lexeme: str
+    literal: object
+    line: int
+
+
+def legacy_tokens(source: str):
+    # Every lexeme is a fresh slice of the source, as the old scanner produced.
+    return [
+        DataclassToken(
+            t.type,
+            source[t.offset : t.offset + len(t.lexeme)],
+            t.literal,
+            t.line,
+        )
+        for t in RegexScanner(source).scan_tokens()
+    ]
+
+
+def compact_tokens(source: str):
+    return RegexScanner(source).scan_tokens()
+
+
+def retained(build, source: str):
+    gc.collect()
+    tracemalloc.start()
+    tokens = build(source)
+    gc.collect()
+    size, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return len(tokens), size
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--size", type=int, default=1_000_000)
+    args = parser.parse_args()
+
+    source = make_source(args.size)
+    print(f"source: {len(source)} characters")
+    for name, build in (("dataclass", legacy_tokens), ("slotted", compact_tokens)):
+        count, size = retained(build, source)
+        print(f"{name:>10}: {count} tokens, {size / count:.1f} bytes/token")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,84 @@
+"""Front-end throughput suite: scanner, parser and resolver measured separately.
+
+For each generated program shape (see ``generate.py``) this reports
+tokens/sec for ``Scanner`` and ``RegexScanner``, and nodes/sec for
+``Parser`` and ``Resolver``, as JSON that can be diffed between commits.
+
+Usage:
+    PYTHONPATH=src python benchmarks/frontend.py [--size N] [--output FILE]
+"""
+
+import argparse
+import json
+import platform
+import sys
+import time
+
+from bench_parser import count_nodes
+from generate import SHAPES, generate
+from lox import __version__
+from lox.interpreter import Interpreter
+from lox.parser import Parser
+from lox.resolver import Resolver
+from lox.scanner import RegexScanner, Scanner
+
+
+def best_of(repeat: int, run) -> float:
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        run()
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+def measure(source: str, repeat: int) -> dict:
+    tokens = RegexScanner(source).scan_tokens()
+    statements = Parser(tokens).parse()
+    nodes = count_nodes(statements)
+
+    phases = {
+        "scanner": (len(tokens), lambda: Scanner(source).scan_tokens()),
+        "regex_scanner": (len(tokens), lambda: RegexScanner(source).scan_tokens()),
+        "parser": (nodes, lambda: Parser(tokens).parse()),
+        "resolver": (nodes, lambda: Resolver(Interpreter()).resolve(statements)),
+    }
+    result = {"characters": len(source), "tokens": len(tokens), "nodes": nodes}
+    for phase, (items, run) in phases.items():
+        seconds = best_of(repeat, run)
+        unit = "tokens" if phase.endswith("scanner") else "nodes"
+        result[phase] = {"seconds": seconds, f"{unit}_per_sec": items / seconds}
+    return result
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--shapes", nargs="+", default=[*SHAPES, "mixed"])
+    parser.add_argument("--size", type=int, default=200)
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--output", help="Write JSON here instead of stdout")
+    args = parser.parse_args()
+
+    report = {
+        "plox": __version__,
+        "python": platform.python_version(),
+        "size": args.size,
+        "seed": args.seed,
+        "shapes": {
+            shape: measure(generate(shape, args.size, args.seed), args.repeat)
+            for shape in args.shapes
+        },
+    }
+
+    if args.output:
+        with open(args.output, "w") as file:
+            json.dump(report, file, indent=2)
+            file.write("\n")
+    else:
+        json.dump(report, sys.stdout, indent=2)
+        sys.stdout.write("\n")
+
+
+if __name__ == "__main__":
+    main()
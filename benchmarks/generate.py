@@ -0,0 +1,165 @@
+"""Synthetic Lox program generator for front-end benchmarks.
+
+Every shape produces a valid, terminating program whose size grows
+linearly with ``size`` (the number of top-level units), so throughput
+numbers stay comparable between sizes and between commits.
+
+Usage:
+    PYTHONPATH=src python benchmarks/generate.py --shape functions --size 100
+"""
+
+import argparse
+import random
+from typing import Callable, Dict, List
+
+ARITHMETIC = ["+", "-", "*"]
+COMPARISON = ["<", "<=", ">", ">=", "==", "!="]
+LOGICAL = ["and", "or"]
+
+
+class Generator:
+    def __init__(self, seed: int = 0) -> None:
+        self.rng = random.Random(seed)
+        self.counter = 0
+
+    def name(self, prefix: str) -> str:
+        self.counter += 1
+        return f"{prefix}{self.counter}"
+
+    def expression(self, names: List[str], terms: int) -> str:
+        """An arithmetic expression over ``terms`` numeric operands."""
+        parts = [self.operand(names)]
+        for _ in range(terms - 1):
+            parts.append(self.rng.choice(ARITHMETIC))
+            parts.append(self.operand(names))
+        return " ".join(parts)
+
+    def condition(self, names: List[str]) -> str:
+        """Comparisons of numeric operands joined by and/or."""
+        parts = []
+        for i in range(4):
+            if i:
+                parts.append(self.rng.choice(LOGICAL))
+            parts.append(
+                f"{self.operand(names)} {self.rng.choice(COMPARISON)} "
+                f"{self.operand(names)}"
+            )
+        return " ".join(parts)
+
+    def operand(self, names: List[str]) -> str:
+        choice = self.rng.random()
+        if choice < 0.4 and names:
+            return self.rng.choice(names)
+        if choice < 0.6:
+            return f"({self.rng.randint(0, 99)} - {self.rng.choice(names or ['1'])})"
+        if choice < 0.7:
+            return f"-{self.rng.randint(1, 9)}"
+        return str(round(self.rng.uniform(0, 100), self.rng.randint(0, 2)))
+
+    def nesting(self, depth: int) -> str:
+        """A function whose body nests blocks, ifs and loops ``depth`` deep."""
+        fun = self.name("nested")
+        lines = [f"fun {fun}(a) {{", "  var acc = a;"]
+        for level in range(depth):
+            indent = "  " * (level + 1)
+            kind = level % 3
+            if kind == 0:
+                lines.append(f"{indent}if (acc > {level}) {{")
+            elif kind == 1:
+                lines.append(
+                    f"{indent}for (var i{level} = 0; i{level} < 2; i{level} = i{level} + 1) {{"
+                )
+            else:
+                lines.append(f"{indent}{{ var v{level} = acc * 2;")
+            lines.append(f"{indent}  acc = acc + {level};")
+        for level in reversed(range(depth)):
+            lines.append("  " * (level + 1) + "}")
+        lines.append("  return acc;")
+        lines.append("}")
+        lines.append(f"print {fun}(1);")
+        return "\n".join(lines)
+
+    def expressions(self, terms: int) -> str:
+        """Variables defined by long arithmetic and logical expressions."""
+        names = ["x", "y"]
+        lines = ["{", "  var x = 1;", "  var y = 2;"]
+        for _ in range(4):
+            var = self.name("e")
+            lines.append(f"  var {var} = {self.expression(names, terms)};")
+            names.append(var)
+        lines.append(f"  print {names[-1]};")
+        lines.append(f"  print {self.condition(names)};")
+        lines.append("}")
+        return "\n".join(lines)
+
+    def functions(self) -> str:
+        """A class with methods, a subclass and free functions calling them."""
+        base = self.name("Base")
+        derived = self.name("Derived")
+        helper = self.name("helper")
+        return "\n".join(
+            [
+                f"class {base} {{",
+                "  init(x) { this.x = x; }",
+                "  value() { return this.x; }",
+                "  scaled(k) { return this.value() * k; }",
+                "}",
+                f"class {derived} < {base} {{",
+                "  init(x) { super.init(x + 1); this.extra = 2; }",
+                "  value() { return super.value() + this.extra; }",
+                "}",
+                f"fun {helper}(a, b) {{",
+                "  fun inner(c) { return a + b + c; }",
+                "  return inner(a * b);",
+                "}",
+                f"print {derived}({self.rng.randint(0, 9)}).scaled(2) + {helper}(1, 2);",
+            ]
+        )
+
+    def strings(self) -> str:
+        """String literals, concatenation and comments."""
+        var = self.name("s")
+        words = [self.word() for _ in range(6)]
+        return "\n".join(
+            [
+                f"// {' '.join(words)}",
+                f'var {var} = "{words[0]} {words[1]}";',
+                f'{var} = {var} + " " + "{words[2]}" + "{words[3]}";',
+                f'if ({var} != "{words[4]}") print {var} + "{words[5]}";',
+            ]
+        )
+
+    def word(self) -> str:
+        letters = "abcdefghijklmnopqrstuvwxyz"
+        return "".join(self.rng.choice(letters) for _ in range(self.rng.randint(3, 10)))
+
+
+SHAPES: Dict[str, Callable[[Generator], str]] = {
+    "nesting": lambda gen: gen.nesting(depth=24),
+    "expressions": lambda gen: gen.expressions(terms=30),
+    "functions": lambda gen: gen.functions(),
+    "strings": lambda gen: gen.strings(),
+}
+
+
+def generate(shape: str, size: int, seed: int = 0) -> str:
+    """Generate ``size`` top-level units of ``shape`` ("mixed" rotates shapes)."""
+    gen = Generator(seed)
+    units = []
+    shapes = list(SHAPES) if shape == "mixed" else [shape]
+    for i in range(size):
+        units.append(SHAPES[shapes[i % len(shapes)]](gen))
+    return "\n".join(units) + "\n"
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--shape", choices=[*SHAPES, "mixed"], default="mixed")
+    parser.add_argument("--size", type=int, default=100)
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+    print(generate(args.shape, args.size, args.seed), end="")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,17 +1,28 @@
 import argparse
 import logging
+import os
 import sys
-from typing import List
+import time
+from typing import Iterable, List, Type
 
 from prompt_toolkit import prompt
 from prompt_toolkit.history import InMemoryHistory
 
 from lox import error
+from lox.abc import Stmt
+from lox.bytecode import disassemble_program
+from lox.cache import ProgramCache
+from lox.engines import ENGINES
+from lox.feedback import Profile, source_digest
+from lox.inference import infer_types
 from lox.interpreter import Interpreter
+from lox.memory import measure_ast
 from lox.parser import Parser
 from lox.resolver import Resolver
-from lox.scanner import Scanner
+from lox.scanner import RegexScanner, StreamScanner
 from lox.token import Token
+from lox.transpiler import transpile_program
+from lox.watch import IncrementalCompiler
 from utils import is_complete_source, validate_args
 
 logger = logging.getLogger(__name__)
@@ -24,37 +35,253 @@ def main(args: argparse.Namespace):
     - No positional arguments -> start REPL (run_prompt)
     - One positional argument (FILE) -> execute file (run_file)
     - --verbose enables DEBUG-level logs
+    - --lazy defers parsing/resolving function bodies to their first call;
+      --strict still parses them up front so syntax errors surface early
+    - --no-cache skips the __ploxcache__ of parsed and resolved scripts
+    - --mem-report parses FILE and prints the memory held by its AST
+    - --watch re-runs FILE whenever it changes, recompiling only the
+      top-level declarations that were edited
+    - --engine picks how programs run: "tree" walks the AST, "closures"
+      compiles it to Python closures first, "vm" to bytecode for a stack VM,
+      "python" to Python code run by CPython
+    - --disassemble prints the bytecode the "vm" engine would run for FILE
+    - --profile-out saves the type feedback of running FILE to a profile,
+      which --profile-in loads into a later run before it starts
+    - --infer-types proves which operators of FILE only ever see numbers
+      or strings, so the tree-walker runs them without type checks
+
+    ``plox.py compile FILE [-o OUT]`` instead writes FILE transpiled to a
+    Python script (see compile_file).
     """
     logger.debug(f"Parsed args: {args}")
     validate_args(args)
 
     # Only positional FILE is supported
     path = getattr(args, "file", None)
+    engine = ENGINES[args.engine]
 
-    if path:
+    if path and args.mem_report:
+        report_memory(path, lazy=args.lazy, strict=args.strict)
+    elif path and args.disassemble:
+        disassemble_file(path)
+    elif path and args.watch:
+        watch_file(path, engine=engine)
+    elif path:
         logger.debug(f"Running file: {path}")
-        run_file(path)
+        run_file(
+            path,
+            lazy=args.lazy,
+            strict=args.strict,
+            use_cache=args.cache,
+            engine=engine,
+            profile_in=args.profile_in,
+            profile_out=args.profile_out,
+            infer=args.infer_types,
+        )
     else:
         logger.debug("Starting REPL (run_prompt)")
-        run_prompt()
+        run_prompt(lazy=args.lazy, strict=args.strict, engine=engine)
 
 
-def run_file(path):
+def run_file(
+    path,
+    lazy: bool = False,
+    strict: bool = False,
+    use_cache: bool = False,
+    engine: Type[Interpreter] = Interpreter,
+    profile_in: str | None = None,
+    profile_out: str | None = None,
+    infer: bool = False,
+):
     """
     Execute a Lox script from a file.
+
+    With ``use_cache``, the parsed and resolved program is looked up in (and
+    stored to) the script's ``__ploxcache__`` directory, keyed by a hash of
+    its source.
+
+    ``profile_in`` is a type feedback profile to start from, and
+    ``profile_out`` where to save the profile of this run (see
+    lox.feedback). With ``infer``, static type inference runs first and
+    reports the operator sites it proved monomorphic to stderr.
     """
-    logger.debug(f"Reading file from path: {path}")
-    with open(path, "r") as file:
-        source = file.read()
-    logger.debug(f"Read {len(source)} characters from file")
-    run(source)
+    if use_cache:
+        run_cached(
+            path,
+            lazy=lazy,
+            strict=strict,
+            engine=engine,
+            profile_in=profile_in,
+            profile_out=profile_out,
+            infer=infer,
+        )
+    else:
+        logger.debug(f"Streaming tokens from path: {path}")
+        interpreter = engine()
+        with open(path, "r") as file:
+            statements = compile_tokens(StreamScanner(file), interpreter, lazy, strict)
+            if statements is not None:
+                run_profiled(
+                    path, statements, interpreter, profile_in, profile_out, infer
+                )
     if error.has_error:
         sys.exit(65)
     if error.has_runtime_error:
         sys.exit(70)
 
 
-def run_prompt():
+def run_cached(
+    path,
+    lazy: bool = False,
+    strict: bool = False,
+    engine: Type[Interpreter] = Interpreter,
+    profile_in: str | None = None,
+    profile_out: str | None = None,
+    infer: bool = False,
+):
+    cache = ProgramCache.for_script(path)
+    interpreter = engine()
+    with open(path, "r") as file:
+        key = cache.key(file, lazy, strict)
+        statements = cache.load(key)
+        if statements is None:
+            # A miss streams the script into the compiler, as without the
+            # cache; only the hash of the source was read ahead.
+            file.seek(0)
+            statements = compile_tokens(StreamScanner(file), interpreter, lazy, strict)
+            if statements is None:
+                return
+            cache.store(key, statements)
+
+    run_profiled(path, statements, interpreter, profile_in, profile_out, infer)
+
+
+def run_profiled(
+    path,
+    statements: List[Stmt],
+    interpreter: Interpreter,
+    profile_in: str | None = None,
+    profile_out: str | None = None,
+    infer: bool = False,
+):
+    """
+    Run the compiled script at ``path``, starting from the type feedback
+    profile at ``profile_in`` and saving the profile of the run to
+    ``profile_out``. Profiles are matched to the script by a hash of its
+    source, read a chunk at a time.
+
+    With ``infer``, operators proven monomorphic by static type inference
+    are bound to their check-free functions, over any profile.
+    """
+    digest = None
+    if profile_in is not None or profile_out is not None:
+        with open(path, "r") as file:
+            digest = source_digest(file)
+    if profile_in is not None:
+        Profile.load(profile_in, digest).apply(statements, interpreter)
+    if infer:
+        print(infer_types(statements), file=sys.stderr)
+    interpreter.interpret(statements)
+    log_counters(interpreter)
+    if profile_out is not None:
+        Profile.record(digest, statements).save(profile_out)
+
+
+def watch_file(path, interval: float = 0.5, engine: Type[Interpreter] = Interpreter):
+    """
+    Run a Lox script every time it changes on disk, until interrupted.
+
+    Unchanged top-level declarations are not rescanned, reparsed or
+    re-resolved; the program always runs in fresh globals. Per-phase
+    timings of each reload are printed to stderr.
+    """
+    compiler = IncrementalCompiler()
+    last_modified = None
+    try:
+        while True:
+            try:
+                modified = os.stat(path).st_mtime_ns
+            except OSError:
+                # Editors may briefly remove the file while saving it.
+                modified = last_modified
+            if modified != last_modified and reload_file(path, compiler, engine):
+                last_modified = modified
+            time.sleep(interval)
+    except KeyboardInterrupt:
+        pass
+
+
+def reload_file(
+    path, compiler: IncrementalCompiler, engine: Type[Interpreter] = Interpreter
+) -> bool:
+    """
+    Recompile and run the script; False if it could not be read, so the
+    next tick tries again.
+    """
+    try:
+        with open(path, "r") as file:
+            source = file.read()
+    except OSError:
+        # Removed between the stat and the open, as editors may do.
+        return False
+
+    error.has_error = error.has_runtime_error = False
+    statements = compiler.compile(source)
+    if statements is not None:
+        interpreter = engine()
+        start = time.perf_counter()
+        try:
+            interpreter.interpret(statements)
+        except Exception as e:
+            # A bad edit must not end the watch session.
+            logger.error(f"An error occurred: {e!r}")
+        compiler.report.seconds["execute"] = time.perf_counter() - start
+    print(compiler.report, file=sys.stderr)
+    return True
+
+
+def report_memory(path, lazy: bool = False, strict: bool = False):
+    """
+    Parse a Lox script from a file and print the memory held by its AST.
+    """
+    with open(path, "r") as file:
+        statements = Parser(StreamScanner(file), lazy=lazy, strict=strict).parse()
+    print(f"AST memory for {path}:")
+    print(measure_ast(statements))
+
+
+def disassemble_file(path):
+    """
+    Parse and resolve a Lox script from a file and print its bytecode.
+    """
+    with open(path, "r") as file:
+        statements = compile_tokens(StreamScanner(file), Interpreter())
+    if statements is None:
+        sys.exit(65)
+    print(disassemble_program(statements))
+
+
+def compile_file(path, output=None):
+    """
+    Parse and resolve a Lox script from a file and write it as a Python
+    script, to OUTPUT or next to FILE with a .py suffix.
+
+    The script imports lox.runtime, so lox must be importable to run it.
+    """
+    with open(path, "r") as file:
+        statements = compile_tokens(StreamScanner(file), Interpreter())
+    if statements is None:
+        sys.exit(65)
+    if output is None:
+        output = os.path.splitext(path)[0] + ".py"
+    with open(output, "w") as file:
+        file.write(transpile_program(statements, path))
+    logger.debug(f"Wrote {output}")
+
+
+def run_prompt(
+    lazy: bool = False, strict: bool = False, engine: Type[Interpreter] = Interpreter
+):
     """
     Start a REPL (Read-Eval-Print Loop) for Lox.
     """
@@ -63,7 +290,10 @@ def run_prompt():
     print("Welcome to plox! Press Ctrl+D or type 'exit' to leave.")
     print("======================================================")
 
-    interpreter = Interpreter()
+    interpreter = engine()
+    # One resolver for the session: each input is resolved on its own, and
+    # earlier definitions keep their resolved nodes.
+    resolver = Resolver(interpreter)
 
     # Accumulate lines until the input is a complete statement/block
     buffer: str = ""
@@ -85,7 +315,13 @@ def run_prompt():
 
             if is_complete_source(buffer):
                 logger.debug(f"Executing REPL buffer with {len(buffer)} characters")
-                run(buffer, interpreter=interpreter)
+                run(
+                    buffer,
+                    interpreter=interpreter,
+                    lazy=lazy,
+                    strict=strict,
+                    resolver=resolver,
+                )
                 # Reset compile-time error flag for the next REPL input
                 error.has_error = False
                 buffer = ""
@@ -99,29 +335,88 @@ def run_prompt():
             logger.error(f"An error occurred: {e}")
 
 
-def run(source: str, interpreter: Interpreter | None = None):
-    scanner = Scanner(source)
-    tokens: List[Token] = scanner.scan_tokens()
-    logger.debug(f"Scanned {len(tokens)} tokens")
-    parser = Parser(tokens)
+def run(
+    source: str,
+    interpreter: Interpreter | None = None,
+    lazy: bool = False,
+    strict: bool = False,
+    resolver: Resolver | None = None,
+):
+    run_tokens(RegexScanner(source).iter_tokens(), interpreter, lazy, strict, resolver)
+
+
+def run_tokens(
+    tokens: Iterable[Token],
+    interpreter: Interpreter | None = None,
+    lazy: bool = False,
+    strict: bool = False,
+    resolver: Resolver | None = None,
+):
+    _interpreter = interpreter or Interpreter()
+    statements = compile_tokens(tokens, _interpreter, lazy, strict, resolver)
+    if statements is not None:
+        _interpreter.interpret(statements)
+        log_counters(_interpreter)
+
+
+def log_counters(interpreter: Interpreter):
+    """Log the frame pool's and the operator quickening's counters."""
+    pool = interpreter.frames
+    quickening = interpreter.quickening
+    logger.debug(f"Frame pool: {pool.hits} hits, {pool.misses} misses")
+    logger.debug(
+        f"Quickening: {quickening.specializations} specializations, "
+        f"{quickening.deopts} deopts"
+    )
+
+
+def compile_tokens(
+    tokens: Iterable[Token],
+    interpreter: Interpreter,
+    lazy: bool = False,
+    strict: bool = False,
+    resolver: Resolver | None = None,
+) -> List[Stmt] | None:
+    """
+    Parse and resolve a token stream; None if a compile error was reported.
+
+    ``resolver`` lets a REPL session reuse one resolver for every input.
+    """
+    parser = Parser(tokens, lazy=lazy, strict=strict)
     statements = parser.parse()
+    logger.debug(f"Parsed {parser.current} tokens")
     logger.debug(
         "Parser returned %s statements" % (len(statements) if statements else 0)
     )
     if error.has_error:
-        return
+        return None
 
-    _interpreter = interpreter or Interpreter()
-    _interpreter.locals.clear()
-    resolver = Resolver(_interpreter)
+    if resolver is None:
+        resolver = Resolver(interpreter)
     resolver.resolve(statements)
     if error.has_error:
-        return
+        return None
+    return statements
+
 
-    _interpreter.interpret(statements)
+def compile_main(argv: List[str]):
+    """Entrypoint for ``plox.py compile``."""
+    parser = argparse.ArgumentParser(prog="plox.py compile")
+    parser.add_argument("file", help="Path to the Lox script to transpile")
+    parser.add_argument(
+        "-o",
+        "--output",
+        default=None,
+        help="Path of the Python script to write (default: FILE with .py)",
+    )
+    args = parser.parse_args(argv)
+    logging.basicConfig(level=logging.WARNING, format="%(levelname)s: %(message)s")
+    compile_file(args.file, args.output)
 
 
-if __name__ == "__main__":
+if __name__ == "__main__" and sys.argv[1:2] == ["compile"]:
+    compile_main(sys.argv[2:])
+elif __name__ == "__main__":
     parser = argparse.ArgumentParser()
     # Optional positional FILE argument; if provided, we run the file.
     parser.add_argument(
@@ -134,6 +429,75 @@ if __name__ == "__main__":
         "--verbose", action="store_true", default=False, help="Enable verbose logging"
     )
 
+    parser.add_argument(
+        "--lazy",
+        action="store_true",
+        default=False,
+        help="Parse and resolve function bodies on their first call",
+    )
+    parser.add_argument(
+        "--strict",
+        action="store_true",
+        default=False,
+        help="With --lazy, still parse function bodies up front",
+    )
+
+    parser.add_argument(
+        "--no-cache",
+        dest="cache",
+        action="store_false",
+        default=True,
+        help="Do not read or write the __ploxcache__ of compiled scripts",
+    )
+    parser.add_argument(
+        "--mem-report",
+        action="store_true",
+        default=False,
+        help="Parse FILE and print the memory held by its AST instead of running it",
+    )
+
+    parser.add_argument(
+        "--engine",
+        choices=list(ENGINES),
+        default="tree",
+        help="How to run programs: walk the AST, or compile it to closures, "
+        "bytecode or Python code first",
+    )
+    parser.add_argument(
+        "--disassemble",
+        action="store_true",
+        default=False,
+        help="Print the bytecode of FILE for --engine=vm instead of running it",
+    )
+
+    parser.add_argument(
+        "--profile-in",
+        default=None,
+        metavar="PROFILE",
+        help="Start running FILE from the type feedback saved by --profile-out",
+    )
+    parser.add_argument(
+        "--profile-out",
+        default=None,
+        metavar="PROFILE",
+        help="Save the type feedback of running FILE to PROFILE",
+    )
+
+    parser.add_argument(
+        "--infer-types",
+        action="store_true",
+        default=False,
+        help="Prove which operators of FILE only see numbers or strings and "
+        "run them without type checks",
+    )
+
+    parser.add_argument(
+        "--watch",
+        action="store_true",
+        default=False,
+        help="Re-run FILE on every change, recompiling only edited declarations",
+    )
+
     args = parser.parse_args()
 
     logging.basicConfig(
@@ -1,6 +1,6 @@
 from __future__ import annotations
 
-from dataclasses import dataclass
+from dataclasses import dataclass, fields
 from typing import TYPE_CHECKING, List
 
 if TYPE_CHECKING:
@@ -11,17 +11,42 @@ class Visitor:
     pass
 
 
+def reduce_node(node):
+    """Pickle a node as a constructor call plus any non-init slots.
+
+    Unpickling this is much faster than restoring every slot through the
+    default protocol for slotted objects. Fields marked ``transient`` hold
+    per-run caches and are left at their defaults.
+    """
+    args = []
+    state = {}
+    for field in fields(node):
+        if field.init:
+            args.append(getattr(node, field.name))
+        elif not field.metadata.get("transient"):
+            state[field.name] = getattr(node, field.name)
+    return (type(node), tuple(args), (None, state) if state else None)
+
+
 @dataclass(eq=False)
 class Expr:
+    __slots__ = ()
+
     def accept(self, visitor: Visitor):
         raise NotImplementedError()
 
+    __reduce__ = reduce_node
 
-@dataclass
+
+@dataclass(eq=False)
 class Stmt:
+    __slots__ = ()
+
     def accept(self, visitor: Visitor):
         raise NotImplementedError()
 
+    __reduce__ = reduce_node
+
 
 class LoxCallable:
     def __init__(self, callee: Expr) -> None:
@@ -1,13 +1,46 @@
 from typing import List, Union
 
-from lox.abc import Expr
-from lox.expr import Binary, Grouping, Literal, Unary
-from lox.visitor import ExprVisitor
+from lox.abc import Expr, Stmt
+from lox.expr import (
+    Assign,
+    Binary,
+    Call,
+    Get,
+    Grouping,
+    Literal,
+    Logical,
+    Set,
+    Super,
+    This,
+    Unary,
+    Variable,
+)
+from lox.stmt import (
+    Block,
+    Break,
+    Class,
+    Continue,
+    Expression,
+    For,
+    Function,
+    If,
+    Print,
+    Return,
+    Var,
+    While,
+)
+from lox.visitor import ExprVisitor, StmtVisitor
 
 
-class AstPrinter(ExprVisitor):
-    def print(self, expr: Expr):
-        return expr.accept(self)
+class AstPrinter(ExprVisitor, StmtVisitor):
+    """Prints expressions and statements as parenthesized prefix forms.
+
+    Absent optional parts (a missing ``else``, an empty ``for`` clause) are
+    printed as ``()``; a missing initializer or return value is left out.
+    """
+
+    def print(self, node: Union[Expr, Stmt]):
+        return node.accept(self)
 
     def visit_binary(self, expr: Binary) -> str:
         return self.parenthesize(expr.op.lexeme, [expr.left, expr.right])
@@ -23,12 +56,89 @@ class AstPrinter(ExprVisitor):
     def visit_unary(self, expr: Unary) -> str:
         return self.parenthesize(expr.op.lexeme, expr.right)
 
-    def parenthesize(self, name: str, exprs: Union[Expr, List[Expr]]) -> str:
+    def visit_logical(self, expr: Logical) -> str:
+        return self.parenthesize(expr.op.lexeme, [expr.left, expr.right])
+
+    def visit_assign(self, expr: Assign) -> str:
+        return self.parenthesize(f"= {expr.name.lexeme}", expr.value)
+
+    def visit_call(self, expr: Call) -> str:
+        return self.parenthesize("call", [expr.callee, *expr.arguments])
+
+    def visit_get(self, expr: Get) -> str:
+        return self.parenthesize(f". {expr.name.lexeme}", expr.object)
+
+    def visit_set(self, expr: Set) -> str:
+        return self.parenthesize(f"set {expr.name.lexeme}", [expr.object, expr.value])
+
+    def visit_super(self, expr: Super) -> str:
+        return f"(super {expr.method.lexeme})"
+
+    def visit_this(self, expr: This) -> str:
+        return "this"
+
+    def visit_variable(self, expr: Variable) -> str:
+        return expr.name.lexeme
+
+    def visit_print(self, stmt: Print) -> str:
+        return self.parenthesize("print", stmt.expression)
+
+    def visit_expression(self, stmt: Expression) -> str:
+        return self.parenthesize(";", stmt.expression)
+
+    def visit_var(self, stmt: Var) -> str:
+        if stmt.initializer is None:
+            return f"(var {stmt.name.lexeme})"
+        return self.parenthesize(f"var {stmt.name.lexeme}", stmt.initializer)
+
+    def visit_block(self, stmt: Block) -> str:
+        return self.parenthesize("block", stmt.statements)
+
+    def visit_if(self, stmt: If) -> str:
+        return self.parenthesize(
+            "if", [stmt.condition, stmt.then_branch, stmt.else_branch]
+        )
+
+    def visit_while(self, stmt: While) -> str:
+        return self.parenthesize("while", [stmt.condition, stmt.body])
+
+    def visit_for(self, stmt: For) -> str:
+        return self.parenthesize(
+            "for", [stmt.initializer, stmt.condition, stmt.increment, stmt.body]
+        )
+
+    def visit_break(self, stmt: Break) -> str:
+        return "(break)"
+
+    def visit_continue(self, stmt: Continue) -> str:
+        return "(continue)"
+
+    def visit_function(self, stmt: Function) -> str:
+        params = " ".join(param.lexeme for param in stmt.params)
+        if stmt.body is None:
+            # Body of a lazily parsed function that has not been called yet.
+            return f"(fun {stmt.name.lexeme} ({params}) ...)"
+        return self.parenthesize(f"fun {stmt.name.lexeme} ({params})", stmt.body)
+
+    def visit_return(self, stmt: Return) -> str:
+        if stmt.value is None:
+            return "(return)"
+        return self.parenthesize("return", stmt.value)
+
+    def visit_class(self, stmt: Class) -> str:
+        name = f"class {stmt.name.lexeme}"
+        if stmt.super_cls is not None:
+            name += f" < {stmt.super_cls.name.lexeme}"
+        return self.parenthesize(name, stmt.methods)
+
+    def parenthesize(
+        self, name: str, exprs: Union[Expr, Stmt, None, List[Union[Expr, Stmt]]]
+    ) -> str:
         if not isinstance(exprs, list):
             exprs = [exprs]
         result = f"({name}"
         for expr in exprs:
             result += " "
-            result += expr.accept(self)
+            result += "()" if expr is None else expr.accept(self)
         result += ")"
         return result
@@ -0,0 +1,573 @@
+"""Bytecode for the virtual machine engine (``--engine=vm``).
+
+``BytecodeCompiler`` compiles resolved statements into a ``Chunk`` per
+function body (and per top-level statement): a flat ``array`` of
+integers in which every instruction is an ``OpCode`` followed by its
+operands, plus a constant pool. Operands are frame slots, upvalue
+indexes, constant indexes or absolute jump targets. ``break`` and
+``continue`` compile to plain jumps.
+
+Each word of the code has its source line, as in clox; instructions that
+can fail at runtime also keep the token errors are reported at, so the
+VM reports the same messages and lines as the tree-walker.
+"""
+
+from array import array
+from contextlib import contextmanager
+from enum import IntEnum
+from typing import Dict, List, Tuple
+
+from lox.abc import Expr, Stmt
+from lox.environment import CELL, LOCAL
+from lox.expr import (
+    Assign,
+    Binary,
+    Call,
+    Get,
+    Grouping,
+    Literal,
+    Logical,
+    Set,
+    Super,
+    This,
+    Unary,
+    Variable,
+)
+from lox.stmt import (
+    Block,
+    Break,
+    Class,
+    Continue,
+    Expression,
+    For,
+    Function,
+    If,
+    Print,
+    Return,
+    Var,
+    While,
+)
+from lox.token import Token, TokenType
+from lox.visitor import ExprVisitor, StmtVisitor
+
+
+class OpCode(IntEnum):
+    # Operands are listed after each instruction; "name" is the constant
+    # index of a Token, "cache" an inline cache of a global's slot.
+    CONSTANT = 0  # constant
+    NIL = 1
+    TRUE = 2
+    FALSE = 3
+    POP = 4
+    GET_LOCAL = 5  # slot
+    SET_LOCAL = 6  # slot
+    STORE_LOCAL = 7  # slot; pops the value
+    GET_CELL = 8  # slot
+    SET_CELL = 9  # slot
+    STORE_CELL = 10  # slot; pops the value into a fresh cell
+    NEW_CELL = 11  # slot; an empty cell, filled by SET_CELL
+    GET_UPVALUE = 12  # index
+    SET_UPVALUE = 13  # index
+    GET_GLOBAL = 14  # name, cache
+    SET_GLOBAL = 15  # name, cache
+    DEFINE_GLOBAL = 16  # name; pops the value
+    EQUAL = 17
+    NOT_EQUAL = 18
+    GREATER = 19
+    GREATER_EQUAL = 20
+    LESS = 21
+    LESS_EQUAL = 22
+    ADD = 23
+    SUBTRACT = 24
+    MULTIPLY = 25
+    DIVIDE = 26
+    NOT = 27
+    NEGATE = 28
+    PRINT = 29
+    JUMP = 30  # target
+    JUMP_IF_FALSE = 31  # target; keeps the condition
+    JUMP_IF_TRUE = 32  # target; keeps the condition
+    POP_JUMP_IF_FALSE = 33  # target
+    CALL = 34  # argument count
+    RETURN = 35
+    CLOSURE = 36  # constant (Function)
+    CLASS = 37  # constant (Class); pops the superclass, if any
+    GET_PROPERTY = 38  # name
+    SET_PROPERTY = 39  # name
+    GET_SUPER = 40  # name; pops the superclass and the instance
+    CHECK_INSTANCE = 41  # name; that a field can be set on the top value
+
+
+OPERANDS: Dict[OpCode, int] = {
+    OpCode.CONSTANT: 1,
+    OpCode.GET_LOCAL: 1,
+    OpCode.SET_LOCAL: 1,
+    OpCode.STORE_LOCAL: 1,
+    OpCode.GET_CELL: 1,
+    OpCode.SET_CELL: 1,
+    OpCode.STORE_CELL: 1,
+    OpCode.NEW_CELL: 1,
+    OpCode.GET_UPVALUE: 1,
+    OpCode.SET_UPVALUE: 1,
+    OpCode.GET_GLOBAL: 2,
+    OpCode.SET_GLOBAL: 2,
+    OpCode.DEFINE_GLOBAL: 1,
+    OpCode.JUMP: 1,
+    OpCode.JUMP_IF_FALSE: 1,
+    OpCode.JUMP_IF_TRUE: 1,
+    OpCode.POP_JUMP_IF_FALSE: 1,
+    OpCode.CALL: 1,
+    OpCode.CLOSURE: 1,
+    OpCode.CLASS: 1,
+    OpCode.GET_PROPERTY: 1,
+    OpCode.SET_PROPERTY: 1,
+    OpCode.GET_SUPER: 1,
+    OpCode.CHECK_INSTANCE: 1,
+}
+
+# Instructions whose first operand indexes the constant pool.
+CONSTANT_OPERANDS = {
+    OpCode.CONSTANT,
+    OpCode.GET_GLOBAL,
+    OpCode.SET_GLOBAL,
+    OpCode.DEFINE_GLOBAL,
+    OpCode.CLOSURE,
+    OpCode.CLASS,
+    OpCode.GET_PROPERTY,
+    OpCode.SET_PROPERTY,
+    OpCode.GET_SUPER,
+    OpCode.CHECK_INSTANCE,
+}
+
+
+BINARY_OPS: Dict[TokenType, OpCode] = {
+    TokenType.BANG_EQUAL: OpCode.NOT_EQUAL,
+    TokenType.EQUAL_EQUAL: OpCode.EQUAL,
+    TokenType.GREATER: OpCode.GREATER,
+    TokenType.GREATER_EQUAL: OpCode.GREATER_EQUAL,
+    TokenType.LESS: OpCode.LESS,
+    TokenType.LESS_EQUAL: OpCode.LESS_EQUAL,
+    TokenType.PLUS: OpCode.ADD,
+    TokenType.MINUS: OpCode.SUBTRACT,
+    TokenType.STAR: OpCode.MULTIPLY,
+    TokenType.SLASH: OpCode.DIVIDE,
+}
+
+
+class Chunk:
+    """Compiled code of one function body or top-level statement."""
+
+    __slots__ = (
+        "name",
+        "code",
+        "lines",
+        "constants",
+        "indexes",
+        "tokens",
+        "caches",
+        "frame_size",
+    )
+
+    def __init__(self, name: str) -> None:
+        self.name = name
+        self.code = array("i")
+        self.lines = array("i")
+        self.constants: List[object] = []
+        # Constants are told apart by identity: 1 and true, or two tokens
+        # with the same lexeme, must stay distinct.
+        self.indexes: Dict[int, int] = {}
+        # Offset of an instruction that can fail -> token to report it at.
+        self.tokens: Dict[int, Token] = {}
+        # Inline caches of global slots: [slot, table version] per site.
+        self.caches: List[List[int]] = []
+        # Frame a top-level statement runs in; functions use their own.
+        self.frame_size = 0
+
+    def add_constant(self, value: object) -> int:
+        index = self.indexes.get(id(value))
+        if index is None:
+            index = self.indexes[id(value)] = len(self.constants)
+            self.constants.append(value)
+        return index
+
+
+class BytecodeCompiler(ExprVisitor, StmtVisitor):
+    """Compiles resolved statements to chunks of bytecode."""
+
+    def __init__(self) -> None:
+        self.chunk: Chunk | None = None
+        self.line = 0
+        # Per enclosing loop: (continue jumps, break jumps) to patch.
+        self.loops: List[Tuple[List[int], List[int]]] = []
+        # Compiled function bodies, shared by every closure of a function.
+        self.bodies: Dict[Function, Chunk] = {}
+
+    def compile(self, stmt: Stmt) -> Chunk:
+        """Compile a top-level statement."""
+        chunk = Chunk("<script>")
+        with self._compiling(chunk):
+            self._statement(stmt)
+            self._emit(OpCode.NIL)
+            self._emit(OpCode.RETURN)
+        return chunk
+
+    def body(self, declaration: Function) -> Chunk:
+        """Compile (once) the body of a function whose body is parsed."""
+        chunk = self.bodies.get(declaration)
+        if chunk is None:
+            chunk = Chunk(declaration.name.lexeme)
+            chunk.frame_size = declaration.frame_size
+            with self._compiling(chunk):
+                self.line = declaration.name.line
+                for statement in declaration.body:
+                    self._statement(statement)
+                self._emit(OpCode.NIL)
+                self._emit(OpCode.RETURN)
+            self.bodies[declaration] = chunk
+        return chunk
+
+    @contextmanager
+    def _compiling(self, chunk: Chunk):
+        enclosing = self.chunk, self.line, self.loops
+        self.chunk, self.loops = chunk, []
+        try:
+            yield
+        finally:
+            self.chunk, self.line, self.loops = enclosing
+
+    # Emitting
+
+    def _emit(self, op: OpCode, *operands: int, token: Token | None = None) -> int:
+        chunk = self.chunk
+        offset = len(chunk.code)
+        if token is not None:
+            self.line = token.line
+            chunk.tokens[offset] = token
+        chunk.code.append(op)
+        chunk.code.extend(operands)
+        chunk.lines.extend([self.line] * (1 + len(operands)))
+        return offset
+
+    def _constant(self, value: object) -> int:
+        return self.chunk.add_constant(value)
+
+    def _cache(self) -> int:
+        self.chunk.caches.append([0, -1])
+        return len(self.chunk.caches) - 1
+
+    def _jump(self, op: OpCode, target: int = -1) -> int:
+        """Emit a jump; returns the offset of its target, to patch."""
+        return self._emit(op, target) + 1
+
+    def _patch(self, operand: int) -> None:
+        self.chunk.code[operand] = len(self.chunk.code)
+
+    def _statement(self, stmt: Stmt) -> None:
+        stmt.accept(self)
+
+    def _expression(self, expr: Expr) -> None:
+        expr.accept(self)
+
+    # Variables
+
+    def _load(self, resolved, name: Token) -> None:
+        if resolved is None:
+            self._emit(
+                OpCode.GET_GLOBAL, self._constant(name), self._cache(), token=name
+            )
+            return
+        kind, index = resolved
+        if kind == LOCAL:
+            self._emit(OpCode.GET_LOCAL, index)
+        elif kind == CELL:
+            self._emit(OpCode.GET_CELL, index)
+        else:
+            self._emit(OpCode.GET_UPVALUE, index)
+
+    def _define(self, stmt: Var | Function | Class) -> None:
+        """Store the value on the stack where the declaration lives."""
+        if stmt.slot is None:
+            self._emit(OpCode.DEFINE_GLOBAL, self._constant(stmt.name))
+        elif stmt.cell:
+            self._emit(OpCode.STORE_CELL, stmt.slot)
+        else:
+            self._emit(OpCode.STORE_LOCAL, stmt.slot)
+
+    def _declare_cell(self, stmt: Function | Class) -> bool:
+        """Put a captured declaration's cell in place before its value
+        exists (see ``Interpreter.declare_cell``)."""
+        if stmt.slot is None or not stmt.cell:
+            return False
+        self._emit(OpCode.NEW_CELL, stmt.slot)
+        return True
+
+    def visit_variable(self, expr: Variable):
+        self._load(expr.resolved, expr.name)
+
+    def visit_assign(self, expr: Assign):
+        self._expression(expr.value)
+        resolved = expr.resolved
+        if resolved is None:
+            name = expr.name
+            self._emit(
+                OpCode.SET_GLOBAL, self._constant(name), self._cache(), token=name
+            )
+            return
+        kind, index = resolved
+        if kind == LOCAL:
+            self._emit(OpCode.SET_LOCAL, index)
+        elif kind == CELL:
+            self._emit(OpCode.SET_CELL, index)
+        else:
+            self._emit(OpCode.SET_UPVALUE, index)
+
+    def visit_this(self, expr: This):
+        self._load(expr.resolved, expr.keyword)
+
+    def visit_super(self, expr: Super):
+        self._load(expr.this, expr.keyword)
+        self._load(expr.resolved, expr.keyword)
+        method = expr.method
+        self._emit(OpCode.GET_SUPER, self._constant(method), token=method)
+
+    # Expressions
+
+    def visit_literal(self, expr: Literal):
+        value = expr.value
+        if value is None:
+            self._emit(OpCode.NIL)
+        elif value is True:
+            self._emit(OpCode.TRUE)
+        elif value is False:
+            self._emit(OpCode.FALSE)
+        else:
+            self._emit(OpCode.CONSTANT, self._constant(value))
+
+    def visit_grouping(self, expr: Grouping):
+        self._expression(expr.expression)
+
+    def visit_unary(self, expr: Unary):
+        self._expression(expr.right)
+        if expr.op.type == TokenType.MINUS:
+            self._emit(OpCode.NEGATE)
+        elif expr.op.type == TokenType.BANG:
+            self._emit(OpCode.NOT)
+        else:
+            self._emit(OpCode.POP)
+            self._emit(OpCode.NIL)
+
+    def visit_logical(self, expr: Logical):
+        self._expression(expr.left)
+        if expr.op.type == TokenType.OR:
+            end = self._jump(OpCode.JUMP_IF_TRUE)
+        else:
+            end = self._jump(OpCode.JUMP_IF_FALSE)
+        self._emit(OpCode.POP)
+        self._expression(expr.right)
+        self._patch(end)
+
+    def visit_binary(self, expr: Binary):
+        self._expression(expr.left)
+        if expr.op.type == TokenType.COMMA:
+            self._emit(OpCode.POP)
+            self._expression(expr.right)
+            return
+        self._expression(expr.right)
+        op = BINARY_OPS.get(expr.op.type)
+        if op is None:
+            self._emit(OpCode.POP)
+            self._emit(OpCode.POP)
+            self._emit(OpCode.NIL)
+        else:
+            self._emit(op, token=expr.op)
+
+    def visit_call(self, expr: Call):
+        self._expression(expr.callee)
+        for argument in expr.arguments:
+            self._expression(argument)
+        self._emit(OpCode.CALL, len(expr.arguments), token=expr.paren)
+
+    def visit_get(self, expr: Get):
+        self._expression(expr.object)
+        name = expr.name
+        self._emit(OpCode.GET_PROPERTY, self._constant(name), token=name)
+
+    def visit_set(self, expr: Set):
+        self._expression(expr.object)
+        name = expr.name
+        # The object is checked before the value is evaluated.
+        self._emit(OpCode.CHECK_INSTANCE, self._constant(name), token=name)
+        self._expression(expr.value)
+        self._emit(OpCode.SET_PROPERTY, self._constant(name))
+
+    # Statements
+
+    def visit_expression(self, stmt: Expression):
+        self._expression(stmt.expression)
+        self._emit(OpCode.POP)
+
+    def visit_print(self, stmt: Print):
+        self._expression(stmt.expression)
+        self._emit(OpCode.PRINT)
+
+    def visit_var(self, stmt: Var):
+        self.line = stmt.name.line
+        if stmt.initializer is None:
+            self._emit(OpCode.NIL)
+        else:
+            self._expression(stmt.initializer)
+        self._define(stmt)
+
+    def _root_frame(self, frame_size: int | None) -> None:
+        # A scope outside any function has a frame of its own; a top-level
+        # statement's chunk runs in one frame big enough for all of them.
+        if frame_size is not None:
+            self.chunk.frame_size = max(self.chunk.frame_size, frame_size)
+
+    def visit_block(self, stmt: Block):
+        self._root_frame(stmt.frame_size)
+        for statement in stmt.statements:
+            self._statement(statement)
+
+    def visit_if(self, stmt: If):
+        self._expression(stmt.condition)
+        otherwise = self._jump(OpCode.POP_JUMP_IF_FALSE)
+        self._statement(stmt.then_branch)
+        if stmt.else_branch is None:
+            self._patch(otherwise)
+            return
+        end = self._jump(OpCode.JUMP)
+        self._patch(otherwise)
+        self._statement(stmt.else_branch)
+        self._patch(end)
+
+    def _loop_body(self, body: Stmt) -> Tuple[List[int], List[int]]:
+        """Compile a loop body; returns its continue and break jumps."""
+        continues: List[int] = []
+        breaks: List[int] = []
+        self.loops.append((continues, breaks))
+        self._statement(body)
+        self.loops.pop()
+        return continues, breaks
+
+    def visit_while(self, stmt: While):
+        start = len(self.chunk.code)
+        self._expression(stmt.condition)
+        exit_jump = self._jump(OpCode.POP_JUMP_IF_FALSE)
+        continues, breaks = self._loop_body(stmt.body)
+        for jump in continues:
+            self.chunk.code[jump] = start
+        self._jump(OpCode.JUMP, start)
+        self._patch(exit_jump)
+        for jump in breaks:
+            self._patch(jump)
+
+    def visit_for(self, stmt: For):
+        self._root_frame(stmt.frame_size)
+        if stmt.initializer is not None:
+            self._statement(stmt.initializer)
+        start = len(self.chunk.code)
+        exit_jump = None
+        if stmt.condition is not None:
+            self._expression(stmt.condition)
+            exit_jump = self._jump(OpCode.POP_JUMP_IF_FALSE)
+        continues, breaks = self._loop_body(stmt.body)
+        # A continue still runs the increment.
+        for jump in continues:
+            self._patch(jump)
+        if stmt.increment is not None:
+            self._expression(stmt.increment)
+            self._emit(OpCode.POP)
+        self._jump(OpCode.JUMP, start)
+        if exit_jump is not None:
+            self._patch(exit_jump)
+        for jump in breaks:
+            self._patch(jump)
+
+    def visit_break(self, stmt: Break):
+        self.loops[-1][1].append(self._jump(OpCode.JUMP))
+
+    def visit_continue(self, stmt: Continue):
+        self.loops[-1][0].append(self._jump(OpCode.JUMP))
+
+    def visit_return(self, stmt: Return):
+        self.line = stmt.keyword.line
+        if stmt.value is None:
+            self._emit(OpCode.NIL)
+        else:
+            self._expression(stmt.value)
+        self._emit(OpCode.RETURN)
+
+    def visit_function(self, stmt: Function):
+        self.line = stmt.name.line
+        cell = self._declare_cell(stmt)
+        self._emit(OpCode.CLOSURE, self._constant(stmt))
+        if cell:
+            self._emit(OpCode.SET_CELL, stmt.slot)
+            self._emit(OpCode.POP)
+        else:
+            self._define(stmt)
+
+    def visit_class(self, stmt: Class):
+        self.line = stmt.name.line
+        if stmt.super_cls is not None:
+            self._expression(stmt.super_cls)
+        cell = self._declare_cell(stmt)
+        token = stmt.super_cls.name if stmt.super_cls is not None else stmt.name
+        self._emit(OpCode.CLASS, self._constant(stmt), token=token)
+        if cell:
+            self._emit(OpCode.SET_CELL, stmt.slot)
+            self._emit(OpCode.POP)
+        else:
+            self._define(stmt)
+
+
+def disassemble_program(statements: List[Stmt]) -> str:
+    """Listings of resolved top-level statements and of every function and
+    method they declare (whose body is parsed)."""
+    compiler = BytecodeCompiler()
+    pending = [compiler.compile(statement) for statement in statements]
+    listings = []
+    while pending:
+        chunk = pending.pop(0)
+        listings.append(disassemble(chunk))
+        for constant in chunk.constants:
+            functions = [constant] if isinstance(constant, Function) else []
+            if isinstance(constant, Class):
+                functions = constant.methods
+            for function in functions:
+                if function.body is not None:
+                    pending.append(compiler.body(function))
+    return "\n\n".join(listings)
+
+
+def disassemble(chunk: Chunk) -> str:
+    """A listing of a chunk, one instruction per line, as clox prints it."""
+    lines = [f"== {chunk.name} =="]
+    code = chunk.code
+    offset = 0
+    previous_line = None
+    while offset < len(code):
+        op = OpCode(code[offset])
+        operands = list(code[offset + 1 : offset + 1 + OPERANDS.get(op, 0)])
+        line = chunk.lines[offset]
+        where = "   |" if line == previous_line else f"{line:4d}"
+        previous_line = line
+        text = f"{offset:04d} {where} {op.name:<17}"
+        if operands:
+            text += " " + " ".join(str(operand) for operand in operands)
+        if op in CONSTANT_OPERANDS:
+            text += f" ({describe(chunk.constants[operands[0]])})"
+        lines.append(text.rstrip())
+        offset += 1 + len(operands)
+    return "\n".join(lines)
+
+
+def describe(constant: object) -> str:
+    if isinstance(constant, Token):
+        return constant.lexeme
+    if isinstance(constant, Function):
+        return f"<fn {constant.name.lexeme}>"
+    if isinstance(constant, Class):
+        return f"<class {constant.name.lexeme}>"
+    return repr(constant)
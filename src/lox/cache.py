@@ -0,0 +1,126 @@
+import gc
+import hashlib
+import logging
+import os
+import pickle
+import sys
+import tempfile
+from typing import List, TextIO
+
+from lox import __version__
+from lox.abc import Stmt
+
+logger = logging.getLogger(__name__)
+
+CACHE_DIR = "__ploxcache__"
+# Bumped whenever the pickled statements or resolver data change shape.
+FORMAT = 5
+# Characters hashed at a time when the source is a file.
+CHUNK_SIZE = 1 << 16
+
+Program = List[Stmt]
+
+
+class ProgramCache:
+    """On-disk cache of parsed and resolved programs.
+
+    Entries live in a ``__ploxcache__`` directory next to the script, like
+    ``__pycache__``. Each entry pickles the resolved statements, and is
+    named after a hash of the source,
+    the parse options, the plox version, the entry ``FORMAT`` and the
+    Python implementation, so editing the script or upgrading plox simply
+    misses the old entry. Once the directory grows past ``max_bytes`` the
+    least recently used entries are removed.
+    """
+
+    def __init__(self, directory: str, max_bytes: int = 32 * 1024 * 1024) -> None:
+        self.directory = directory
+        self.max_bytes = max_bytes
+
+    @classmethod
+    def for_script(cls, path: str) -> "ProgramCache":
+        script_dir = os.path.dirname(os.path.abspath(path))
+        return cls(os.path.join(script_dir, CACHE_DIR))
+
+    @staticmethod
+    def key(source: str | TextIO, *options: object) -> str:
+        """The key of ``source``, or of the rest of a text file, which is
+        hashed a chunk at a time rather than read whole."""
+        digest = hashlib.sha256()
+        digest.update(f"{__version__}:{FORMAT}:{sys.implementation.cache_tag}".encode())
+        digest.update(repr(options).encode())
+        if isinstance(source, str):
+            digest.update(source.encode())
+        else:
+            for chunk in iter(lambda: source.read(CHUNK_SIZE), ""):
+                digest.update(chunk.encode())
+        return digest.hexdigest()
+
+    def path(self, key: str) -> str:
+        return os.path.join(self.directory, f"{key}.pickle")
+
+    def load(self, key: str) -> Program | None:
+        path = self.path(key)
+        # Unpickling allocates one object per node and token; letting the
+        # cyclic GC rescan the growing heap meanwhile costs more than the
+        # load itself.
+        gc_enabled = gc.isenabled()
+        gc.disable()
+        try:
+            with open(path, "rb") as file:
+                program = pickle.load(file)
+        except FileNotFoundError:
+            return None
+        except Exception as e:
+            logger.debug(f"Dropping unreadable cache entry {path}: {e}")
+            self._remove(path)
+            return None
+        finally:
+            if gc_enabled:
+                gc.enable()
+        # Mark the entry as recently used for eviction. Another process may
+        # have evicted it since, or the directory may be read-only.
+        try:
+            os.utime(path)
+        except OSError:
+            pass
+        logger.debug(f"Loaded cached program {path}")
+        return program
+
+    def store(self, key: str, program: Program) -> None:
+        tmp_path = None
+        try:
+            os.makedirs(self.directory, exist_ok=True)
+            fd, tmp_path = tempfile.mkstemp(dir=self.directory, suffix=".tmp")
+            with os.fdopen(fd, "wb") as file:
+                pickle.dump(program, file, protocol=pickle.HIGHEST_PROTOCOL)
+            os.replace(tmp_path, self.path(key))
+        except (OSError, pickle.PicklingError, RecursionError) as e:
+            logger.debug(f"Could not cache program: {e}")
+            # Eviction only counts entries, so nothing else would remove it.
+            if tmp_path is not None:
+                self._remove(tmp_path)
+            return
+        logger.debug(f"Stored cached program {self.path(key)}")
+        self.evict()
+
+    def evict(self) -> None:
+        entries = []
+        for entry in os.scandir(self.directory):
+            if entry.name.endswith(".pickle"):
+                stat = entry.stat()
+                entries.append((stat.st_mtime, stat.st_size, entry.path))
+
+        total = sum(size for _, size, _ in entries)
+        for _, size, path in sorted(entries):
+            if total <= self.max_bytes:
+                break
+            self._remove(path)
+            total -= size
+
+    @staticmethod
+    def _remove(path: str) -> None:
+        try:
+            os.remove(path)
+        except OSError:
+            pass
@@ -0,0 +1,685 @@
+"""Closure-compilation engine (``--engine=closures``).
+
+Instead of walking the tree on every run, ``ClosureCompiler`` turns each
+resolved node once into a Python closure, and running the program is a
+chain of closure calls. Everything the tree-walker looks up on each visit
+is decided at compile time: the operator of a binary node, how a
+variable is reached (frame slot, cell, upvalue or global) and the value
+of a literal.
+
+Every compiled node takes the current frame (see ``Resolver``) as its
+only argument; the running closure's upvalues are on the interpreter, as
+in the tree-walker. Runtime values, classes, instances, the globals table
+and the frame pool are shared with ``Interpreter``, and runtime errors
+carry the same tokens and messages.
+"""
+
+from typing import Callable, Dict, List
+
+from lox.abc import Expr, Stmt
+from lox.environment import CELL, LOCAL, Cell
+from lox.error import (
+    BreakException,
+    ContinueException,
+    PloxRuntimeError,
+    ReturnException,
+    runtime_error,
+)
+from lox.expr import (
+    Assign,
+    Binary,
+    Call,
+    Get,
+    Grouping,
+    Literal,
+    Logical,
+    Set,
+    Super,
+    This,
+    Unary,
+    Variable,
+)
+from lox.functions import LoxCallable, LoxClass, LoxFunction, LoxInstance
+from lox.interpreter import Interpreter
+from lox.stmt import (
+    Block,
+    Break,
+    Class,
+    Continue,
+    Expression,
+    For,
+    Function,
+    If,
+    Print,
+    Return,
+    Var,
+    While,
+)
+from lox.token import TokenType
+from lox.visitor import ExprVisitor, StmtVisitor
+
+# A compiled node: called with the current frame.
+Code = Callable[[list], object]
+
+
+class CompiledFunction(LoxFunction):
+    """A closure whose body runs as compiled code."""
+
+    def __init__(
+        self,
+        declaration: Function,
+        upvalues: List[Cell],
+        is_initializer: bool,
+        super_cls: LoxClass | None = None,
+        bound: List[object] | None = None,
+        code: Code | None = None,
+    ) -> None:
+        super().__init__(declaration, upvalues, is_initializer, super_cls, bound)
+        # Compiled on first call, so lazily parsed bodies stay lazy.
+        self.code = code
+
+    def bind(self, instance: LoxInstance):
+        bound = [instance] if self.super_cls is None else [instance, self.super_cls]
+        return CompiledFunction(
+            self.declaration,
+            self.upvalues,
+            self.is_initializer,
+            self.super_cls,
+            bound,
+            self.code,
+        )
+
+    def run(self, interpreter: "ClosureInterpreter", frame: List[object]) -> object:
+        code = self.code
+        if code is None:
+            code = self.code = interpreter.compiler.body(self.declaration)
+        if self.bound is not None:
+            frame[: len(self.bound)] = self.bound
+        for slot in self.declaration.cells:
+            frame[slot] = Cell(frame[slot])
+
+        previous_upvalues = interpreter.upvalues
+        interpreter.upvalues = self.upvalues
+        try:
+            code(frame)
+        except ReturnException as return_value:
+            if not self.is_initializer:
+                return return_value.value
+        finally:
+            interpreter.upvalues = previous_upvalues
+            blank, free = interpreter.frames.free[len(frame)]
+            frame[:] = blank
+            free.append(frame)
+        if self.is_initializer:
+            return self.bound[0]
+        return None
+
+
+class ClosureInterpreter(Interpreter):
+    """Runs programs by compiling each top-level statement to closures."""
+
+    def __init__(self) -> None:
+        super().__init__()
+        self.compiler = ClosureCompiler(self)
+
+    def interpret(self, stmts: Stmt | List[Stmt]):
+        if not isinstance(stmts, list):
+            stmts = [stmts]
+
+        for stmt in stmts:
+            try:
+                self.compiler.compile(stmt)(self.frame)
+            except PloxRuntimeError as error:
+                runtime_error(error)
+
+
+def _is_truthy(value: object) -> bool:
+    return value is not None and value is not False
+
+
+def _sequence(codes: List[Code]) -> Code:
+    """Run compiled statements in order."""
+    if len(codes) == 1:
+        return codes[0]
+    if len(codes) == 2:
+        first, second = codes
+
+        def run_two(frame):
+            first(frame)
+            second(frame)
+
+        return run_two
+
+    def run_all(frame):
+        for code in codes:
+            code(frame)
+
+    return run_all
+
+
+class ClosureCompiler(ExprVisitor, StmtVisitor):
+    """Compiles resolved statements and expressions into closures."""
+
+    def __init__(self, interpreter: ClosureInterpreter) -> None:
+        self.interpreter = interpreter
+        # Compiled function bodies, shared by every closure of a function.
+        self.bodies: Dict[Function, Code] = {}
+
+    def compile(self, node: Expr | Stmt) -> Code:
+        return node.accept(self)
+
+    def body(self, declaration: Function) -> Code:
+        code = self.bodies.get(declaration)
+        if code is None:
+            code = self.bodies[declaration] = self._statements(declaration.body)
+        return code
+
+    def _statements(self, statements: List[Stmt]) -> Code:
+        if not statements:
+            return lambda frame: None
+        return _sequence([self.compile(statement) for statement in statements])
+
+    # Variables
+
+    def _reader(self, resolved, name) -> Code:
+        """Code reading a variable, however the resolver said to reach it."""
+        interpreter = self.interpreter
+        if resolved is None:
+            table = interpreter.globals
+            # Slot in the globals table, valid while its layout is unchanged.
+            cache = [0, -1]
+
+            def read_global(frame):
+                if cache[1] != table.version:
+                    cache[0] = table.slot(name)
+                    cache[1] = table.version
+                return table.values[cache[0]]
+
+            return read_global
+
+        kind, index = resolved
+        if kind == LOCAL:
+            return lambda frame: frame[index]
+        if kind == CELL:
+            return lambda frame: frame[index].value
+        return lambda frame: interpreter.upvalues[index].value
+
+    def _definer(self, stmt: Var | Function | Class) -> Callable[[list, object], None]:
+        """Code storing the value of a declaration where it lives."""
+        slot = stmt.slot
+        if slot is None:
+            define = self.interpreter.globals.define
+            name = stmt.name.lexeme
+            return lambda frame, value: define(name, value)
+        if stmt.cell:
+
+            def define_cell(frame, value):
+                frame[slot] = Cell(value)
+
+            return define_cell
+
+        def define_local(frame, value):
+            frame[slot] = value
+
+        return define_local
+
+    def _cell(self, stmt: Function | Class) -> Callable[[list], Cell] | None:
+        """Code putting a captured declaration's cell in place before its
+        value exists (see ``Interpreter.declare_cell``); None if not captured.
+        """
+        if stmt.slot is None or not stmt.cell:
+            return None
+        slot = stmt.slot
+
+        def declare_cell(frame):
+            cell = Cell()
+            frame[slot] = cell
+            return cell
+
+        return declare_cell
+
+    def _capture(self, func: Function) -> Callable[[list], List[Cell]]:
+        interpreter = self.interpreter
+        captures = func.captures
+        if not captures:
+            return lambda frame: []
+
+        def capture(frame):
+            upvalues = interpreter.upvalues
+            return [
+                frame[index] if from_frame else upvalues[index]
+                for from_frame, index in captures
+            ]
+
+        return capture
+
+    def visit_variable(self, expr: Variable) -> Code:
+        return self._reader(expr.resolved, expr.name)
+
+    def visit_assign(self, expr: Assign) -> Code:
+        value = self.compile(expr.value)
+        resolved = expr.resolved
+        interpreter = self.interpreter
+        if resolved is None:
+            table = interpreter.globals
+            name = expr.name
+            cache = [0, -1]
+
+            def assign_global(frame):
+                result = value(frame)
+                if cache[1] != table.version:
+                    cache[0] = table.slot(name)
+                    cache[1] = table.version
+                table.values[cache[0]] = result
+                return result
+
+            return assign_global
+
+        kind, index = resolved
+        if kind == LOCAL:
+
+            def assign_local(frame):
+                result = frame[index] = value(frame)
+                return result
+
+            return assign_local
+        if kind == CELL:
+
+            def assign_cell(frame):
+                result = frame[index].value = value(frame)
+                return result
+
+            return assign_cell
+
+        def assign_upvalue(frame):
+            result = interpreter.upvalues[index].value = value(frame)
+            return result
+
+        return assign_upvalue
+
+    def visit_this(self, expr: This) -> Code:
+        return self._reader(expr.resolved, expr.keyword)
+
+    def visit_super(self, expr: Super) -> Code:
+        read_super = self._reader(expr.resolved, expr.keyword)
+        read_this = self._reader(expr.this, expr.keyword)
+        method_name = expr.method
+
+        def super_(frame):
+            super_cls: LoxClass = read_super(frame)
+            obj = read_this(frame)
+            method = super_cls.find_method(method_name.lexeme)
+            if method is None:
+                raise PloxRuntimeError(
+                    method_name, f"Undefined property '{method_name.lexeme}'."
+                )
+            return method.bind(obj)
+
+        return super_
+
+    # Expressions
+
+    def visit_literal(self, expr: Literal) -> Code:
+        value = expr.value
+        return lambda frame: value
+
+    def visit_grouping(self, expr: Grouping) -> Code:
+        return self.compile(expr.expression)
+
+    def visit_unary(self, expr: Unary) -> Code:
+        right = self.compile(expr.right)
+        if expr.op.type == TokenType.MINUS:
+            return lambda frame: -float(right(frame))
+        if expr.op.type == TokenType.BANG:
+            return lambda frame: not _is_truthy(right(frame))
+
+        def unknown(frame):
+            right(frame)
+
+        return unknown
+
+    def visit_logical(self, expr: Logical) -> Code:
+        left = self.compile(expr.left)
+        right = self.compile(expr.right)
+        if expr.op.type == TokenType.OR:
+
+            def or_(frame):
+                value = left(frame)
+                if value is not None and value is not False:
+                    return value
+                return right(frame)
+
+            return or_
+
+        def and_(frame):
+            value = left(frame)
+            if value is None or value is False:
+                return value
+            return right(frame)
+
+        return and_
+
+    def visit_binary(self, expr: Binary) -> Code:
+        left = self.compile(expr.left)
+        right = self.compile(expr.right)
+        op = expr.op
+
+        match op.type:
+            case TokenType.MINUS:
+
+                def minus(frame):
+                    a = left(frame)
+                    b = right(frame)
+                    if not (isinstance(a, float) and isinstance(b, float)):
+                        raise PloxRuntimeError(op, "Operand must be a number.")
+                    return a - b
+
+                return minus
+            case TokenType.STAR:
+
+                def star(frame):
+                    a = left(frame)
+                    b = right(frame)
+                    if not (isinstance(a, float) and isinstance(b, float)):
+                        raise PloxRuntimeError(op, "Operand must be a number.")
+                    return a * b
+
+                return star
+            case TokenType.SLASH:
+
+                def slash(frame):
+                    a = left(frame)
+                    b = right(frame)
+                    if not (isinstance(a, float) and isinstance(b, float)):
+                        raise PloxRuntimeError(op, "Operand must be a number.")
+                    if b == 0:
+                        raise PloxRuntimeError(op, "Division by zero.")
+                    return a / b
+
+                return slash
+            case TokenType.PLUS:
+
+                def plus(frame):
+                    a = left(frame)
+                    b = right(frame)
+                    if isinstance(a, float) and isinstance(b, float):
+                        return a + b
+                    if isinstance(a, str) and isinstance(b, str):
+                        return a + b
+                    raise PloxRuntimeError(
+                        op, "Operands must be two numbers or two strings."
+                    )
+
+                return plus
+            case TokenType.BANG_EQUAL:
+                return lambda frame: left(frame) != right(frame)
+            case TokenType.EQUAL_EQUAL:
+                return lambda frame: left(frame) == right(frame)
+            case TokenType.GREATER:
+                return lambda frame: left(frame) > right(frame)
+            case TokenType.GREATER_EQUAL:
+                return lambda frame: left(frame) >= right(frame)
+            case TokenType.LESS:
+                return lambda frame: left(frame) < right(frame)
+            case TokenType.LESS_EQUAL:
+                return lambda frame: left(frame) <= right(frame)
+            case TokenType.COMMA:
+
+                def comma(frame):
+                    left(frame)
+                    return right(frame)
+
+                return comma
+
+        def unknown(frame):
+            left(frame)
+            right(frame)
+
+        return unknown
+
+    def visit_call(self, expr: Call) -> Code:
+        interpreter = self.interpreter
+        callee_code = self.compile(expr.callee)
+        arguments = [self.compile(argument) for argument in expr.arguments]
+        count = len(arguments)
+        paren = expr.paren
+        pool = interpreter.frames
+
+        def call(frame):
+            callee = callee_code(frame)
+            if type(callee) is CompiledFunction:
+                declaration = callee.declaration
+                if declaration.body is not None and count == len(declaration.params):
+                    # Evaluate the arguments straight into a pooled frame
+                    # (FramePool.acquire, inlined).
+                    blank, free = pool.free.get(declaration.frame_size) or pool.add(
+                        declaration.frame_size
+                    )
+                    if free:
+                        pool.hits += 1
+                        callee_frame = free.pop()
+                    else:
+                        pool.misses += 1
+                        callee_frame = list(blank)
+                    slot = callee.first_param()
+                    for argument in arguments:
+                        callee_frame[slot] = argument(frame)
+                        slot += 1
+                    return callee.run(interpreter, callee_frame)
+            values = [argument(frame) for argument in arguments]
+            if not isinstance(callee, LoxCallable):
+                raise PloxRuntimeError(paren, "Can only call functions and classes.")
+            if len(values) != callee.arity():
+                raise PloxRuntimeError(
+                    paren,
+                    f"Expected {callee.arity()} arguments but got {len(values)}.",
+                )
+            return callee(interpreter, values)
+
+        return call
+
+    def visit_get(self, expr: Get) -> Code:
+        obj_code = self.compile(expr.object)
+        name = expr.name
+
+        def get(frame):
+            obj = obj_code(frame)
+            if isinstance(obj, LoxInstance):
+                return obj[name]
+            raise PloxRuntimeError(name, "Only instances have properties.")
+
+        return get
+
+    def visit_set(self, expr: Set) -> Code:
+        obj_code = self.compile(expr.object)
+        value_code = self.compile(expr.value)
+        name = expr.name
+
+        def set_(frame):
+            obj = obj_code(frame)
+            if not isinstance(obj, LoxInstance):
+                raise PloxRuntimeError(name, "Only instances have fields.")
+            value = value_code(frame)
+            obj[name] = value
+            return value
+
+        return set_
+
+    # Statements
+
+    def visit_expression(self, stmt: Expression) -> Code:
+        return self.compile(stmt.expression)
+
+    def visit_print(self, stmt: Print) -> Code:
+        expression = self.compile(stmt.expression)
+        stringify = self.interpreter.stringify
+
+        def print_(frame):
+            value = expression(frame)
+            if isinstance(value, bool):
+                print("true" if value else "false")
+            else:
+                print(stringify(value))
+
+        return print_
+
+    def visit_var(self, stmt: Var) -> Code:
+        define = self._definer(stmt)
+        if stmt.initializer is None:
+            return lambda frame: define(frame, None)
+        initializer = self.compile(stmt.initializer)
+        return lambda frame: define(frame, initializer(frame))
+
+    def visit_block(self, stmt: Block) -> Code:
+        body = self._statements(stmt.statements)
+        if stmt.frame_size is None:
+            return body
+        size = stmt.frame_size
+        # Outside any function: the block has a frame of its own.
+        return lambda frame: body([None] * size)
+
+    def visit_if(self, stmt: If) -> Code:
+        condition = self.compile(stmt.condition)
+        then_branch = self.compile(stmt.then_branch)
+        if stmt.else_branch is None:
+
+            def if_(frame):
+                value = condition(frame)
+                if value is not None and value is not False:
+                    then_branch(frame)
+
+            return if_
+        else_branch = self.compile(stmt.else_branch)
+
+        def if_else(frame):
+            value = condition(frame)
+            if value is not None and value is not False:
+                then_branch(frame)
+            else:
+                else_branch(frame)
+
+        return if_else
+
+    def visit_while(self, stmt: While) -> Code:
+        condition = self.compile(stmt.condition)
+        body = self.compile(stmt.body)
+
+        def while_(frame):
+            while _is_truthy(condition(frame)):
+                try:
+                    body(frame)
+                except ContinueException:
+                    continue
+                except BreakException:
+                    break
+
+        return while_
+
+    def visit_for(self, stmt: For) -> Code:
+        initializer = None
+        if stmt.initializer is not None:
+            initializer = self.compile(stmt.initializer)
+        condition = None
+        if stmt.condition is not None:
+            condition = self.compile(stmt.condition)
+        increment = None
+        if stmt.increment is not None:
+            increment = self.compile(stmt.increment)
+        body = self.compile(stmt.body)
+
+        def loop(frame):
+            if initializer is not None:
+                initializer(frame)
+            while condition is None or _is_truthy(condition(frame)):
+                try:
+                    body(frame)
+                except ContinueException:
+                    # Skip remainder of the body but still run the increment
+                    pass
+                except BreakException:
+                    break
+                if increment is not None:
+                    increment(frame)
+
+        if stmt.frame_size is None:
+            return loop
+        size = stmt.frame_size
+        # One frame holds the loop variable for every iteration.
+        return lambda frame: loop([None] * size)
+
+    def visit_break(self, stmt: Break) -> Code:
+        def break_(frame):
+            raise BreakException()
+
+        return break_
+
+    def visit_continue(self, stmt: Continue) -> Code:
+        def continue_(frame):
+            raise ContinueException()
+
+        return continue_
+
+    def visit_return(self, stmt: Return) -> Code:
+        if stmt.value is None:
+
+            def return_nil(frame):
+                raise ReturnException(None)
+
+            return return_nil
+        value = self.compile(stmt.value)
+
+        def return_(frame):
+            raise ReturnException(value(frame))
+
+        return return_
+
+    def visit_function(self, stmt: Function) -> Code:
+        declare_cell = self._cell(stmt)
+        define = self._definer(stmt)
+        capture = self._capture(stmt)
+
+        def function(frame):
+            cell = declare_cell(frame) if declare_cell is not None else None
+            fun = CompiledFunction(stmt, capture(frame), False)
+            if cell is None:
+                define(frame, fun)
+            else:
+                cell.value = fun
+
+        return function
+
+    def visit_class(self, stmt: Class) -> Code:
+        super_code = None
+        if stmt.super_cls is not None:
+            super_code = self.compile(stmt.super_cls)
+        declare_cell = self._cell(stmt)
+        define = self._definer(stmt)
+        methods = [
+            (method, self._capture(method), method.name.lexeme == "init")
+            for method in stmt.methods
+        ]
+        name = stmt.name.lexeme
+
+        def class_(frame):
+            super_cls = None
+            if super_code is not None:
+                super_cls = super_code(frame)
+                if not isinstance(super_cls, LoxClass):
+                    raise PloxRuntimeError(
+                        stmt.super_cls.name, "Superclass must be a class."
+                    )
+
+            cell = declare_cell(frame) if declare_cell is not None else None
+            functions: Dict[str, LoxFunction] = {}
+            for method, capture, is_initializer in methods:
+                functions[method.name.lexeme] = CompiledFunction(
+                    method, capture(frame), is_initializer, super_cls
+                )
+
+            klass = LoxClass(name, super_cls, functions)
+            if cell is None:
+                define(frame, klass)
+            else:
+                cell.value = klass
+
+        return class_
@@ -0,0 +1,20 @@
+"""Execution engines, by the name ``--engine`` selects them with.
+
+Every engine is an ``Interpreter``: it runs the same resolved program
+with the same output and errors, and only differs in how it executes.
+"""
+
+from typing import Dict, Type
+
+from lox.closures import ClosureInterpreter
+from lox.interpreter import ExceptionInterpreter, Interpreter
+from lox.transpiler import PythonInterpreter
+from lox.vm import VirtualMachine
+
+ENGINES: Dict[str, Type[Interpreter]] = {
+    "tree": Interpreter,
+    "tree-exceptions": ExceptionInterpreter,
+    "closures": ClosureInterpreter,
+    "vm": VirtualMachine,
+    "python": PythonInterpreter,
+}
@@ -1,44 +1,111 @@
+import itertools
 from dataclasses import dataclass, field
+from typing import Dict, List, Tuple
 
 from lox.error import PloxRuntimeError
 from lox.token import Token
 
+# Layout versions are unique across all global tables, so a slot cached
+# against one interpreter's globals never matches another's.
+_versions = itertools.count()
+
 
 @dataclass
 class Environment:
-    values: dict = field(default_factory=dict)
-    enclosing: "Environment | None" = None
+    """Global variables, in a table indexed by slot.
+
+    Only names the resolver left unresolved end up here: top-level
+    declarations and natives, which may be defined after the code using
+    them has been resolved. Each name gets a slot the first time it is
+    defined and keeps it, so redefining a name (as the REPL allows) only
+    replaces the value. ``version`` changes whenever a name is added;
+    nodes cache the slot they found together with the version, and look
+    the name up again once it differs.
+    """
+
+    slots: Dict[str, int] = field(default_factory=dict)
+    values: list = field(default_factory=list)
+    version: int = field(default_factory=lambda: next(_versions))
 
     def define(self, name: str, value: object) -> None:
-        self.values[name] = value
+        slot = self.slots.get(name)
+        if slot is None:
+            self.slots[name] = len(self.values)
+            self.values.append(value)
+            self.version = next(_versions)
+        else:
+            self.values[slot] = value
+
+    def slot(self, name: Token) -> int:
+        slot = self.slots.get(name.lexeme)
+        if slot is None:
+            raise PloxRuntimeError(name, f"Undefined variable '{name.lexeme}'.")
+        return slot
 
     def get(self, name: Token):
-        if name.lexeme in self.values:
-            return self.values[name.lexeme]
-        if self.enclosing is not None:
-            return self.enclosing.get(name)
-        raise PloxRuntimeError(name, f"Undefined variable '{name.lexeme}'.")
+        return self.values[self.slot(name)]
 
     def assign(self, name: Token, value: object) -> None:
-        if name.lexeme in self.values:
-            self.values[name.lexeme] = value
-            return
-        if self.enclosing is not None:
-            self.enclosing.assign(name, value)
-            return
-        raise PloxRuntimeError(name, f"Undefined variable '{name.lexeme}'.")
-
-    def get_at(self, distance: int, name: str):
-        return self.ancestor(distance).values[name]
-
-    def ancestor(self, distance: int) -> "Environment":
-        environment = self
-        for _ in range(distance):
-            if environment.enclosing is None:
-                break
-            environment = environment.enclosing
-
-        return environment
-
-    def assign_at(self, distance: int, name: Token, value: object) -> None:
-        self.ancestor(distance).values[name.lexeme] = value
+        self.values[self.slot(name)] = value
+
+
+# How the resolver reaches a local variable (see ``Resolver``): a slot of
+# the current frame, a cell in such a slot, or a cell the current closure
+# captured, by its index among the closure's upvalues.
+LOCAL, CELL, UPVALUE = range(3)
+
+
+class Cell:
+    """A local variable captured by a closure.
+
+    Frames are plain lists holding a call's parameters and locals, and die
+    with the call. A variable that some nested function uses lives in a
+    cell instead, stored in its frame slot, and each closure keeps only the
+    cells it uses (its upvalues), so assignments through either side are
+    seen by both while the rest of the frame can be freed.
+    """
+
+    __slots__ = ("value",)
+
+    def __init__(self, value: object = None) -> None:
+        self.value = value
+
+
+class FramePool:
+    """Frames of finished calls, kept to be reused by later calls.
+
+    No frame outlives its call: closures keep the cells of the variables
+    they capture, not the frame (see ``Resolver``), and a bound method
+    copies "this" into each call's frame. So when a call returns its
+    frame is cleared and kept, by size, for the next call needing one.
+    ``hits`` counts calls that got a recycled frame, ``misses`` those that
+    had to allocate one (at most the deepest recursion per size).
+    """
+
+    __slots__ = ("free", "hits", "misses")
+
+    def __init__(self) -> None:
+        # Frame size -> (all-None template, frames free for reuse); an
+        # entry exists for every size ever handed out, so releasing a
+        # frame needs no check.
+        self.free: Dict[int, Tuple[tuple, List[list]]] = {}
+        self.hits = 0
+        self.misses = 0
+
+    def add(self, size: int) -> Tuple[tuple, List[list]]:
+        entry = self.free[size] = ((None,) * size, [])
+        return entry
+
+    def acquire(self, size: int) -> list:
+        blank, free = self.free.get(size) or self.add(size)
+        if free:
+            self.hits += 1
+            return free.pop()
+        self.misses += 1
+        return list(blank)
+
+    def release(self, frame: list) -> None:
+        blank, free = self.free[len(frame)]
+        # Drop the values so a pooled frame keeps nothing alive.
+        frame[:] = blank
+        free.append(frame)
@@ -1,4 +1,5 @@
 import logging
+from enum import Enum
 from typing import Union
 
 from lox.token import Token, TokenType
@@ -34,6 +35,19 @@ class PloxRuntimeError(RuntimeError):
         self.message = message
 
 
+class Completion(Enum):
+    """How a statement that did not run to its end completed.
+
+    Executing a statement returns one of these, or None when it ran to
+    its end; the value of a RETURN is left in ``Interpreter.returned``.
+    """
+
+    BREAK = "break"
+    CONTINUE = "continue"
+    RETURN = "return"
+
+
+# Exceptions of the exception-based control flow (ExceptionInterpreter).
 class BreakException(Exception):
     pass
 
@@ -1,31 +1,45 @@
 from dataclasses import dataclass, field
-from typing import List
+from typing import Callable, List, Tuple
 
 from lox.abc import Expr
+from lox.operators import BINARY, UNARY
 from lox.token import Token
 from lox.visitor import ExprVisitor
 
+TRANSIENT = {"transient": True}
 
-@dataclass(eq=False)
+
+@dataclass(eq=False, slots=True)
 class Binary(Expr):
     left: Expr
     op: Token
     right: Expr
+    # Function of the operator (see lox.operators), bound once per node.
+    operate: Callable = field(init=False, repr=False, metadata=TRANSIENT)
+
+    def __post_init__(self):
+        self.operate = BINARY[self.op.type]
 
     def accept(self, visitor: ExprVisitor):
         return visitor.visit_binary(self)
 
 
-@dataclass(eq=False)
+@dataclass(eq=False, slots=True)
 class Assign(Expr):
     name: Token
     value: Expr
+    # (kind, index) of a local variable, filled in by the resolver;
+    # None for a global.
+    resolved: Tuple[int, int] | None = field(default=None, init=False, repr=False)
+    # Slot of a global in the table whose layout version is global_version.
+    global_slot: int = field(default=0, init=False, repr=False, metadata=TRANSIENT)
+    global_version: int = field(default=-1, init=False, repr=False, metadata=TRANSIENT)
 
     def accept(self, visitor: ExprVisitor):
         return visitor.visit_assign(self)
 
 
-@dataclass(eq=False)
+@dataclass(eq=False, slots=True)
 class Call(Expr):
     callee: Expr
     paren: Token  # Token for the closing parenthesis
@@ -35,7 +49,7 @@ class Call(Expr):
         return visitor.visit_call(self)
 
 
-@dataclass(eq=False)
+@dataclass(eq=False, slots=True)
 class Get(Expr):
     object: Expr
     name: Token
@@ -44,7 +58,7 @@ class Get(Expr):
         return visitor.visit_get(self)
 
 
-@dataclass(eq=False)
+@dataclass(eq=False, slots=True)
 class Grouping(Expr):
     expression: Expr
 
@@ -52,7 +66,7 @@ class Grouping(Expr):
         return visitor.visit_grouping(self)
 
 
-@dataclass(eq=False)
+@dataclass(eq=False, slots=True)
 class Literal(Expr):
     value: object
 
@@ -60,7 +74,7 @@ class Literal(Expr):
         return visitor.visit_literal(self)
 
 
-@dataclass(eq=False)
+@dataclass(eq=False, slots=True)
 class Logical(Expr):
     left: Expr
     op: Token
@@ -70,7 +84,7 @@ class Logical(Expr):
         return visitor.visit_logical(self)
 
 
-@dataclass(eq=False)
+@dataclass(eq=False, slots=True)
 class Set(Expr):
     object: Expr
     name: Token
@@ -80,35 +94,52 @@ class Set(Expr):
         return visitor.visit_set(self)
 
 
-@dataclass(eq=False)
+@dataclass(eq=False, slots=True)
 class Super(Expr):
     keyword: Token
     method: Token
+    # (kind, index) of the method's "super" and "this", filled in by the
+    # resolver
+    resolved: Tuple[int, int] | None = field(default=None, init=False, repr=False)
+    this: Tuple[int, int] | None = field(default=None, init=False, repr=False)
 
     def accept(self, visitor: ExprVisitor):
         return visitor.visit_super(self)
 
 
-@dataclass(eq=False)
+@dataclass(eq=False, slots=True)
 class This(Expr):
     keyword: Token
+    # (kind, index) of the method's "this", filled in by the resolver
+    resolved: Tuple[int, int] | None = field(default=None, init=False, repr=False)
 
     def accept(self, visitor: ExprVisitor):
         return visitor.visit_this(self)
 
 
-@dataclass(eq=False)
+@dataclass(eq=False, slots=True)
 class Unary(Expr):
     op: Token
     right: Expr
+    # Function of the operator (see lox.operators), bound once per node.
+    operate: Callable = field(init=False, repr=False, metadata=TRANSIENT)
+
+    def __post_init__(self):
+        self.operate = UNARY[self.op.type]
 
     def accept(self, visitor: ExprVisitor):
         return visitor.visit_unary(self)
 
 
-@dataclass(eq=False)
+@dataclass(eq=False, slots=True)
 class Variable(Expr):
     name: Token
+    # (kind, index) of a local variable, filled in by the resolver;
+    # None for a global.
+    resolved: Tuple[int, int] | None = field(default=None, init=False, repr=False)
+    # Slot of a global in the table whose layout version is global_version.
+    global_slot: int = field(default=0, init=False, repr=False, metadata=TRANSIENT)
+    global_version: int = field(default=-1, init=False, repr=False, metadata=TRANSIENT)
 
     def accept(self, visitor: ExprVisitor):
         return visitor.visit_variable(self)
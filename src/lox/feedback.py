@@ -0,0 +1,175 @@
+"""Type feedback profiles, to warm-start a script where its last run ended.
+
+A profile records what a run of a script learned at runtime:
+
+- the function each ``Binary`` and ``Unary`` node was quickened to (see
+  ``lox.operators``), keyed by the source offset of its operator token;
+- the functions whose lazily parsed bodies were called, keyed by the
+  offset of their name.
+
+Loading it into a later run of the same source rebinds those nodes and
+loads those bodies before the program starts, so the run skips the
+relearning. Profiles are JSON and carry a hash of the source they were
+recorded from; one recorded from other source is ignored.
+"""
+
+import hashlib
+import json
+import logging
+from dataclasses import fields
+from typing import Dict, Iterator, List, Set, TextIO
+
+from lox import operators
+from lox.abc import Expr, Stmt
+from lox.expr import Binary, Unary
+from lox.interpreter import Interpreter
+from lox.operators import BINARY, UNARY
+from lox.stmt import Function
+
+logger = logging.getLogger(__name__)
+
+# Bumped whenever the recorded feedback changes shape.
+FORMAT = 1
+# Characters hashed at a time when the source is a file.
+CHUNK_SIZE = 1 << 16
+
+# The functions a node may be bound to, by name, as profiles store them:
+# each operator's entry, what it quickens to and its unchecked function.
+# Names of anything else, or of the other kind of node, are ignored.
+BINARY_OPERATORS = {
+    function.__name__: function
+    for function in (
+        *BINARY.values(),
+        operators.add_floats,
+        operators.concatenate,
+        operators.add_any,
+        operators.add_unchecked,
+        operators.subtract_floats,
+        operators.subtract_any,
+        operators.subtract_unchecked,
+        operators.multiply_floats,
+        operators.multiply_any,
+        operators.multiply_unchecked,
+        operators.divide_floats,
+        operators.divide_any,
+        operators.divide_unchecked,
+        operators.greater_floats,
+        operators.greater_any,
+        operators.greater_equal_floats,
+        operators.greater_equal_any,
+        operators.less_floats,
+        operators.less_any,
+        operators.less_equal_floats,
+        operators.less_equal_any,
+    )
+}
+UNARY_OPERATORS = {
+    function.__name__: function
+    for function in (
+        *UNARY.values(),
+        operators.negate_float,
+        operators.negate_any,
+        operators.negate_unchecked,
+    )
+}
+
+
+def source_digest(source: str | TextIO) -> str:
+    """The hash of ``source``, or of the rest of a text file, read a chunk
+    at a time."""
+    if isinstance(source, str):
+        return hashlib.sha256(source.encode()).hexdigest()
+    digest = hashlib.sha256()
+    for chunk in iter(lambda: source.read(CHUNK_SIZE), ""):
+        digest.update(chunk.encode())
+    return digest.hexdigest()
+
+
+def walk(statements: List[Stmt]) -> Iterator[Expr | Stmt]:
+    """Every node of a program, including the function bodies parsed so far."""
+    stack: list = [statements]
+    while stack:
+        obj = stack.pop()
+        if isinstance(obj, (Expr, Stmt)):
+            yield obj
+            stack.extend(getattr(obj, field.name) for field in fields(obj))
+        elif isinstance(obj, list):
+            stack.extend(obj)
+
+
+class Profile:
+    def __init__(
+        self,
+        digest: str,
+        operators: Dict[int, str] | None = None,
+        functions: Set[int] | None = None,
+    ) -> None:
+        self.digest = digest
+        # Operator token offset -> name of the function its node runs.
+        self.operators = operators or {}
+        # Name token offsets of the lazily parsed functions that ran.
+        self.functions = functions or set()
+
+    @classmethod
+    def record(cls, digest: str, statements: List[Stmt]) -> "Profile":
+        profile = cls(digest)
+        for node in walk(statements):
+            if isinstance(node, Binary):
+                if node.operate is not BINARY[node.op.type]:
+                    profile.operators[node.op.offset] = node.operate.__name__
+            elif isinstance(node, Unary):
+                if node.operate is not UNARY[node.op.type]:
+                    profile.operators[node.op.offset] = node.operate.__name__
+            elif isinstance(node, Function):
+                if node.lazy_body is not None and node.body is not None:
+                    profile.functions.add(node.name.offset)
+        return profile
+
+    def apply(self, statements: List[Stmt], interpreter: Interpreter) -> None:
+        """Load the recorded bodies, then quicken the recorded nodes."""
+        bodies = sites = 0
+        # Loading a body makes its nodes part of the walk.
+        for node in walk(statements):
+            if isinstance(node, Function):
+                if node.body is None and node.name.offset in self.functions:
+                    interpreter.load_body(node)
+                    bodies += 1
+            elif isinstance(node, (Binary, Unary)):
+                table = (
+                    BINARY_OPERATORS if isinstance(node, Binary) else UNARY_OPERATORS
+                )
+                function = table.get(self.operators.get(node.op.offset))
+                if function is not None:
+                    node.operate = function
+                    sites += 1
+        logger.debug(f"Profile: {sites} operator sites, {bodies} function bodies")
+
+    def save(self, path: str) -> None:
+        data = {
+            "format": FORMAT,
+            "source": self.digest,
+            "operators": {str(offset): name for offset, name in self.operators.items()},
+            "functions": sorted(self.functions),
+        }
+        with open(path, "w") as file:
+            json.dump(data, file, indent=1)
+
+    @classmethod
+    def load(cls, path: str, digest: str) -> "Profile":
+        """The profile at ``path``; empty if it cannot be read or was recorded
+        from other source."""
+        try:
+            with open(path, "r") as file:
+                data = json.load(file)
+            if data.get("format") != FORMAT or data.get("source") != digest:
+                logger.warning(f"Ignoring profile {path}: recorded from other source.")
+                return cls(digest)
+            return cls(
+                digest,
+                {int(offset): str(name) for offset, name in data["operators"].items()},
+                set(data["functions"]),
+            )
+        except (OSError, ValueError, KeyError, AttributeError, TypeError) as e:
+            # Missing, truncated or not a profile at all.
+            logger.warning(f"Ignoring profile {path}: cannot be read ({e}).")
+            return cls(digest)
@@ -4,8 +4,8 @@ import time
 from typing import TYPE_CHECKING, Dict, List
 
 from lox.abc import LoxCallable
-from lox.environment import Environment
-from lox.error import ReturnException
+from lox.environment import Cell
+from lox.error import PloxRuntimeError, ReturnException
 from lox.token import Token
 
 if TYPE_CHECKING:
@@ -31,27 +31,80 @@ class Clock(LoxCallable):
 
 
 class LoxFunction(LoxCallable):
+    """A closure: a function declaration and the cells it captured.
+
+    A method also keeps the superclass of its class, and once bound to an
+    instance, the values of its hidden "this" and "super" locals.
+    """
+
     def __init__(
-        self, declaration: Function, closure: Environment, is_initializer: bool
+        self,
+        declaration: Function,
+        upvalues: List[Cell],
+        is_initializer: bool,
+        super_cls: LoxClass | None = None,
+        bound: List[object] | None = None,
     ) -> None:
         self.declaration = declaration
-        self.closure: Environment = closure
+        self.upvalues = upvalues
         self.is_initializer = is_initializer
+        self.super_cls = super_cls
+        self.bound = bound
 
     def __call__(self, interpreter: Interpreter, arguments: List[object]) -> object:
-        environment: Environment = Environment(enclosing=self.closure)
-        for i in range(len(self.declaration.params)):
-            environment.define(self.declaration.params[i].lexeme, arguments[i])
-
+        declaration = self.declaration
+        if declaration.body is None:
+            interpreter.load_body(declaration)
+        frame = interpreter.frames.acquire(declaration.frame_size)
+        start = self.first_param()
+        frame[start : start + len(arguments)] = arguments
+        return self.run(interpreter, frame)
+
+    def first_param(self) -> int:
+        """Slot of the first parameter in a call's frame.
+
+        A bound method's frame starts with "this" (and "super"), then come
+        the parameters, then every local of the body's blocks.
+        """
+        if self.bound is None:
+            return 0
+        return len(self.bound)
+
+    def run(self, interpreter: Interpreter, frame: List[object]) -> object:
+        """Run the body in a pooled ``frame`` whose parameters are filled in.
+
+        The frame goes back to the pool once the call is over. This is the
+        hot path of every call, so the frame switch of ``execute_block``
+        and the pool's ``release`` are inlined here.
+        """
+        declaration = self.declaration
+        if self.bound is not None:
+            frame[: len(self.bound)] = self.bound
+        for slot in declaration.cells:
+            frame[slot] = Cell(frame[slot])
+
+        previous_frame = interpreter.frame
+        previous_upvalues = interpreter.upvalues
+        interpreter.frame = frame
+        interpreter.upvalues = self.upvalues
+        value = None
         try:
-            interpreter.execute_block(self.declaration.body, environment)
+            for statement in declaration.body:
+                # Only a return completes a function body early.
+                if statement.accept(interpreter) is not None:
+                    value = interpreter.returned
+                    break
         except ReturnException as return_value:
-            if self.is_initializer:
-                return self.closure.get_at(0, "this")
-            return return_value.value
+            value = return_value.value
+        finally:
+            interpreter.frame = previous_frame
+            interpreter.upvalues = previous_upvalues
+            blank, free = interpreter.frames.free[len(frame)]
+            frame[:] = blank
+            free.append(frame)
         if self.is_initializer:
-            return self.closure.get_at(0, "this")
-        return None
+            return self.bound[0]
+        return value
 
     def arity(self) -> int:
         return len(self.declaration.params)
@@ -63,9 +116,10 @@ class LoxFunction(LoxCallable):
         return self.__str__()
 
     def bind(self, instance: LoxInstance):
-        env = Environment(enclosing=self.closure)
-        env.define("this", instance)
-        return LoxFunction(self.declaration, env, self.is_initializer)
+        bound = [instance] if self.super_cls is None else [instance, self.super_cls]
+        return LoxFunction(
+            self.declaration, self.upvalues, self.is_initializer, self.super_cls, bound
+        )
 
 
 class LoxClass(LoxCallable):
@@ -124,7 +178,7 @@ class LoxInstance(LoxCallable):
         if method is not None:
             return method.bind(self)
 
-        raise Exception(f"Undefined property '{name.lexeme}'.")
+        raise PloxRuntimeError(name, f"Undefined property '{name.lexeme}'.")
 
     def __setitem__(self, name: Token, value: object) -> None:
         self.fields[name.lexeme] = value
@@ -0,0 +1,300 @@
+"""Static type inference for check-free arithmetic in the tree-walker.
+
+An optional pass over a resolved program. It infers which local
+variables and expressions always hold numbers, or always strings, and
+binds every operator node whose operands are proven to be of one such
+type to a function that does not check them (see ``lox.operators``).
+Other nodes keep quickening at runtime.
+
+Only locals read straight from their frame (``LOCAL``) are inferred:
+such a variable is written by nothing but its declaration and the
+assignments in its own function. Its type is the join of the types of
+all of them, computed by re-running the pass until no type changes.
+Parameters, captured variables, globals and the results of calls,
+property reads and lazily parsed bodies are unknown.
+"""
+
+from typing import Dict, List, Set, Tuple
+
+from lox import operators
+from lox.abc import Stmt
+from lox.environment import LOCAL
+from lox.expr import (
+    Assign,
+    Binary,
+    Call,
+    Get,
+    Grouping,
+    Literal,
+    Logical,
+    Set,
+    Super,
+    This,
+    Unary,
+    Variable,
+)
+from lox.stmt import (
+    Block,
+    Class,
+    Expression,
+    For,
+    Function,
+    If,
+    Print,
+    Return,
+    Var,
+    While,
+)
+from lox.token import TokenType
+from lox.visitor import ExprVisitor, StmtVisitor
+
+# Types are the Python types of Lox values, plus these two. Nothing is
+# known of a variable until a definition is seen (NOTHING), and
+# UNKNOWN is any value at all.
+NOTHING = None
+UNKNOWN = object
+NUMBER = float
+STRING = str
+BOOLEAN = bool
+NIL = type(None)
+
+# Check-free functions for operands proven to be two numbers or two
+# strings. Comparisons never check types.
+NUMBERS = {
+    TokenType.MINUS: operators.subtract_unchecked,
+    TokenType.STAR: operators.multiply_unchecked,
+    TokenType.SLASH: operators.divide_unchecked,
+    TokenType.PLUS: operators.add_unchecked,
+    TokenType.GREATER: operators.greater_any,
+    TokenType.GREATER_EQUAL: operators.greater_equal_any,
+    TokenType.LESS: operators.less_any,
+    TokenType.LESS_EQUAL: operators.less_equal_any,
+}
+STRINGS = {
+    TokenType.PLUS: operators.add_unchecked,
+    TokenType.GREATER: operators.greater_any,
+    TokenType.GREATER_EQUAL: operators.greater_equal_any,
+    TokenType.LESS: operators.less_any,
+    TokenType.LESS_EQUAL: operators.less_equal_any,
+}
+
+
+def join(a: type | None, b: type | None) -> type | None:
+    if a is NOTHING:
+        return b
+    if b is NOTHING or a is b:
+        return a
+    return UNKNOWN
+
+
+class InferenceReport:
+    """Operator sites that check operand types, and how many of them were
+    proven monomorphic and so no longer check."""
+
+    def __init__(self) -> None:
+        self.sites = 0
+        self.monomorphic = 0
+
+    def __str__(self) -> str:
+        return (
+            f"Type inference: {self.monomorphic} of {self.sites} operator sites "
+            "proven monomorphic"
+        )
+
+
+class TypeInference(ExprVisitor, StmtVisitor):
+    """Visiting an expression returns its type; visiting a statement
+    joins the types of the locals it defines into ``types``."""
+
+    def __init__(self) -> None:
+        # (node owning a frame, slot) -> type of a local variable.
+        self.types: Dict[Tuple[Stmt, int], type | None] = {}
+        # The slots "var" declares. Any other slot's first value is unknown
+        # (a parameter, "this", a local function or class), whatever is
+        # assigned to it later.
+        self.declared: Set[Tuple[Stmt, int]] = set()
+        self.owner: Stmt | None = None
+        self.changed = False
+        self.report: InferenceReport | None = None
+
+    def infer(self, statements: List[Stmt]) -> InferenceReport:
+        """Infer the types of a resolved program and annotate its nodes."""
+        self.changed = True
+        while self.changed:
+            self.changed = False
+            self._statements(statements)
+        self.report = InferenceReport()
+        self._statements(statements)
+        report, self.report = self.report, None
+        return report
+
+    def _statements(self, statements: List[Stmt]):
+        for statement in statements:
+            statement.accept(self)
+
+    def _in_frame(self, owner: Stmt, statements: List[Stmt]):
+        previous = self.owner
+        self.owner = owner
+        try:
+            self._statements(statements)
+        finally:
+            self.owner = previous
+
+    def _define(self, slot: int, kind: type | None):
+        key = (self.owner, slot)
+        previous = self.types.get(key, NOTHING)
+        joined = join(previous, kind)
+        if joined is not previous:
+            self.types[key] = joined
+            self.changed = True
+
+    def _read(self, resolved: Tuple[int, int] | None) -> type | None:
+        if resolved is None or resolved[0] != LOCAL:
+            return UNKNOWN
+        key = (self.owner, resolved[1])
+        if key not in self.declared:
+            return UNKNOWN
+        return self.types.get(key, UNKNOWN)
+
+    # Statements
+
+    def visit_print(self, stmt: Print):
+        stmt.expression.accept(self)
+
+    def visit_expression(self, stmt: Expression):
+        stmt.expression.accept(self)
+
+    def visit_var(self, stmt: Var):
+        kind = NIL if stmt.initializer is None else stmt.initializer.accept(self)
+        if stmt.slot is not None and not stmt.cell:
+            self.declared.add((self.owner, stmt.slot))
+            self._define(stmt.slot, kind)
+
+    def visit_block(self, stmt: Block):
+        if stmt.frame_size is None:
+            self._statements(stmt.statements)
+        else:
+            self._in_frame(stmt, stmt.statements)
+
+    def visit_if(self, stmt: If):
+        stmt.condition.accept(self)
+        stmt.then_branch.accept(self)
+        if stmt.else_branch is not None:
+            stmt.else_branch.accept(self)
+
+    def visit_while(self, stmt: While):
+        stmt.condition.accept(self)
+        stmt.body.accept(self)
+
+    def visit_for(self, stmt: For):
+        parts = [stmt.initializer, stmt.condition, stmt.body, stmt.increment]
+        parts = [part for part in parts if part is not None]
+        if stmt.frame_size is None:
+            for part in parts:
+                part.accept(self)
+        else:
+            self._in_frame(stmt, parts)
+
+    def visit_break(self, stmt):
+        pass
+
+    def visit_continue(self, stmt):
+        pass
+
+    def visit_function(self, stmt: Function):
+        if stmt.body is not None:
+            self._in_frame(stmt, stmt.body)
+
+    def visit_return(self, stmt: Return):
+        if stmt.value is not None:
+            stmt.value.accept(self)
+
+    def visit_class(self, stmt: Class):
+        if stmt.super_cls is not None:
+            stmt.super_cls.accept(self)
+        for method in stmt.methods:
+            method.accept(self)
+
+    # Expressions
+
+    def visit_literal(self, expr: Literal):
+        return type(expr.value)
+
+    def visit_grouping(self, expr: Grouping):
+        return expr.expression.accept(self)
+
+    def visit_variable(self, expr: Variable):
+        return self._read(expr.resolved)
+
+    def visit_assign(self, expr: Assign):
+        kind = expr.value.accept(self)
+        resolved = expr.resolved
+        if resolved is not None and resolved[0] == LOCAL:
+            self._define(resolved[1], kind)
+        return kind
+
+    def visit_logical(self, expr: Logical):
+        # The value of either operand.
+        return join(expr.left.accept(self), expr.right.accept(self))
+
+    def visit_unary(self, expr: Unary):
+        right = expr.right.accept(self)
+        if expr.op.type == TokenType.BANG:
+            return BOOLEAN
+        # A negation that does not fail makes a number.
+        if self.report is not None:
+            self.report.sites += 1
+            if right is NUMBER:
+                self.report.monomorphic += 1
+                expr.operate = operators.negate_unchecked
+        return NUMBER
+
+    def visit_binary(self, expr: Binary):
+        left = expr.left.accept(self)
+        right = expr.right.accept(self)
+        op = expr.op.type
+        if self.report is not None and op in NUMBERS:
+            self.report.sites += 1
+            function = None
+            if left is NUMBER and right is NUMBER:
+                function = NUMBERS[op]
+            elif left is STRING and right is STRING:
+                function = STRINGS.get(op)
+            if function is not None:
+                self.report.monomorphic += 1
+                expr.operate = function
+        if op in (TokenType.MINUS, TokenType.STAR, TokenType.SLASH):
+            return NUMBER
+        if op == TokenType.PLUS:
+            # Only two numbers or two strings add up, so one known operand
+            # tells the type of a sum that does not fail.
+            if left in (NUMBER, STRING):
+                return left
+            if right in (NUMBER, STRING):
+                return right
+            return UNKNOWN
+        return BOOLEAN
+
+    def visit_call(self, expr: Call):
+        expr.callee.accept(self)
+        for argument in expr.arguments:
+            argument.accept(self)
+        return UNKNOWN
+
+    def visit_get(self, expr: Get):
+        expr.object.accept(self)
+        return UNKNOWN
+
+    def visit_set(self, expr: Set):
+        expr.object.accept(self)
+        return expr.value.accept(self)
+
+    def visit_this(self, expr: This):
+        return UNKNOWN
+
+    def visit_super(self, expr: Super):
+        return UNKNOWN
+
+
+def infer_types(statements: List[Stmt]) -> InferenceReport:
+    return TypeInference().infer(statements)
@@ -1,9 +1,11 @@
-from typing import Dict, List, Union
+from typing import Dict, List, Tuple, Union
 
+from lox import error
 from lox.abc import Expr, Stmt
-from lox.environment import Environment
+from lox.environment import CELL, LOCAL, Cell, Environment, FramePool
 from lox.error import (
     BreakException,
+    Completion,
     ContinueException,
     PloxRuntimeError,
     ReturnException,
@@ -23,11 +25,13 @@ from lox.expr import (
     Variable,
 )
 from lox.functions import Clock, LoxCallable, LoxClass, LoxFunction, LoxInstance
+from lox.operators import Quickening
 from lox.stmt import (
     Block,
     Class,
     Continue,
     Expression,
+    For,
     Function,
     If,
     Print,
@@ -38,12 +42,28 @@ from lox.stmt import (
 from lox.token import Token, TokenType
 from lox.visitor import ExprVisitor, StmtVisitor
 
+BREAK = Completion.BREAK
+CONTINUE = Completion.CONTINUE
+RETURN = Completion.RETURN
+
 
 class Interpreter(ExprVisitor, StmtVisitor):
+    """Walks the resolved AST.
+
+    Executing a statement returns its completion: None when it ran to its
+    end, otherwise the ``Completion`` that blocks, loops and function
+    bodies pass on or stop at.
+    """
+
     def __init__(self) -> None:
         self.globals = Environment()
-        self.environment = self.globals
-        self.locals: Dict[Expr, int] = {}
+        # The running call's frame and its closure's upvalues (see Resolver).
+        self.frame: list = []
+        self.upvalues: List[Cell] = []
+        self.frames = FramePool()
+        self.quickening = Quickening()
+        # The value of the last RETURN completion.
+        self.returned: object = None
 
         self.globals.define("clock", Clock())
 
@@ -64,18 +84,35 @@ class Interpreter(ExprVisitor, StmtVisitor):
             value = self.evaluate(stmt.initializer)
         else:
             value = None
-        self.environment.define(stmt.name.lexeme, value)
+        self.define(stmt, value)
         return None
 
+    def define(self, stmt: Var | Function | Class, value: object):
+        if stmt.slot is None:
+            self.globals.define(stmt.name.lexeme, value)
+        elif stmt.cell:
+            # A fresh cell each time the declaration runs, so closures made
+            # in different loop iterations do not share the variable.
+            self.frame[stmt.slot] = Cell(value)
+        else:
+            # A local declaration always runs in the frame holding its slot.
+            self.frame[stmt.slot] = value
+
     def visit_block(self, stmt: Block):
-        self.execute_block(stmt.statements, Environment(enclosing=self.environment))
-        return None
+        if stmt.frame_size is None:
+            for statement in stmt.statements:
+                completion = statement.accept(self)
+                if completion is not None:
+                    return completion
+            return None
+        frame = [None] * stmt.frame_size
+        return self.execute_block(stmt.statements, frame, self.upvalues)
 
     def visit_if(self, stmt: If):
         if self._is_truthy(self.evaluate(stmt.condition)):
-            self.execute(stmt.then_branch)
+            return stmt.then_branch.accept(self)
         elif stmt.else_branch is not None:
-            self.execute(stmt.else_branch)
+            return stmt.else_branch.accept(self)
         return None
 
     def visit_logical(self, expr: Binary):
@@ -93,29 +130,83 @@ class Interpreter(ExprVisitor, StmtVisitor):
 
     def visit_while(self, stmt: While):
         while self._is_truthy(self.evaluate(stmt.condition)):
-            try:
-                self.execute(stmt.body)
-            except ContinueException:
-                # Skip remainder of the body and reevaluate condition
-                continue
-            except BreakException:
-                break
+            completion = stmt.body.accept(self)
+            # CONTINUE just skips the remainder of the body.
+            if completion is not None and completion is not CONTINUE:
+                if completion is BREAK:
+                    break
+                return completion
+        return None
+
+    def visit_for(self, stmt: For):
+        if stmt.frame_size is None:
+            if stmt.initializer is not None:
+                self.execute(stmt.initializer)
+            return self._loop(stmt)
+
+        # One frame holds the loop variable for every iteration.
+        previous_frame = self.frame
+        try:
+            self.frame = [None] * stmt.frame_size
+            self.execute(stmt.initializer)
+            return self._loop(stmt)
+        finally:
+            self.frame = previous_frame
+
+    def _loop(self, stmt: For):
+        while stmt.condition is None or self._is_truthy(self.evaluate(stmt.condition)):
+            completion = stmt.body.accept(self)
+            # CONTINUE skips the remainder of the body but still runs the
+            # increment.
+            if completion is not None and completion is not CONTINUE:
+                if completion is BREAK:
+                    break
+                return completion
+            if stmt.increment is not None:
+                self.evaluate(stmt.increment)
         return None
 
     def visit_break(self, stmt):
-        raise BreakException()
+        return BREAK
 
     def visit_continue(self, stmt: Continue):
-        raise ContinueException()
+        return CONTINUE
 
-    def execute_block(self, statements: List[Stmt], environment: Environment):
-        previous_env = self.environment
+    def execute_block(self, statements: List[Stmt], frame: list, upvalues: List[Cell]):
+        previous_frame = self.frame
+        previous_upvalues = self.upvalues
         try:
-            self.environment = environment
+            self.frame = frame
+            self.upvalues = upvalues
             for statement in statements:
-                self.execute(statement)
+                completion = statement.accept(self)
+                if completion is not None:
+                    return completion
+            return None
         finally:
-            self.environment = previous_env
+            self.frame = previous_frame
+            self.upvalues = previous_upvalues
+
+    def capture(self, func: Function) -> List[Cell]:
+        """The upvalues of a closure of ``func`` created here."""
+        frame = self.frame
+        upvalues = self.upvalues
+        return [
+            frame[index] if from_frame else upvalues[index]
+            for from_frame, index in func.captures
+        ]
+
+    def declare_cell(self, stmt: Function | Class) -> Cell | None:
+        """Put the cell of a captured local in place before its value exists.
+
+        A function or class can refer to itself, so its closures must
+        capture the cell before the declaration finishes.
+        """
+        if stmt.slot is None or not stmt.cell:
+            return None
+        cell = Cell()
+        self.frame[stmt.slot] = cell
+        return cell
 
     def visit_class(self, stmt: Class):
         super_cls = None
@@ -125,23 +216,20 @@ class Interpreter(ExprVisitor, StmtVisitor):
                 raise PloxRuntimeError(
                     stmt.super_cls.name, "Superclass must be a class."
                 )
-        self.environment.define(stmt.name.lexeme, None)
-
-        if stmt.super_cls is not None:
-            self.environment = Environment(enclosing=self.environment)
-            self.environment.define("super", super_cls)
 
+        cell = self.declare_cell(stmt)
         methods: Dict[str, LoxFunction] = {}
         for method in stmt.methods:
-            fun = LoxFunction(method, self.environment, method.name.lexeme == "init")
+            fun = LoxFunction(
+                method, self.capture(method), method.name.lexeme == "init", super_cls
+            )
             methods[method.name.lexeme] = fun
 
-        if super_cls is not None:
-            self.environment = self.environment.enclosing
-
-        self.environment.assign(
-            stmt.name, LoxClass(stmt.name.lexeme, super_cls, methods)
-        )
+        klass = LoxClass(stmt.name.lexeme, super_cls, methods)
+        if cell is None:
+            self.define(stmt, klass)
+        else:
+            cell.value = klass
 
     def visit_get(self, expr: Get):
         obj = self.evaluate(expr.object)
@@ -158,12 +246,11 @@ class Interpreter(ExprVisitor, StmtVisitor):
         return value
 
     def visit_this(self, expr: This):
-        return self.lookup_variable(expr, expr.keyword)
+        return self.read(expr.resolved)
 
     def visit_super(self, expr: Super):
-        distance = self.locals.get(expr)
-        super_cls: LoxClass = self.environment.get_at(distance, "super")
-        obj = self.environment.get_at(distance - 1, "this")
+        super_cls: LoxClass = self.read(expr.resolved)
+        obj = self.read(expr.this)
         method = super_cls.find_method(expr.method.lexeme)
         if method is None:
             raise PloxRuntimeError(
@@ -176,11 +263,22 @@ class Interpreter(ExprVisitor, StmtVisitor):
 
     def visit_assign(self, expr: Assign):
         value = self.evaluate(expr.value)
-        distance = self.locals.get(expr)
-        if distance is not None:
-            self.environment.assign_at(distance, expr.name, value)
-        else:
-            self.globals.assign(expr.name, value)
+        resolved = expr.resolved
+        if resolved is not None:
+            kind, index = resolved
+            if kind == LOCAL:
+                self.frame[index] = value
+            elif kind == CELL:
+                self.frame[index].value = value
+            else:
+                self.upvalues[index].value = value
+            return value
+
+        table = self.globals
+        if expr.global_version != table.version:
+            expr.global_slot = table.slot(expr.name)
+            expr.global_version = table.version
+        table.values[expr.global_slot] = value
         return value
 
     def visit_literal(self, expr: Literal):
@@ -193,14 +291,8 @@ class Interpreter(ExprVisitor, StmtVisitor):
         return expr.accept(self)
 
     def visit_unary(self, expr: Unary):
-        right = self.evaluate(expr.right)
-
-        if expr.op.type == TokenType.MINUS:
-            return -float(right)
-        elif expr.op.type == TokenType.BANG:
-            return not self._is_truthy(right)
-
-        return None
+        right = expr.right.accept(self)
+        return expr.operate(self, expr, right)
 
     def _is_truthy(self, value: object):
         """
@@ -214,48 +306,36 @@ class Interpreter(ExprVisitor, StmtVisitor):
         return True
 
     def visit_binary(self, expr: Binary):
-        left = self.evaluate(expr.left)
-        right = self.evaluate(expr.right)
-
-        match expr.op.type:
-            case TokenType.MINUS:
-                self.check(expr.op, [left, right])
-                return left - right
-            case TokenType.STAR:
-                self.check(expr.op, [left, right])
-                return left * right
-            case TokenType.SLASH:
-                self.check(expr.op, [left, right])
-                if right == 0:
-                    raise PloxRuntimeError(expr.op, "Division by zero.")
-                return left / right
-            case TokenType.PLUS:
-                if isinstance(left, float) and isinstance(right, float):
-                    return left + right
-                if isinstance(left, str) and isinstance(right, str):
-                    return left + right
-                raise PloxRuntimeError(
-                    expr.op, "Operands must be two numbers or two strings."
-                )
-            case TokenType.BANG_EQUAL:
-                # Since strings can be compared directly in Python, there is no need to check types here.
-                # Same for EQUAL_EQUAL, GREATER, GREATER_EQUAL, LESS, LESS_EQUAL, etc.
-                return left != right
-            case TokenType.EQUAL_EQUAL:
-                return left == right
-            case TokenType.GREATER:
-                return left > right
-            case TokenType.GREATER_EQUAL:
-                return left >= right
-            case TokenType.LESS:
-                return left < right
-            case TokenType.LESS_EQUAL:
-                return left <= right
-            case TokenType.COMMA:
-                return right
+        left = expr.left.accept(self)
+        right = expr.right.accept(self)
+        # Read once the operands ran: a recursive call in them may have
+        # quickened this very node.
+        return expr.operate(self, expr, left, right)
 
     def visit_call(self, expr: Call):
         callee = self.evaluate(expr.callee)
+        if type(callee) is LoxFunction:
+            declaration = callee.declaration
+            if declaration.body is not None and len(expr.arguments) == len(
+                declaration.params
+            ):
+                # Evaluate the arguments straight into a pooled frame
+                # (FramePool.acquire, inlined).
+                pool = self.frames
+                blank, free = pool.free.get(declaration.frame_size) or pool.add(
+                    declaration.frame_size
+                )
+                if free:
+                    pool.hits += 1
+                    frame = free.pop()
+                else:
+                    pool.misses += 1
+                    frame = list(blank)
+                slot = callee.first_param()
+                for argument in expr.arguments:
+                    frame[slot] = self.evaluate(argument)
+                    slot += 1
+                return callee.run(self, frame)
         arguments = [self.evaluate(arg) for arg in expr.arguments]
         if not isinstance(callee, LoxCallable):
             raise PloxRuntimeError(expr.paren, "Can only call functions and classes.")
@@ -268,22 +348,20 @@ class Interpreter(ExprVisitor, StmtVisitor):
         return func(self, arguments)
 
     def visit_function(self, stmt: Function):
-        fun = LoxFunction(stmt, self.environment, False)
-        self.environment.define(stmt.name.lexeme, fun)
+        cell = self.declare_cell(stmt)
+        fun = LoxFunction(stmt, self.capture(stmt), False)
+        if cell is None:
+            self.define(stmt, fun)
+        else:
+            cell.value = fun
         return None
 
     def visit_return(self, stmt: Return):
         value = None
         if stmt.value is not None:
             value = self.evaluate(stmt.value)
-        raise ReturnException(value)
-
-    def check(self, operator: Token, operands: Union[object, List[object]]):
-        if not isinstance(operands, list):
-            operands = [operands]
-        for op in operands:
-            if not isinstance(op, float):
-                raise PloxRuntimeError(operator, "Operand must be a number.")
+        self.returned = value
+        return RETURN
 
     def interpret(self, stmts: Union[Stmt, List[Stmt]]):
         if not isinstance(stmts, list):
@@ -295,8 +373,8 @@ class Interpreter(ExprVisitor, StmtVisitor):
             except PloxRuntimeError as error:
                 runtime_error(error)
 
-    def execute(self, stmt: Stmt):
-        stmt.accept(self)
+    def execute(self, stmt: Stmt) -> Completion | None:
+        return stmt.accept(self)
 
     def stringify(self, value: object):
         if value is None:
@@ -310,13 +388,86 @@ class Interpreter(ExprVisitor, StmtVisitor):
 
         return str(value)
 
-    def resolve(self, expr: Expr, depth: int):
-        self.locals[expr] = depth
+    def load_body(self, declaration: Function) -> None:
+        """Parse and resolve a lazily parsed function body before its first call.
 
-    def lookup_variable(self, expr: Expr, name: Token):
-        distance = self.locals.get(expr)
-        # Only local variables are resolved to a distance.
-        if distance is not None:
-            return self.environment.get_at(distance, name.lexeme)
-        else:
-            return self.globals.get(name)
+        Compile errors are reported as usual and abort the call.
+        """
+        from lox.resolver import Resolver  # the resolver imports this module
+
+        had_error = error.has_error
+        error.has_error = False
+        declaration.body = declaration.lazy_body.parse()
+        if not error.has_error:
+            Resolver(self).resolve_lazy_body(declaration)
+        failed = error.has_error
+        error.has_error = had_error or failed
+        if failed:
+            declaration.body = None
+            raise PloxRuntimeError(declaration.name, "Function body failed to compile.")
+
+    def lookup_variable(self, expr: Variable, name: Token):
+        resolved = expr.resolved
+        # Only local variables are resolved to a (kind, index).
+        if resolved is not None:
+            return self.read(resolved)
+
+        # Globals: one guard on the cached slot, then an index.
+        table = self.globals
+        if expr.global_version != table.version:
+            expr.global_slot = table.slot(name)
+            expr.global_version = table.version
+        return table.values[expr.global_slot]
+
+    def read(self, resolved: Tuple[int, int]):
+        kind, index = resolved
+        if kind == LOCAL:
+            return self.frame[index]
+        if kind == CELL:
+            return self.frame[index].value
+        return self.upvalues[index].value
+
+
+class ExceptionInterpreter(Interpreter):
+    """The tree-walker with exception-based control flow.
+
+    return, break and continue raise exceptions that function calls and
+    loops catch, instead of completing with a signal. Kept to measure the
+    two against each other (--engine=tree-exceptions).
+    """
+
+    def visit_while(self, stmt: While):
+        while self._is_truthy(self.evaluate(stmt.condition)):
+            try:
+                self.execute(stmt.body)
+            except ContinueException:
+                # Skip remainder of the body and reevaluate condition
+                continue
+            except BreakException:
+                break
+        return None
+
+    def _loop(self, stmt: For):
+        while stmt.condition is None or self._is_truthy(self.evaluate(stmt.condition)):
+            try:
+                self.execute(stmt.body)
+            except ContinueException:
+                # Skip remainder of the body but still run the increment
+                pass
+            except BreakException:
+                break
+            if stmt.increment is not None:
+                self.evaluate(stmt.increment)
+        return None
+
+    def visit_break(self, stmt):
+        raise BreakException()
+
+    def visit_continue(self, stmt: Continue):
+        raise ContinueException()
+
+    def visit_return(self, stmt: Return):
+        value = None
+        if stmt.value is not None:
+            value = self.evaluate(stmt.value)
+        raise ReturnException(value)
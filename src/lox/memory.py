@@ -0,0 +1,88 @@
+import sys
+from collections import Counter
+from dataclasses import fields
+from typing import List
+
+from lox.abc import Expr, Stmt
+from lox.parser import LazyBody
+from lox.token import Token
+
+
+class MemoryReport:
+    """Bytes held by an AST, split by what holds them.
+
+    Every object is counted once, however many nodes share it (interned
+    lexemes, literal values, the token list of a lazy body). Instance
+    ``__dict__``s are included, so an unslotted node class shows up here.
+    """
+
+    def __init__(self) -> None:
+        self.node_counts: Counter = Counter()
+        self.node_bytes: Counter = Counter()
+        self.token_count = 0
+        self.token_bytes = 0
+        self.list_bytes = 0
+        self.value_bytes = 0
+
+    @property
+    def total(self) -> int:
+        return (
+            sum(self.node_bytes.values())
+            + self.token_bytes
+            + self.list_bytes
+            + self.value_bytes
+        )
+
+    def __str__(self) -> str:
+        nodes = sum(self.node_counts.values())
+        lines = [
+            f"nodes:  {nodes:>10} {_kib(sum(self.node_bytes.values()))}",
+            f"tokens: {self.token_count:>10} {_kib(self.token_bytes)}",
+            f"lists:  {'':>10} {_kib(self.list_bytes)}",
+            f"values: {'':>10} {_kib(self.value_bytes)}",
+            f"total:  {'':>10} {_kib(self.total)}",
+        ]
+        for name, size in self.node_bytes.most_common():
+            lines.append(f"  {name:<12} {self.node_counts[name]:>10} {_kib(size)}")
+        return "\n".join(lines)
+
+
+def measure_ast(statements: List[Stmt]) -> MemoryReport:
+    report = MemoryReport()
+    seen = set()
+    stack: list = [statements]
+
+    while stack:
+        obj = stack.pop()
+        if id(obj) in seen:
+            continue
+        seen.add(id(obj))
+        size = sys.getsizeof(obj)
+        if hasattr(obj, "__dict__"):
+            size += sys.getsizeof(obj.__dict__)
+
+        if isinstance(obj, (Expr, Stmt)):
+            name = type(obj).__name__
+            report.node_counts[name] += 1
+            report.node_bytes[name] += size
+            stack.extend(getattr(obj, field.name) for field in fields(obj))
+        elif isinstance(obj, Token):
+            report.token_count += 1
+            report.token_bytes += size
+            stack.append(obj.lexeme)
+            stack.append(obj.literal)
+        elif isinstance(obj, list):
+            report.list_bytes += size
+            stack.extend(obj)
+        elif isinstance(obj, LazyBody):
+            report.value_bytes += size
+            stack.append(obj.tokens)
+            stack.append(obj.statements)
+        elif obj is not None and not isinstance(obj, bool):
+            report.value_bytes += size
+
+    return report
+
+
+def _kib(size: int) -> str:
+    return f"{size / 1024:>12,.1f} KiB"
@@ -0,0 +1,322 @@
+"""Operator functions of the tree-walker, and their quickening.
+
+Each ``Binary`` and ``Unary`` node is bound to the function of its
+operator when it is created, so evaluating one calls it directly instead
+of dispatching on the operator's token type. Every function takes the
+interpreter, whose ``quickening`` counts what happens to the node, then
+the node, to report runtime errors at its operator, then the operand
+values.
+
+A node starts out on its operator's entry in ``BINARY`` or ``UNARY``,
+which looks at the operand types of the first evaluation and rewrites
+the node to a function specialized for them (say ``add_floats``), or to
+the generic one (``add_any``) when there is none. A specialized function
+checks its guess on every evaluation; once it is wrong the node
+deoptimizes to the generic function for good, so a site that sees
+several types settles instead of flip-flopping.
+
+The ``*_unchecked`` functions check no types at all. Only sites whose
+operand types were proven statically are bound to them (see
+``lox.inference``).
+"""
+
+from __future__ import annotations
+
+from typing import TYPE_CHECKING, Callable, Dict
+
+from lox.abc import Expr
+from lox.error import PloxRuntimeError
+from lox.token import TokenType
+
+if TYPE_CHECKING:
+    from lox.interpreter import Interpreter
+
+
+class Quickening:
+    """Counts of the nodes specialized to their operand types, and of the
+    specialized ones that deoptimized since."""
+
+    __slots__ = ("specializations", "deopts")
+
+    def __init__(self) -> None:
+        self.specializations = 0
+        self.deopts = 0
+
+
+def specialize(interpreter: Interpreter, expr: Expr, function: Callable) -> None:
+    expr.operate = function
+    interpreter.quickening.specializations += 1
+
+
+def deoptimize(interpreter: Interpreter, expr: Expr, function: Callable) -> None:
+    expr.operate = function
+    interpreter.quickening.deopts += 1
+
+
+def _quicken_floats(
+    interpreter: Interpreter,
+    expr: Expr,
+    left: object,
+    right: object,
+    floats: Callable,
+    generic: Callable,
+):
+    """The entry of an operator only specialized to two numbers."""
+    if type(left) is float and type(right) is float:
+        specialize(interpreter, expr, floats)
+        return floats(interpreter, expr, left, right)
+    expr.operate = generic
+    return generic(interpreter, expr, left, right)
+
+
+def _deoptimize(
+    interpreter: Interpreter, expr: Expr, left: object, right: object, generic: Callable
+):
+    deoptimize(interpreter, expr, generic)
+    return generic(interpreter, expr, left, right)
+
+
+# +
+
+
+def add(interpreter: Interpreter, expr: Expr, left: object, right: object):
+    kind = type(left)
+    if kind is type(right):
+        if kind is float:
+            specialize(interpreter, expr, add_floats)
+            return left + right
+        if kind is str:
+            specialize(interpreter, expr, concatenate)
+            return left + right
+    expr.operate = add_any
+    return add_any(interpreter, expr, left, right)
+
+
+def add_floats(interpreter: Interpreter, expr: Expr, left: object, right: object):
+    if type(left) is float and type(right) is float:
+        return left + right
+    return _deoptimize(interpreter, expr, left, right, add_any)
+
+
+def concatenate(interpreter: Interpreter, expr: Expr, left: object, right: object):
+    if type(left) is str and type(right) is str:
+        return left + right
+    return _deoptimize(interpreter, expr, left, right, add_any)
+
+
+def add_any(interpreter: Interpreter, expr: Expr, left: object, right: object):
+    kind = type(left)
+    if kind is type(right) and (kind is float or kind is str):
+        return left + right
+    raise PloxRuntimeError(expr.op, "Operands must be two numbers or two strings.")
+
+
+def add_unchecked(interpreter: Interpreter, expr: Expr, left: object, right: object):
+    return left + right
+
+
+# - * /
+
+
+def subtract(interpreter: Interpreter, expr: Expr, left: object, right: object):
+    return _quicken_floats(
+        interpreter, expr, left, right, subtract_floats, subtract_any
+    )
+
+
+def subtract_floats(interpreter: Interpreter, expr: Expr, left: object, right: object):
+    if type(left) is float and type(right) is float:
+        return left - right
+    return _deoptimize(interpreter, expr, left, right, subtract_any)
+
+
+def subtract_any(interpreter: Interpreter, expr: Expr, left: object, right: object):
+    if type(left) is float and type(right) is float:
+        return left - right
+    raise PloxRuntimeError(expr.op, "Operand must be a number.")
+
+
+def subtract_unchecked(
+    interpreter: Interpreter, expr: Expr, left: object, right: object
+):
+    return left - right
+
+
+def multiply(interpreter: Interpreter, expr: Expr, left: object, right: object):
+    return _quicken_floats(
+        interpreter, expr, left, right, multiply_floats, multiply_any
+    )
+
+
+def multiply_floats(interpreter: Interpreter, expr: Expr, left: object, right: object):
+    if type(left) is float and type(right) is float:
+        return left * right
+    return _deoptimize(interpreter, expr, left, right, multiply_any)
+
+
+def multiply_any(interpreter: Interpreter, expr: Expr, left: object, right: object):
+    if type(left) is float and type(right) is float:
+        return left * right
+    raise PloxRuntimeError(expr.op, "Operand must be a number.")
+
+
+def multiply_unchecked(
+    interpreter: Interpreter, expr: Expr, left: object, right: object
+):
+    return left * right
+
+
+def divide(interpreter: Interpreter, expr: Expr, left: object, right: object):
+    return _quicken_floats(interpreter, expr, left, right, divide_floats, divide_any)
+
+
+def divide_floats(interpreter: Interpreter, expr: Expr, left: object, right: object):
+    if type(left) is float and type(right) is float and right:
+        return left / right
+    # Division by zero is reported by the generic function too.
+    return _deoptimize(interpreter, expr, left, right, divide_any)
+
+
+def divide_any(interpreter: Interpreter, expr: Expr, left: object, right: object):
+    if type(left) is not float or type(right) is not float:
+        raise PloxRuntimeError(expr.op, "Operand must be a number.")
+    if right == 0:
+        raise PloxRuntimeError(expr.op, "Division by zero.")
+    return left / right
+
+
+def divide_unchecked(interpreter: Interpreter, expr: Expr, left: object, right: object):
+    if right:
+        return left / right
+    raise PloxRuntimeError(expr.op, "Division by zero.")
+
+
+# Comparisons. Strings can be compared directly in Python, so the generic
+# functions check no types; the specialized ones only guard their guess.
+
+
+def greater(interpreter: Interpreter, expr: Expr, left: object, right: object):
+    return _quicken_floats(interpreter, expr, left, right, greater_floats, greater_any)
+
+
+def greater_floats(interpreter: Interpreter, expr: Expr, left: object, right: object):
+    if type(left) is float and type(right) is float:
+        return left > right
+    return _deoptimize(interpreter, expr, left, right, greater_any)
+
+
+def greater_any(interpreter: Interpreter, expr: Expr, left: object, right: object):
+    return left > right
+
+
+def greater_equal(interpreter: Interpreter, expr: Expr, left: object, right: object):
+    return _quicken_floats(
+        interpreter, expr, left, right, greater_equal_floats, greater_equal_any
+    )
+
+
+def greater_equal_floats(
+    interpreter: Interpreter, expr: Expr, left: object, right: object
+):
+    if type(left) is float and type(right) is float:
+        return left >= right
+    return _deoptimize(interpreter, expr, left, right, greater_equal_any)
+
+
+def greater_equal_any(
+    interpreter: Interpreter, expr: Expr, left: object, right: object
+):
+    return left >= right
+
+
+def less(interpreter: Interpreter, expr: Expr, left: object, right: object):
+    return _quicken_floats(interpreter, expr, left, right, less_floats, less_any)
+
+
+def less_floats(interpreter: Interpreter, expr: Expr, left: object, right: object):
+    if type(left) is float and type(right) is float:
+        return left < right
+    return _deoptimize(interpreter, expr, left, right, less_any)
+
+
+def less_any(interpreter: Interpreter, expr: Expr, left: object, right: object):
+    return left < right
+
+
+def less_equal(interpreter: Interpreter, expr: Expr, left: object, right: object):
+    return _quicken_floats(
+        interpreter, expr, left, right, less_equal_floats, less_equal_any
+    )
+
+
+def less_equal_floats(
+    interpreter: Interpreter, expr: Expr, left: object, right: object
+):
+    if type(left) is float and type(right) is float:
+        return left <= right
+    return _deoptimize(interpreter, expr, left, right, less_equal_any)
+
+
+def less_equal_any(interpreter: Interpreter, expr: Expr, left: object, right: object):
+    return left <= right
+
+
+# Equality holds between any two values, so it has nothing to specialize.
+
+
+def not_equal(interpreter: Interpreter, expr: Expr, left: object, right: object):
+    return left != right
+
+
+def equal(interpreter: Interpreter, expr: Expr, left: object, right: object):
+    return left == right
+
+
+# Unary operators
+
+
+def negate(interpreter: Interpreter, expr: Expr, right: object):
+    if type(right) is float:
+        specialize(interpreter, expr, negate_float)
+        return -right
+    expr.operate = negate_any
+    return -float(right)
+
+
+def negate_float(interpreter: Interpreter, expr: Expr, right: object):
+    if type(right) is float:
+        return -right
+    deoptimize(interpreter, expr, negate_any)
+    return -float(right)
+
+
+def negate_any(interpreter: Interpreter, expr: Expr, right: object):
+    return -float(right)
+
+
+def negate_unchecked(interpreter: Interpreter, expr: Expr, right: object):
+    return -right
+
+
+def not_(interpreter: Interpreter, expr: Expr, right: object):
+    return right is None or right is False
+
+
+# The entry of each operator, which nodes start out on.
+BINARY: Dict[TokenType, Callable[[Interpreter, Expr, object, object], object]] = {
+    TokenType.MINUS: subtract,
+    TokenType.STAR: multiply,
+    TokenType.SLASH: divide,
+    TokenType.PLUS: add,
+    TokenType.BANG_EQUAL: not_equal,
+    TokenType.EQUAL_EQUAL: equal,
+    TokenType.GREATER: greater,
+    TokenType.GREATER_EQUAL: greater_equal,
+    TokenType.LESS: less,
+    TokenType.LESS_EQUAL: less_equal,
+}
+
+UNARY: Dict[TokenType, Callable[[Interpreter, Expr, object], object]] = {
+    TokenType.MINUS: negate,
+    TokenType.BANG: not_,
+}
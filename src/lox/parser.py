@@ -1,4 +1,5 @@
-from typing import List, Union
+from enum import IntEnum
+from typing import Dict, Iterable, List, Tuple, Union
 
 from lox.abc import Expr, Stmt
 from lox.error import error
@@ -22,6 +23,7 @@ from lox.stmt import (
     Class,
     Continue,
     Expression,
+    For,
     Function,
     If,
     Print,
@@ -36,11 +38,108 @@ class ParseError(Exception):
     pass
 
 
-class Parser:
-    def __init__(self, tokens: List[Token]) -> None:
+class Precedence(IntEnum):
+    NONE = 0
+    ASSIGNMENT = 1
+    OR = 2
+    AND = 3
+    EQUALITY = 4
+    COMPARISON = 5
+    TERM = 6
+    FACTOR = 7
+    UNARY = 8
+    CALL = 9
+
+
+# Binary operator -> (precedence, node class) used by Parser.binary.
+INFIX_RULES: Dict[TokenType, Tuple[Precedence, type]] = {
+    TokenType.OR: (Precedence.OR, Logical),
+    TokenType.AND: (Precedence.AND, Logical),
+    TokenType.BANG_EQUAL: (Precedence.EQUALITY, Binary),
+    TokenType.EQUAL_EQUAL: (Precedence.EQUALITY, Binary),
+    TokenType.GREATER: (Precedence.COMPARISON, Binary),
+    TokenType.GREATER_EQUAL: (Precedence.COMPARISON, Binary),
+    TokenType.LESS: (Precedence.COMPARISON, Binary),
+    TokenType.LESS_EQUAL: (Precedence.COMPARISON, Binary),
+    TokenType.MINUS: (Precedence.TERM, Binary),
+    TokenType.PLUS: (Precedence.TERM, Binary),
+    TokenType.SLASH: (Precedence.FACTOR, Binary),
+    TokenType.STAR: (Precedence.FACTOR, Binary),
+}
+
+KEYWORD_LITERALS = {
+    TokenType.FALSE: False,
+    TokenType.TRUE: True,
+    TokenType.NIL: None,
+}
+
+# Binary operators reported as "Missing left-hand operand." in prefix position.
+MISSING_OPERAND = {
+    TokenType.PLUS,
+    TokenType.SLASH,
+    TokenType.STAR,
+    TokenType.EQUAL_EQUAL,
+    TokenType.BANG_EQUAL,
+    TokenType.GREATER,
+    TokenType.GREATER_EQUAL,
+    TokenType.LESS,
+    TokenType.LESS_EQUAL,
+}
+
+
+class LazyBody:
+    """Function body whose parsing and resolution are deferred to first call.
+
+    In lazy mode the parser only records the tokens of a body up to its
+    matching ``}`` (with ``strict`` it parses the body right away, so syntax
+    errors are reported up front, and only resolution is deferred). The
+    resolver stores the scopes visible at the declaration so the body
+    resolves later exactly as it would have in place, and the upvalues of
+    the closure, which is created before the body is seen.
+    """
+
+    def __init__(
+        self,
+        tokens: List[Token] | None = None,
+        statements: List[Stmt] | None = None,
+        loop_depth: int = 0,
+    ) -> None:
         self.tokens = tokens
+        self.statements = statements
+        self.loop_depth = loop_depth
+        # Filled in by the resolver when it reaches the declaration.
+        self.scopes = None
+        self.function_type = None
+        self.class_type = None
+        # Scope of the function, with the upvalues its closure captures.
+        self.scope = None
+
+    def parse(self) -> List[Stmt] | None:
+        if self.statements is None:
+            parser = Parser(self.tokens, lazy=True)
+            parser.loop_depth = self.loop_depth
+            try:
+                self.statements = parser.block()
+            except ParseError:
+                return None
+            self.tokens = None
+        return self.statements
+
+
+class Parser:
+    def __init__(
+        self, tokens: Iterable[Token], lazy: bool = False, strict: bool = False
+    ) -> None:
+        # Tokens are consumed lazily; only the current and previous token are
+        # kept, so a streaming scanner can feed the parser directly.
+        self.tokens = iter(tokens)
         self.current = 0
         self.loop_depth = 0
+        # Defer function bodies to LazyBody; ``strict`` still parses them.
+        self.lazy = lazy
+        self.strict = strict
+        self._lookahead: Token = next(self.tokens)
+        self._previous: Token | None = None
 
     def parse(self) -> List[Stmt]:
         statements = []
@@ -107,9 +206,32 @@ class Parser:
 
         self.consume(TokenType.RIGHT_PAREN, "Expect ')' after parameters.")
         self.consume(TokenType.LEFT_BRACE, f"Expect '{{' before {kind} body.")
+        if self.lazy:
+            return Function(name, parameters, None, self.lazy_body())
         body = self.block()
         return Function(name, parameters, body)
 
+    def lazy_body(self) -> LazyBody:
+        """
+        Skip a function body up to its balancing "}" and record its tokens.
+        """
+        if self.strict:
+            return LazyBody(statements=self.block(), loop_depth=self.loop_depth)
+
+        tokens = []
+        depth = 1
+        while depth > 0:
+            if self.finished:
+                raise self.error(self.peek, "Expect '}' after block.")
+            token = self.advance()
+            tokens.append(token)
+            if token.type == TokenType.LEFT_BRACE:
+                depth += 1
+            elif token.type == TokenType.RIGHT_BRACE:
+                depth -= 1
+        tokens.append(Token(TokenType.EOF, "", None, token.line, token.offset))
+        return LazyBody(tokens=tokens, loop_depth=self.loop_depth)
+
     def var_decl(self) -> Stmt:
         """
         varDecl → "var" IDENTIFIER ( "=" expression )? ";" ;
@@ -225,33 +347,20 @@ class Parser:
         else:
             initializer = self.expression_statement()
 
-        if self.match(TokenType.SEMICOLON):
-            condition = None
-        else:
+        condition = None
+        if not self.check(TokenType.SEMICOLON):
             condition = self.expression()
         self.consume(TokenType.SEMICOLON, "Expect ';' after loop condition.")
 
-        if self.match(TokenType.SEMICOLON):
-            increment = None
-        else:
+        increment = None
+        if not self.check(TokenType.RIGHT_PAREN):
             increment = self.expression()
         self.consume(TokenType.RIGHT_PAREN, "Expect ')' after for clauses.")
 
         try:
             self.loop_depth += 1
             body = self.statement()
-
-            if increment is not None:
-                body = Block([body, Expression(increment)])
-
-            if condition is None:
-                condition = Literal(True)
-            body = While(condition, body)
-
-            if initializer is not None:
-                body = Block([initializer, body])
-
-            return body
+            return For(initializer, condition, increment, body)
         finally:
             self.loop_depth -= 1
 
@@ -281,7 +390,7 @@ class Parser:
         """
         assignment → ( call "." )? IDENTIFIER "=" assignment | logic_or ;
         """
-        expr = self.logic_or()
+        expr = self.binary(Precedence.OR)
 
         if self.match(TokenType.EQUAL):
             equals = self.previous
@@ -298,93 +407,36 @@ class Parser:
 
         return expr
 
-    def logic_or(self) -> Expr:
-        """
-        logic_or → logic_and ( "or" logic_and )*
-        """
-        expr = self.logic_and()
-        while self.match(TokenType.OR):
-            op = self.previous
-            right = self.logic_and()
-            expr = Logical(left=expr, op=op, right=right)
-        return expr
-
-    def logic_and(self) -> Expr:
-        """
-        logic_and → equality ( "and" equality )*
-        """
-        expr = self.equality()
-        while self.match(TokenType.AND):
-            op = self.previous
-            right = self.equality()
-            expr = Logical(left=expr, op=op, right=right)
-        return expr
-
-    def equality(self) -> Expr:
-        """
-        equality → comparison ( ( "!=" | "==" ) comparison )*
-        """
-        expr = self.comparison()
-
-        while self.match([TokenType.BANG_EQUAL, TokenType.EQUAL_EQUAL]):
-            op = self.previous
-            right = self.comparison()
-            expr = Binary(left=expr, op=op, right=right)
-
-        return expr
-
-    def comparison(self) -> Expr:
-        """
-        comparison → term ( ( ">" | ">=" | "<" | "<=" ) term )*
+    def binary(self, precedence: "Precedence") -> Expr:
         """
-        expr = self.term()
+        logic_or   → logic_and ( "or" logic_and )* ;
+        logic_and  → equality ( "and" equality )* ;
+        equality   → comparison ( ( "!=" | "==" ) comparison )* ;
+        comparison → term ( ( ">" | ">=" | "<" | "<=" ) term )* ;
+        term       → factor ( ( "-" | "+" ) factor )* ;
+        factor     → unary ( ( "/" | "*" ) unary )* ;
 
-        while self.match(
-            [
-                TokenType.GREATER,
-                TokenType.GREATER_EQUAL,
-                TokenType.LESS,
-                TokenType.LESS_EQUAL,
-            ]
-        ):
-            op = self.previous
-            right = self.term()
-            expr = Binary(left=expr, op=op, right=right)
-
-        return expr
-
-    def term(self) -> Expr:
-        """
-        term → factor ( ( "-" | "+" ) factor )*
-        """
-        expr = self.factor()
-
-        while self.match([TokenType.MINUS, TokenType.PLUS]):
-            op = self.previous
-            right = self.factor()
-            expr = Binary(left=expr, op=op, right=right)
-
-        return expr
-
-    def factor(self) -> Expr:
-        """
-        factor → unary ( ( "/" | "*" ) unary )*
+        All binary levels are parsed by precedence climbing over
+        ``INFIX_RULES``: operators binding at least as tightly as
+        ``precedence`` are folded left-associatively, and the right operand
+        is parsed one level higher.
         """
         expr = self.unary()
 
-        while self.match([TokenType.SLASH, TokenType.STAR]):
-            op = self.previous
-            right = self.unary()
-            expr = Binary(left=expr, op=op, right=right)
-
-        return expr
+        while True:
+            rule = INFIX_RULES.get(self.peek.type)
+            if rule is None or rule[0] < precedence:
+                return expr
+            op = self.advance()
+            right = self.binary(rule[0] + 1)
+            expr = rule[1](left=expr, op=op, right=right)
 
     def unary(self) -> Expr:
         """
         unary → ( "!" | "-" ) unary | call
         """
-        if self.match([TokenType.BANG, TokenType.MINUS]):
-            op = self.previous
+        if self.peek.type == TokenType.BANG or self.peek.type == TokenType.MINUS:
+            op = self.advance()
             right = self.unary()
             return Unary(op, right)
 
@@ -398,9 +450,11 @@ class Parser:
         expr = self.primary()
 
         while True:
-            if self.match(TokenType.LEFT_PAREN):
+            if self.peek.type == TokenType.LEFT_PAREN:
+                self.advance()
                 expr = self._finish_call(expr)
-            elif self.match(TokenType.DOT):
+            elif self.peek.type == TokenType.DOT:
+                self.advance()
                 name = self.consume(
                     TokenType.IDENTIFIER, "Expect property name after '.'."
                 )
@@ -429,61 +483,37 @@ class Parser:
         """
         primary → NUMBER | STRING | "true" | "false" | "nil" | "this" | "super" "." IDENTIFIER | "(" expression ")" | IDENTIFIER
         """
-        if self.match(TokenType.FALSE):
-            return Literal(False)
-        elif self.match(TokenType.TRUE):
-            return Literal(True)
-        elif self.match(TokenType.NIL):
-            return Literal(None)
-        elif self.match([TokenType.NUMBER, TokenType.STRING]):
-            return Literal(self.previous.literal)
-        elif self.match(TokenType.THIS):
-            return This(self.previous)
-        elif self.match(TokenType.SUPER):
-            keyword = self.previous
+        token = self.peek
+        if token.type == TokenType.IDENTIFIER:
+            self.advance()
+            return Variable(token)
+        elif token.type == TokenType.NUMBER or token.type == TokenType.STRING:
+            self.advance()
+            return Literal(token.literal)
+        elif token.type in KEYWORD_LITERALS:
+            self.advance()
+            return Literal(KEYWORD_LITERALS[token.type])
+        elif token.type == TokenType.THIS:
+            self.advance()
+            return This(token)
+        elif token.type == TokenType.SUPER:
+            self.advance()
             self.consume(TokenType.DOT, "Expect '.' after 'super'.")
             method = self.consume(
                 TokenType.IDENTIFIER, "Expect superclass method name."
             )
-            return Super(keyword, method)
-        elif self.match(TokenType.LEFT_PAREN):
+            return Super(token, method)
+        elif token.type == TokenType.LEFT_PAREN:
+            self.advance()
             expr = self.expression()
             self.consume(TokenType.RIGHT_PAREN, "Expect ')' after expression.")
             return Grouping(expr)
-        elif self.match(TokenType.IDENTIFIER):
-            return Variable(self.previous)
-        elif self.match(TokenType.PLUS):
-            self.error(self.previous, "Missing left-hand operand.")
-            self.term()
-            return None
-        elif self.match(
-            [
-                TokenType.SLASH,
-                TokenType.STAR,
-            ]
-        ):
-            self.error(self.previous, "Missing left-hand operand.")
-            self.factor()
-            return None
-        elif self.match(
-            [
-                TokenType.EQUAL_EQUAL,
-                TokenType.BANG_EQUAL,
-            ]
-        ):
-            self.error(self.previous, "Missing left-hand operand.")
-            self.equality()
-            return None
-        elif self.match(
-            [
-                TokenType.GREATER,
-                TokenType.GREATER_EQUAL,
-                TokenType.LESS,
-                TokenType.LESS_EQUAL,
-            ]
-        ):
-            self.error(self.previous, "Missing left-hand operand.")
-            self.comparison()
+        elif token.type in MISSING_OPERAND:
+            # Report the binary operator, then parse its right operand at the
+            # operator's own level so the rest of the expression is skipped.
+            op = self.advance()
+            self.error(op, "Missing left-hand operand.")
+            self.binary(INFIX_RULES[op.type][0])
             return None
 
         raise self.error(self.peek, "Expect expression.")
@@ -507,6 +537,8 @@ class Parser:
     def advance(self):
         if not self.finished:
             self.current += 1
+            self._previous = self._lookahead
+            self._lookahead = next(self.tokens)
         return self.previous
 
     def consume(self, type: TokenType, message: str = ""):
@@ -548,8 +580,8 @@ class Parser:
 
     @property
     def peek(self) -> Token:
-        return self.tokens[self.current]
+        return self._lookahead
 
     @property
     def previous(self) -> Token:
-        return self.tokens[self.current - 1]
+        return self._previous
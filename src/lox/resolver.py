@@ -1,7 +1,8 @@
 from enum import Enum
-from typing import Dict, List, Union
+from typing import Dict, List, Tuple, Union
 
 from lox.abc import Expr, Stmt
+from lox.environment import CELL, LOCAL, UPVALUE
 from lox.error import error
 from lox.expr import (
     Assign,
@@ -18,7 +19,18 @@ from lox.expr import (
     Variable,
 )
 from lox.interpreter import Interpreter
-from lox.stmt import Block, Class, Expression, Function, If, Print, Return, Var, While
+from lox.stmt import (
+    Block,
+    Class,
+    Expression,
+    For,
+    Function,
+    If,
+    Print,
+    Return,
+    Var,
+    While,
+)
 from lox.token import Token
 from lox.visitor import ExprVisitor, StmtVisitor
 
@@ -36,65 +48,260 @@ class ClassType(Enum):
     SUBCLASS = 2
 
 
+class Local:
+    """A local variable: the scope declaring it and, once laid out, its slot."""
+
+    __slots__ = ("scope", "order", "defined", "captured", "slot")
+
+    def __init__(self, scope: "Scope", order: int) -> None:
+        self.scope = scope
+        # Position among the scope's names, to tell what a lazy body sees.
+        self.order = order
+        self.defined = False
+        # Used by a nested function, so it lives in a cell.
+        self.captured = False
+        self.slot: int | None = None
+
+
+class Scope:
+    """A lexical scope, as seen while resolving.
+
+    Only function bodies, and scopes outside any function, get a frame at
+    runtime; the variables of any other scope are laid out in the frame of
+    the nearest of those around it. A function scope also collects the
+    upvalues its closure captures when it is created, as
+    ``(from_enclosing_frame, Local or upvalue index)`` pairs.
+    """
+
+    __slots__ = ("names", "parent", "frame", "size", "upvalues", "upvalue_index")
+
+    def __init__(self, parent: "Scope | None", has_frame: bool) -> None:
+        self.names: Dict[str, Local] = {}
+        self.parent = parent
+        self.frame: Scope = self if has_frame or parent is None else parent.frame
+        self.size = 0
+        self.upvalues: List[Tuple[bool, Local | int]] = []
+        self.upvalue_index: Dict[Local, int] = {}
+
+
 class Resolver(ExprVisitor, StmtVisitor):
+    """Resolves every local variable use to a ``(kind, index)`` pair.
+
+    Block scopes are flattened into the frame of their function: each
+    local gets its own slot there, so shadowing variables never collide.
+    A variable used only by its own function is read from its frame slot
+    (``LOCAL``). One that nested functions use is captured: its slot holds
+    a ``Cell`` (``CELL``), and each function using it reaches the cell
+    through its closure's upvalues (``UPVALUE``), threaded through every
+    function in between as in clox. Whether a variable is captured is known
+    only once every use has been seen, so slots and kinds are filled in
+    once the whole program (or lazy body) has been resolved.
+    """
+
     def __init__(self, interpreter: Interpreter) -> None:
         self.interpreter = interpreter
-        # In each scope, map variable -> is defined
-        # true -> defined, false -> declared but not defined; not exist -> not declared
-        self.scopes: List[Dict[str, bool]] = []
+        self.scopes: List[Scope] = []
+        # Names each scope had when a lazy body was declared in it; names
+        # declared later are not visible to the body.
+        self.visible: Dict[Scope, int] = {}
         self.current_func = FunctionType.NONE
         self.current_cls = ClassType.NONE
-
-    def begin_scope(self):
-        self.scopes.append({})
-
-    def end_scope(self):
-        self.scopes.pop()
+        # Awaiting layout: locals in declaration order, the declarations
+        # and scoped nodes to fill in, every use of a local (with the
+        # node field it goes to), and the closures whose captures to fill.
+        self.locals: List[Local] = []
+        self.declarations: List[Tuple[Union[Var, Function, Class], Local]] = []
+        self.frames: List[Tuple[Union[Block, For, Function], Scope]] = []
+        self.params: List[Tuple[Function, List[Local]]] = []
+        self.closures: List[Tuple[Function, Scope]] = []
+        self.uses: List[Tuple[Expr, str, Local, int | None]] = []
+
+    def begin_scope(self, scope: Scope | None = None) -> Scope:
+        if scope is None:
+            scope = Scope(self.scopes[-1] if self.scopes else None, False)
+        self.scopes.append(scope)
+        return scope
+
+    def end_scope(self) -> Scope:
+        return self.scopes.pop()
 
     def resolve(self, statements: List[Stmt]):
+        """Resolve a program, or one more REPL input.
+
+        A resolver can be kept for a whole session: each call only visits
+        the statements it is given, and earlier ones keep what was stored
+        on their nodes. Every call starts at top level, even after one
+        that failed halfway.
+        """
+        try:
+            self._resolve_statements(statements)
+            self._lay_out()
+        finally:
+            self._reset()
+
+    def _reset(self):
+        self.scopes = []
+        self.visible = {}
+        self.current_func = FunctionType.NONE
+        self.current_cls = ClassType.NONE
+        self.locals.clear()
+        self.frames.clear()
+        self.params.clear()
+        self.closures.clear()
+        self.declarations.clear()
+        self.uses.clear()
+
+    def _resolve_statements(self, statements: List[Stmt]):
         for statement in statements:
             self._resolve(statement)
 
-    def _resolve_local(self, expr: Expr, name: Token):
-        for i, scope in enumerate(reversed(self.scopes)):
-            if name.lexeme in scope:
-                self.interpreter.resolve(expr, i)
-                return
+    def _lay_out(self):
+        for local in self.locals:
+            frame = local.scope.frame
+            local.slot = frame.size
+            frame.size += 1
+        for node, scope in self.frames:
+            node.frame_size = scope.size if scope.frame is scope else None
+        for func, params in self.params:
+            func.cells = tuple(local.slot for local in params if local.captured)
+        for func, scope in self.closures:
+            func.captures = tuple(
+                (True, source.slot) if from_frame else (False, source)
+                for from_frame, source in scope.upvalues
+            )
+        for declaration, local in self.declarations:
+            declaration.slot = local.slot
+            declaration.cell = local.captured
+        for expr, field, local, upvalue in self.uses:
+            if upvalue is not None:
+                access = (UPVALUE, upvalue)
+            elif local.captured:
+                access = (CELL, local.slot)
+            else:
+                access = (LOCAL, local.slot)
+            setattr(expr, field, access)
+
+    def _lookup(self, name: str) -> Local | None:
+        for scope in reversed(self.scopes):
+            local = scope.names.get(name)
+            if local is not None:
+                limit = self.visible.get(scope)
+                if limit is None or local.order < limit:
+                    return local
+        return None
+
+    def _resolve_local(self, expr: Expr, name: str, field: str = "resolved"):
+        local = self._lookup(name)
+        if local is None:
+            return
+        frame = self.scopes[-1].frame
+        upvalue = None
+        if local.scope.frame is not frame:
+            upvalue = self._capture(frame, local)
+        self.uses.append((expr, field, local, upvalue))
+
+    def _capture(self, function: Scope, local: Local) -> int:
+        """Index of ``local`` among the upvalues of ``function``'s closure."""
+        index = function.upvalue_index.get(local)
+        if index is None:
+            enclosing = function.parent.frame
+            if local.scope.frame is enclosing:
+                local.captured = True
+                function.upvalues.append((True, local))
+            else:
+                function.upvalues.append((False, self._capture(enclosing, local)))
+            index = function.upvalue_index[local] = len(function.upvalues) - 1
+        return index
+
+    def resolve_lazy_body(self, func: Function):
+        """Resolve a lazily parsed body in the scopes of its declaration."""
+        lazy = func.lazy_body
+        self.scopes = [scope for scope, _ in lazy.scopes]
+        self.visible = dict(lazy.scopes)
+        self.current_cls = lazy.class_type
+        try:
+            self._resolve_function(func, lazy.function_type)
+            self._lay_out()
+        finally:
+            self._reset()
 
     def _resolve_function(self, func: Function, func_type: FunctionType):
+        if func.body is None:
+            # Not parsed yet: remember where it was declared for first call.
+            lazy = func.lazy_body
+            lazy.scopes = [(scope, len(scope.names)) for scope in self.scopes]
+            lazy.function_type = func_type
+            lazy.class_type = self.current_cls
+            # The closure is created before the body is seen, so it
+            # captures every local in sight.
+            lazy.scope = scope = Scope(self.scopes[-1] if self.scopes else None, True)
+            for name in {name for outer in self.scopes for name in outer.names}:
+                local = self._lookup(name)
+                if local is not None:
+                    self._capture(scope, local)
+            self.closures.append((func, scope))
+            return
         enclosing_func = self.current_func
         self.current_func = func_type
-        self.begin_scope()
+        if func.lazy_body is not None:
+            scope = func.lazy_body.scope
+        else:
+            scope = Scope(self.scopes[-1] if self.scopes else None, True)
+        self.begin_scope(scope)
+        # A method's frame starts with the instance and, in a subclass,
+        # the superclass its "super" calls go to.
+        hidden = []
+        if func_type in (FunctionType.METHOD, FunctionType.INITIALIZER):
+            hidden.append("this")
+            if self.current_cls == ClassType.SUBCLASS:
+                hidden.append("super")
+        params = [self._add_local(name) for name in hidden]
         for param in func.params:
-            self.declare(param)
+            params.append(self.declare(param))
             self.define(param)
-        self.resolve(func.body)
+        for local in params:
+            local.defined = True
+        self._resolve_statements(func.body)
         self.end_scope()
+        self.frames.append((func, scope))
+        self.params.append((func, params))
+        self.closures.append((func, scope))
         self.current_func = enclosing_func
 
     def _resolve(self, expr_or_stmt: Union[Expr, Stmt]):
         expr_or_stmt.accept(self)
 
-    def declare(self, name: Token):
+    def declare(self, name: Token) -> Local | None:
         if len(self.scopes) == 0:
-            return
-        scope = self.scopes[-1]
-        if scope.get(name.lexeme) is not None:
+            return None
+        if name.lexeme in self.scopes[-1].names:
             error(name, "Variable with this name already declared in this scope.")
-        scope[name.lexeme] = False
+        return self._add_local(name.lexeme)
+
+    def _add_local(self, name: str) -> Local:
+        scope = self.scopes[-1]
+        local = Local(scope, len(scope.names))
+        scope.names[name] = local
+        self.locals.append(local)
+        return local
 
     def define(self, name: Token):
         if len(self.scopes) == 0:
             return
-        self.scopes[-1][name.lexeme] = True
+        self.scopes[-1].names[name.lexeme].defined = True
 
     def visit_block(self, stmt: Block):
         self.begin_scope()
-        self.resolve(stmt.statements)
-        self.end_scope()
+        self._resolve_statements(stmt.statements)
+        self.frames.append((stmt, self.end_scope()))
+
+    def _declare_statement(self, stmt: Union[Var, Function, Class]):
+        local = self.declare(stmt.name)
+        if local is not None:
+            self.declarations.append((stmt, local))
 
     def visit_var(self, stmt: Var):
-        self.declare(stmt.name)
+        self._declare_statement(stmt)
         if stmt.initializer is not None:
             self._resolve(stmt.initializer)
         self.define(stmt.name)
@@ -109,16 +316,18 @@ class Resolver(ExprVisitor, StmtVisitor):
             self._resolve(stmt.value)
 
     def visit_variable(self, expr: Variable):
-        if len(self.scopes) != 0 and self.scopes[-1].get(expr.name.lexeme) is False:
-            error(expr.name, "Cannot read local variable in its own initializer.")
-        self._resolve_local(expr, expr.name)
+        if len(self.scopes) != 0:
+            local = self.scopes[-1].names.get(expr.name.lexeme)
+            if local is not None and not local.defined:
+                error(expr.name, "Cannot read local variable in its own initializer.")
+        self._resolve_local(expr, expr.name.lexeme)
 
     def visit_assign(self, expr: Assign):
         self._resolve(expr.value)
-        self._resolve_local(expr, expr.name)
+        self._resolve_local(expr, expr.name.lexeme)
 
     def visit_function(self, stmt: Function):
-        self.declare(stmt.name)
+        self._declare_statement(stmt)
         self.define(stmt.name)
         self._resolve_function(stmt, FunctionType.FUNCTION)
 
@@ -138,10 +347,24 @@ class Resolver(ExprVisitor, StmtVisitor):
         self._resolve(stmt.condition)
         self._resolve(stmt.body)
 
+    def visit_for(self, stmt: For):
+        # Only a loop with an initializer gets a scope for its variable,
+        # and the initializer runs once per loop, not per iteration.
+        if stmt.initializer is not None:
+            self.begin_scope()
+            self._resolve(stmt.initializer)
+        if stmt.condition is not None:
+            self._resolve(stmt.condition)
+        if stmt.increment is not None:
+            self._resolve(stmt.increment)
+        self._resolve(stmt.body)
+        if stmt.initializer is not None:
+            self.frames.append((stmt, self.end_scope()))
+
     def visit_class(self, stmt: Class):
         enclosing_cls = self.current_cls
         self.current_cls = ClassType.CLASS
-        self.declare(stmt.name)
+        self._declare_statement(stmt)
         self.define(stmt.name)
 
         if stmt.super_cls is not None:
@@ -150,20 +373,13 @@ class Resolver(ExprVisitor, StmtVisitor):
             self.current_cls = ClassType.SUBCLASS
             self._resolve(stmt.super_cls)
 
-            self.begin_scope()
-            self.scopes[-1]["super"] = True
-
-        self.begin_scope()
-        self.scopes[-1]["this"] = True
+        # "this" and "super" are locals of each method (see
+        # _resolve_function), not scopes around the class.
         for method in stmt.methods:
             declaration = FunctionType.METHOD
             if method.name.lexeme == "init":
                 declaration = FunctionType.INITIALIZER
             self._resolve_function(method, declaration)
-        self.end_scope()
-
-        if stmt.super_cls is not None:
-            self.end_scope()
 
         self.current_cls = enclosing_cls
 
@@ -177,7 +393,7 @@ class Resolver(ExprVisitor, StmtVisitor):
     def visit_this(self, expr: This):
         if self.current_cls == ClassType.NONE:
             error(expr.keyword, "Cannot use 'this' outside of a class.")
-        self._resolve_local(expr, expr.keyword)
+        self._resolve_local(expr, "this")
 
     def visit_super(self, expr: Super):
         if self.current_cls == ClassType.NONE:
@@ -185,7 +401,8 @@ class Resolver(ExprVisitor, StmtVisitor):
         elif self.current_cls != ClassType.SUBCLASS:
             error(expr.keyword, "Cannot use 'super' in a class with no superclass.")
 
-        self._resolve_local(expr, expr.keyword)
+        self._resolve_local(expr, "super")
+        self._resolve_local(expr, "this", "this")
 
     def visit_binary(self, expr: Binary):
         self._resolve(expr.left)
@@ -0,0 +1,242 @@
+"""Runtime library of Lox programs transpiled to Python (see ``transpiler``).
+
+Generated modules run with these names in their globals: everything Lox
+semantics needs beyond plain Python operations (calls, classes,
+``print`` formatting, super lookups) and the errors that operations
+checked inline raise. They are all prefixed with ``lox_``, which no name
+derived from a Lox program starts with.
+
+A runtime error is raised as a ``LoxError`` carrying only its message;
+``lox_statement``, wrapped around every top-level statement, reports it
+at the Lox line of the generated code that raised it.
+"""
+
+import sys
+import time
+from types import FunctionType, MethodType
+
+from lox import error
+from lox.environment import Cell
+from lox.error import PloxRuntimeError
+from lox.token import Token, TokenType
+
+__all__ = [
+    "lox_Cell",
+    "lox_Instance",
+    "lox_addable",
+    "lox_function",
+    "lox_call",
+    "lox_class",
+    "lox_super",
+    "lox_fields",
+    "lox_set_field",
+    "lox_set_cell",
+    "lox_print",
+    "lox_number_error",
+    "lox_add_error",
+    "lox_divide_error",
+    "lox_property_error",
+    "lox_statement",
+    "lox_exit",
+    "g_clock",
+]
+
+lox_Cell = Cell
+lox_function = FunctionType
+# Types "+" adds; both operands must be of the same one.
+lox_addable = (float, str)
+
+
+class LoxError(Exception):
+    def __init__(self, message: str) -> None:
+        super().__init__(message)
+        self.message = message
+
+
+class lox_Instance:
+    """Base of every Lox class.
+
+    Fields are attributes of the instance and methods functions of the
+    class, both named ``p_<name>``, so Python binds methods on access.
+    """
+
+    def __str__(self) -> str:
+        return f"<instance of {type(self).__name__}>"
+
+
+def g_clock():
+    return time.perf_counter()
+
+
+def lox_arity(callee) -> int | None:
+    kind = type(callee)
+    if kind is FunctionType:
+        return callee.__code__.co_argcount
+    if kind is MethodType:
+        return callee.__func__.__code__.co_argcount - 1
+    if isinstance(callee, type) and issubclass(callee, lox_Instance):
+        initializer = getattr(callee, "p_init", None)
+        if initializer is None:
+            return 0
+        return initializer.__code__.co_argcount - 1
+    return None
+
+
+def lox_call(callee, *arguments):
+    """A call the generated code could not make directly."""
+    arity = lox_arity(callee)
+    if arity is None:
+        raise LoxError("Can only call functions and classes.")
+    if len(arguments) != arity:
+        raise LoxError(f"Expected {arity} arguments but got {len(arguments)}.")
+    if isinstance(callee, type):
+        instance = callee()
+        initializer = getattr(callee, "p_init", None)
+        if initializer is not None:
+            initializer(instance, *arguments)
+        return instance
+    return callee(*arguments)
+
+
+_NO_SUPERCLASS = object()
+
+
+def lox_class(name: str, methods: dict, superclass=_NO_SUPERCLASS):
+    if superclass is _NO_SUPERCLASS:
+        base = lox_Instance
+    elif isinstance(superclass, type) and issubclass(superclass, lox_Instance):
+        base = superclass
+    else:
+        raise LoxError("Superclass must be a class.")
+    return type(name, (base,), methods)
+
+
+def lox_super(superclass, instance, name: str):
+    method = getattr(superclass, name, None)
+    if method is None:
+        raise LoxError(f"Undefined property '{name[2:]}'.")
+    return MethodType(method, instance)
+
+
+def lox_fields(obj):
+    """The object whose field is set, once checked to have fields."""
+    if not isinstance(obj, lox_Instance):
+        raise LoxError("Only instances have fields.")
+    return obj
+
+
+def lox_set_field(obj, name: str, value):
+    setattr(obj, name, value)
+    return value
+
+
+def lox_set_cell(cell: Cell, value):
+    cell.value = value
+    return value
+
+
+def stringify(value) -> str:
+    if value is None:
+        return "nil"
+    kind = type(value)
+    if kind is float:
+        text = str(value)
+        if text.endswith(".0"):
+            text = text[:-2]
+        return text
+    if kind is MethodType:
+        value = value.__func__
+        kind = FunctionType
+    if kind is FunctionType:
+        name = value.__name__
+        if name.startswith("f_"):
+            return f"<fn {name[2:]}>"
+        return "<native fn>"
+    if isinstance(value, type):
+        return f"<class {value.__name__}>"
+    return str(value)
+
+
+def lox_print(value) -> None:
+    if value is True:
+        print("true")
+    elif value is False:
+        print("false")
+    else:
+        print(stringify(value))
+
+
+def lox_number_error():
+    raise LoxError("Operand must be a number.")
+
+
+def lox_add_error():
+    raise LoxError("Operands must be two numbers or two strings.")
+
+
+def lox_divide_error(left, right):
+    if type(left) is not float or type(right) is not float:
+        lox_number_error()
+    raise LoxError("Division by zero.")
+
+
+def lox_property_error():
+    raise LoxError("Only instances have properties.")
+
+
+def lox_error_message(exception: BaseException) -> str | None:
+    """The Lox message of an exception raised by generated code, if any."""
+    if isinstance(exception, LoxError):
+        return exception.message
+    name = getattr(exception, "name", None) or ""
+    if isinstance(exception, NameError) and name.startswith("g_"):
+        return f"Undefined variable '{name[2:]}'."
+    if isinstance(exception, AttributeError) and name.startswith("p_"):
+        return f"Undefined property '{name[2:]}'."
+    return None
+
+
+class lox_statement:
+    """Reports the runtime error of a top-level statement, then lets the
+    program go on with the next one, as ``Interpreter.interpret`` does.
+
+    ``namespace`` is the globals of the generated code. Its line numbers
+    are Lox lines, unless it has a ``LOX_LINES`` table mapping them to
+    Lox lines (a module written to a file).
+    """
+
+    __slots__ = ("namespace",)
+
+    def __init__(self, namespace: dict) -> None:
+        self.namespace = namespace
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, kind, exception, traceback) -> bool:
+        if exception is None:
+            return False
+        if isinstance(exception, PloxRuntimeError):
+            error.runtime_error(exception)
+            return True
+        message = lox_error_message(exception)
+        if message is None:
+            return False
+        # The innermost frame of generated code is where the Lox program
+        # failed; the frames below it are runtime helpers.
+        line = 0
+        while traceback is not None:
+            if traceback.tb_frame.f_globals is self.namespace:
+                line = traceback.tb_lineno
+            traceback = traceback.tb_next
+        lines = self.namespace.get("LOX_LINES")
+        if lines is not None:
+            line = lines.get(line, line)
+        token = Token(TokenType.EOF, "", None, line)
+        error.runtime_error(PloxRuntimeError(token, message))
+        return True
+
+
+def lox_exit() -> None:
+    if error.has_runtime_error:
+        sys.exit(70)
@@ -1,4 +1,6 @@
-from typing import List
+import re
+import sys
+from typing import Iterator, List, TextIO
 
 from lox.error import error
 from lox.token import Token, TokenType
@@ -37,7 +39,7 @@ class Scanner:
             self.start = self.current
             self.scan_token()
 
-        self.tokens.append(Token(TokenType.EOF, "", None, self.line))
+        self.tokens.append(Token(TokenType.EOF, "", None, self.line, self.current))
 
         return self.tokens
 
@@ -118,7 +120,7 @@ class Scanner:
         while self.peek.isalnum() or self.peek == "_":
             self.advance()
 
-        text = self.source[self.start : self.current]
+        text = sys.intern(self.source[self.start : self.current])
         type = self.keywords.get(text)
         if type is None:
             type = TokenType.IDENTIFIER
@@ -145,7 +147,7 @@ class Scanner:
 
     def add_token(self, type: TokenType, literal: object = None) -> None:
         text: str = self.source[self.start : self.current]
-        self.tokens.append(Token(type, text, literal, self.line))
+        self.tokens.append(Token(type, text, literal, self.line, self.start))
 
     def _advance_cmp(self, expected: str) -> bool:
         if self.finished:
@@ -169,3 +171,169 @@ class Scanner:
     @property
     def finished(self) -> bool:
         return self.current >= len(self.source)
+
+
+class RegexScanner(Scanner):
+    """Scanner that emits whole tokens per regex match.
+
+    Produces the same token stream and error reports as ``Scanner``, but
+    matches numbers, identifiers, strings, comments and whitespace runs in
+    one step using a single compiled master pattern instead of dispatching
+    on every character.
+    """
+
+    PATTERN = re.compile(
+        r"""
+        (?P<WS>[ \r\t]+)
+        | (?P<NEWLINE>\n)
+        | (?P<COMMENT>//[^\n]*)
+        | (?P<NUMBER>\d+(?:\.\d+)?)
+        | (?P<IDENTIFIER>[^\W\d]\w*)
+        | (?P<STRING>"[^"]*")
+        | (?P<UNTERMINATED>"[^"]*)
+        | (?P<OP>[!=<>]=?|[(){},.\-+;*/])
+        | (?P<ERROR>.)
+        """,
+        re.VERBOSE | re.DOTALL,
+    )
+
+    # Whether tokens may keep a reference to ``source`` instead of a lexeme.
+    lazy_lexemes = True
+    # Absolute source offset of the text ``_matches`` is currently matching.
+    offset = 0
+
+    OPERATORS = {
+        "(": TokenType.LEFT_PAREN,
+        ")": TokenType.RIGHT_PAREN,
+        "{": TokenType.LEFT_BRACE,
+        "}": TokenType.RIGHT_BRACE,
+        ",": TokenType.COMMA,
+        ".": TokenType.DOT,
+        "-": TokenType.MINUS,
+        "+": TokenType.PLUS,
+        ";": TokenType.SEMICOLON,
+        "*": TokenType.STAR,
+        "/": TokenType.SLASH,
+        "!": TokenType.BANG,
+        "!=": TokenType.BANG_EQUAL,
+        "=": TokenType.EQUAL,
+        "==": TokenType.EQUAL_EQUAL,
+        "<": TokenType.LESS,
+        "<=": TokenType.LESS_EQUAL,
+        ">": TokenType.GREATER,
+        ">=": TokenType.GREATER_EQUAL,
+    }
+
+    def scan_tokens(self) -> List[Token]:
+        self.tokens.extend(self.iter_tokens())
+        return self.tokens
+
+    def iter_tokens(self) -> Iterator[Token]:
+        """Yield tokens one at a time, ending with EOF."""
+        keywords = self.keywords
+        operators = self.OPERATORS
+        intern = sys.intern
+        # Number and string lexemes are re-matched from the source on demand.
+        source = self.source if self.lazy_lexemes else None
+        line = self.line
+
+        for match in self._matches():
+            kind = match.lastgroup
+            text = match.group()
+            if kind == "WS" or kind == "COMMENT":
+                continue
+            elif kind == "NEWLINE":
+                line += 1
+            elif kind == "IDENTIFIER":
+                text = intern(text)
+                yield Token(
+                    keywords.get(text, TokenType.IDENTIFIER),
+                    text,
+                    None,
+                    line,
+                    self.offset + match.start(),
+                )
+            elif kind == "OP":
+                yield Token(
+                    operators[text], text, None, line, self.offset + match.start()
+                )
+            elif kind == "NUMBER":
+                yield Token(
+                    TokenType.NUMBER,
+                    None if source else text,
+                    float(text),
+                    line,
+                    self.offset + match.start(),
+                    source,
+                )
+            elif kind == "STRING":
+                line += text.count("\n")
+                yield Token(
+                    TokenType.STRING,
+                    None if source else text,
+                    text[1:-1],
+                    line,
+                    self.offset + match.start(),
+                    source,
+                )
+            elif kind == "UNTERMINATED":
+                line += text.count("\n")
+                error(line, "Unterminated string.")
+            else:
+                error(line, "Unexpected character.")
+
+        self.line = line
+        yield Token(TokenType.EOF, "", None, line, self.offset)
+
+    def _matches(self) -> Iterator[re.Match]:
+        yield from self.PATTERN.finditer(self.source, self.current)
+        self.start = self.current = self.offset = len(self.source)
+
+
+class StreamScanner(RegexScanner):
+    """Scanner that lazily reads its source from a file object.
+
+    The file is read in chunks of ``chunk_size`` characters, and only the
+    unconsumed tail of the current chunk is kept in memory. A match that
+    reaches the end of the buffer may still grow (identifiers, numbers,
+    comments, strings, two-character operators), so more input is read
+    before such a match is accepted.
+    """
+
+    # Longest lookahead the grammar needs past the end of a token ("1." + digit).
+    LOOKAHEAD = 2
+    # Chunks are dropped as soon as they are consumed, so lexemes stay eager.
+    lazy_lexemes = False
+
+    def __init__(self, file: TextIO, chunk_size: int = 1 << 16) -> None:
+        super().__init__("")
+        self.file = file
+        self.chunk_size = chunk_size
+
+    def __iter__(self) -> Iterator[Token]:
+        return self.iter_tokens()
+
+    def _matches(self) -> Iterator[re.Match]:
+        pattern = self.PATTERN
+        buffer = ""
+        pos = 0
+        eof = False
+
+        while True:
+            match = pattern.match(buffer, pos)
+            if not eof and (
+                match is None or match.end() + self.LOOKAHEAD > len(buffer)
+            ):
+                chunk = self.file.read(self.chunk_size)
+                if chunk:
+                    self.offset += pos
+                    buffer = buffer[pos:] + chunk
+                    pos = 0
+                else:
+                    eof = True
+                continue
+            if match is None:
+                self.offset += pos
+                return
+            yield match
+            pos = match.end()
@@ -1,20 +1,28 @@
-from dataclasses import dataclass
-from typing import List
+from __future__ import annotations
+
+from dataclasses import dataclass, field
+from typing import TYPE_CHECKING, List, Tuple
 
 from lox.abc import Expr, Stmt
 from lox.token import Token
 from lox.visitor import StmtVisitor
 
+if TYPE_CHECKING:
+    from lox.parser import LazyBody
+
 
-@dataclass
+@dataclass(eq=False, slots=True)
 class Block(Stmt):
     statements: list[Stmt]
+    # Size of the frame this scope allocates, filled in by the resolver;
+    # None when its variables live in the enclosing function's frame.
+    frame_size: int | None = field(default=None, init=False, repr=False)
 
     def accept(self, visitor: StmtVisitor):
         return visitor.visit_block(self)
 
 
-@dataclass
+@dataclass(eq=False, slots=True)
 class Expression(Stmt):
     expression: Expr
 
@@ -22,7 +30,7 @@ class Expression(Stmt):
         return visitor.visit_expression(self)
 
 
-@dataclass
+@dataclass(eq=False, slots=True)
 class Print(Stmt):
     expression: Expr
 
@@ -30,16 +38,20 @@ class Print(Stmt):
         return visitor.visit_print(self)
 
 
-@dataclass
+@dataclass(eq=False, slots=True)
 class Var(Stmt):
     name: Token
     initializer: Expr | None
+    # Frame slot of a local declaration, filled in by the resolver;
+    # None for a global. ``cell`` when a closure captures it.
+    slot: int | None = field(default=None, init=False, repr=False)
+    cell: bool = field(default=False, init=False, repr=False)
 
     def accept(self, visitor: StmtVisitor):
         return visitor.visit_var(self)
 
 
-@dataclass
+@dataclass(eq=False, slots=True)
 class Assignment(Stmt):
     name: Token
     value: Expr
@@ -48,7 +60,7 @@ class Assignment(Stmt):
         return visitor.visit_assignment(self)
 
 
-@dataclass
+@dataclass(eq=False, slots=True)
 class If(Stmt):
     condition: Expr
     then_branch: Stmt
@@ -58,7 +70,7 @@ class If(Stmt):
         return visitor.visit_if(self)
 
 
-@dataclass
+@dataclass(eq=False, slots=True)
 class While(Stmt):
     condition: Expr
     body: Stmt
@@ -67,29 +79,56 @@ class While(Stmt):
         return visitor.visit_while(self)
 
 
-@dataclass
+@dataclass(eq=False, slots=True)
+class For(Stmt):
+    initializer: Stmt | None
+    condition: Expr | None
+    increment: Expr | None
+    body: Stmt
+    # Size of the frame holding the loop variable, filled in by the resolver;
+    # None when its variables live in the enclosing function's frame.
+    frame_size: int | None = field(default=None, init=False, repr=False)
+
+    def accept(self, visitor: StmtVisitor):
+        return visitor.visit_for(self)
+
+
+@dataclass(eq=False, slots=True)
 class Break(Stmt):
     def accept(self, visitor: StmtVisitor):
         return visitor.visit_break(self)
 
 
-@dataclass
+@dataclass(eq=False, slots=True)
 class Continue(Stmt):
     def accept(self, visitor: StmtVisitor):
         return visitor.visit_continue(self)
 
 
-@dataclass
+@dataclass(eq=False, slots=True)
 class Function(Stmt):
     name: Token
     params: List[Token] = None
     body: List[Stmt] = None
+    # Set instead of ``body`` until a lazily parsed function is first called.
+    lazy_body: LazyBody | None = None
+    # Frame slot of a local declaration, filled in by the resolver;
+    # None for a global. ``cell`` when a closure captures it.
+    slot: int | None = field(default=None, init=False, repr=False)
+    cell: bool = field(default=False, init=False, repr=False)
+    # Parameters and every block-local variable of the body share one
+    # frame per call; ``cells`` are the slots of captured parameters.
+    frame_size: int = field(default=0, init=False, repr=False)
+    cells: Tuple[int, ...] = field(default=(), init=False, repr=False)
+    # Where each upvalue comes from when the closure is created: a slot of
+    # the enclosing frame (True) or an upvalue of the enclosing closure.
+    captures: Tuple[Tuple[bool, int], ...] = field(default=(), init=False, repr=False)
 
     def accept(self, visitor: StmtVisitor):
         return visitor.visit_function(self)
 
 
-@dataclass
+@dataclass(eq=False, slots=True)
 class Return(Stmt):
     keyword: Token
     value: Expr | None = None
@@ -98,11 +137,15 @@ class Return(Stmt):
         return visitor.visit_return(self)
 
 
-@dataclass
+@dataclass(eq=False, slots=True)
 class Class(Stmt):
     name: Token
     super_cls: Expr | None
     methods: List[Function]
+    # Frame slot of a local declaration, filled in by the resolver;
+    # None for a global. ``cell`` when a closure captures it.
+    slot: int | None = field(default=None, init=False, repr=False)
+    cell: bool = field(default=False, init=False, repr=False)
 
     def accept(self, visitor: StmtVisitor):
         return visitor.visit_class(self)
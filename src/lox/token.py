@@ -1,8 +1,7 @@
-from dataclasses import dataclass
-from enum import Enum
+from enum import IntEnum, auto
 
 
-class TokenType(Enum):
+class TokenType(IntEnum):
     """Enumeration of all possible token types in Lox.
     |  Token Type  |  Example  | Token Type |   Example  |
     |--------------|-----------|------------|------------|
@@ -27,62 +26,117 @@ class TokenType(Enum):
     | VAR          | var       | WHILE      | while      |
     | EOF          |           | BREAK      | break      |
     | CONTINUE     | continue  |            |            |
+
+    Members are small ints so token types compare and hash as cheaply as
+    possible and can index lookup tables.
     """
 
     # Single-character tokens.
-    LEFT_PAREN = "LEFT_PAREN"
-    RIGHT_PAREN = "RIGHT_PAREN"
-    LEFT_BRACE = "LEFT_BRACE"
-    RIGHT_BRACE = "RIGHT_BRACE"
-    COMMA = "COMMA"
-    DOT = "DOT"
-    MINUS = "MINUS"
-    PLUS = "PLUS"
-    SEMICOLON = "SEMICOLON"
-    SLASH = "SLASH"
-    STAR = "STAR"
+    LEFT_PAREN = auto()
+    RIGHT_PAREN = auto()
+    LEFT_BRACE = auto()
+    RIGHT_BRACE = auto()
+    COMMA = auto()
+    DOT = auto()
+    MINUS = auto()
+    PLUS = auto()
+    SEMICOLON = auto()
+    SLASH = auto()
+    STAR = auto()
 
     # One or two character tokens.
-    BANG = "BANG"
-    BANG_EQUAL = "BANG_EQUAL"
-    EQUAL = "EQUAL"
-    EQUAL_EQUAL = "EQUAL_EQUAL"
-    GREATER = "GREATER"
-    GREATER_EQUAL = "GREATER_EQUAL"
-    LESS = "LESS"
-    LESS_EQUAL = "LESS_EQUAL"
+    BANG = auto()
+    BANG_EQUAL = auto()
+    EQUAL = auto()
+    EQUAL_EQUAL = auto()
+    GREATER = auto()
+    GREATER_EQUAL = auto()
+    LESS = auto()
+    LESS_EQUAL = auto()
 
     # Literals.
-    IDENTIFIER = "IDENTIFIER"
-    STRING = "STRING"
-    NUMBER = "NUMBER"
+    IDENTIFIER = auto()
+    STRING = auto()
+    NUMBER = auto()
 
     # Keywords.
-    AND = "AND"
-    CLASS = "CLASS"
-    ELSE = "ELSE"
-    FALSE = "FALSE"
-    FUN = "FUN"
-    FOR = "FOR"
-    IF = "IF"
-    NIL = "NIL"
-    OR = "OR"
-    PRINT = "PRINT"
-    RETURN = "RETURN"
-    SUPER = "SUPER"
-    THIS = "THIS"
-    TRUE = "TRUE"
-    VAR = "VAR"
-    WHILE = "WHILE"
-    BREAK = "BREAK"
-    CONTINUE = "CONTINUE"
-
-    EOF = "EOF"
-
-
-@dataclass
+    AND = auto()
+    CLASS = auto()
+    ELSE = auto()
+    FALSE = auto()
+    FUN = auto()
+    FOR = auto()
+    IF = auto()
+    NIL = auto()
+    OR = auto()
+    PRINT = auto()
+    RETURN = auto()
+    SUPER = auto()
+    THIS = auto()
+    TRUE = auto()
+    VAR = auto()
+    WHILE = auto()
+    BREAK = auto()
+    CONTINUE = auto()
+
+    EOF = auto()
+
+
 class Token:
-    type: TokenType
-    lexeme: str
-    literal: object
-    line: int
+    """A single lexical token.
+
+    Tokens are slotted so they carry no per-instance ``__dict__``. The
+    lexeme may be passed eagerly or left as ``None`` together with the
+    ``source`` it was scanned from; it is then re-matched from ``offset``
+    the first time it is read. Identifier lexemes are interned by the
+    scanners so environment lookups by name hit pointer equality.
+    """
+
+    __slots__ = ("type", "literal", "line", "offset", "_lexeme", "_source")
+
+    def __init__(
+        self,
+        type: TokenType,
+        lexeme: str | None,
+        literal: object,
+        line: int,
+        offset: int = 0,
+        source: str | None = None,
+    ) -> None:
+        self.type = type
+        self.literal = literal
+        self.line = line
+        self.offset = offset
+        self._lexeme = lexeme
+        self._source = source
+
+    @property
+    def lexeme(self) -> str:
+        if self._lexeme is None:
+            from lox.scanner import RegexScanner
+
+            match = RegexScanner.PATTERN.match(self._source, self.offset)
+            self._lexeme = match.group()
+            self._source = None
+        return self._lexeme
+
+    def __eq__(self, other: object) -> bool:
+        if not isinstance(other, Token):
+            return NotImplemented
+        return (self.type, self.lexeme, self.literal, self.line) == (
+            other.type,
+            other.lexeme,
+            other.literal,
+            other.line,
+        )
+
+    __hash__ = None
+
+    def __reduce__(self):
+        return (Token, (self.type, self.lexeme, self.literal, self.line, self.offset))
+
+    def __repr__(self) -> str:
+        return (
+            f"Token(type={self.type!r}, lexeme={self.lexeme!r}, "
+            f"literal={self.literal!r}, line={self.line!r})"
+        )
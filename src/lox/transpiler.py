@@ -0,0 +1,838 @@
+"""Lox to Python transpiler (``--engine=python`` and ``plox compile``).
+
+``PythonTranspiler`` translates resolved statements into a Python
+``ast.Module``, which CPython then compiles and runs like any Python
+code. Lox values are Python values: numbers are floats, functions are
+Python functions, classes are Python classes deriving from
+``runtime.lox_Instance`` and instances their instances. What Python does
+differently from Lox (truthiness, the operand checks of arithmetic,
+calls of anything but a function, ``print``) is either checked inline
+or left to the helpers of ``lox.runtime``.
+
+Python names tell what a Lox name is by their prefix:
+
+- ``g_<name>``: a global, in the module's globals;
+- ``l_<name>_<slot>``: a local, in the Python function's locals (the
+  frame slot keeps apart locals of the same name);
+- ``u_<name>_<index>``: an upvalue of the closure;
+- ``p_<name>``: a field or method;
+- ``f_<name>``: a function, the name it is printed with;
+- ``t_<n>``: a temporary of the generated code;
+- ``lox_*``: the runtime and the factory of each function.
+
+Captured locals live in cells as in the other engines (see
+``Resolver``). Every function gets a module-level factory taking the
+cells its closure captures and returning the function, so closures see
+exactly the cells they were created with, a fresh one per declaration.
+
+Every top-level statement runs inside ``with lox_statement(globals())``,
+which reports a runtime error at the Lox line of the node that raised
+it: generated nodes carry Lox line numbers.
+"""
+
+import ast
+import itertools
+from typing import Callable, Dict, List, NamedTuple, Tuple
+
+from lox import runtime
+from lox.abc import Expr, Stmt
+from lox.environment import CELL, LOCAL
+from lox.interpreter import Interpreter
+from lox.expr import (
+    Assign,
+    Binary,
+    Call,
+    Get,
+    Grouping,
+    Literal,
+    Logical,
+    Set,
+    Super,
+    This,
+    Unary,
+    Variable,
+)
+from lox.stmt import (
+    Block,
+    Break,
+    Class,
+    Continue,
+    Expression,
+    For,
+    Function,
+    If,
+    Print,
+    Return,
+    Var,
+    While,
+)
+from lox.token import TokenType
+from lox.visitor import ExprVisitor, StmtVisitor
+
+COMPARISONS = {
+    TokenType.BANG_EQUAL: ast.NotEq,
+    TokenType.EQUAL_EQUAL: ast.Eq,
+    TokenType.GREATER: ast.Gt,
+    TokenType.GREATER_EQUAL: ast.GtE,
+    TokenType.LESS: ast.Lt,
+    TokenType.LESS_EQUAL: ast.LtE,
+}
+
+ARITHMETIC = {
+    TokenType.PLUS: ast.Add,
+    TokenType.MINUS: ast.Sub,
+    TokenType.STAR: ast.Mult,
+    TokenType.SLASH: ast.Div,
+}
+
+
+def _name(id: str, store: bool = False) -> ast.Name:
+    return ast.Name(id=id, ctx=ast.Store() if store else ast.Load())
+
+
+def _call(func: str | ast.expr, *args: ast.expr) -> ast.Call:
+    if isinstance(func, str):
+        func = _name(func)
+    return ast.Call(func=func, args=list(args), keywords=[])
+
+
+def _at(node: ast.AST, line: int) -> ast.AST:
+    node.lineno = node.end_lineno = line
+    node.col_offset = node.end_col_offset = 0
+    return node
+
+
+def _is(value: ast.expr, constant: object, negate: bool = False) -> ast.Compare:
+    op = ast.IsNot() if negate else ast.Is()
+    return ast.Compare(left=value, ops=[op], comparators=[ast.Constant(constant)])
+
+
+class PythonInterpreter(Interpreter):
+    """Runs programs by transpiling them to Python and executing that."""
+
+    def __init__(self) -> None:
+        super().__init__()
+        self.transpiler = PythonTranspiler()
+        # Globals of the generated code, kept across inputs like
+        # ``globals``, which this engine does not use.
+        self.namespace = {name: getattr(runtime, name) for name in runtime.__all__}
+        self.namespace["lox_lazy"] = self.call_lazy
+        # Factories of lazily parsed functions, by key (see PythonTranspiler).
+        self.factories: Dict[int, Callable] = {}
+
+    def interpret(self, stmts: Stmt | List[Stmt]):
+        if not isinstance(stmts, list):
+            stmts = [stmts]
+        module = self.transpiler.module(stmts)
+        # Each top-level statement reports its own runtime error.
+        exec(compile(module, "<lox>", "exec"), self.namespace)
+
+    def call_lazy(self, key: int, captured: tuple, arguments: tuple):
+        """Call a function whose body was not parsed when transpiled."""
+        factory = self.factories.get(key)
+        if factory is None:
+            declaration = self.transpiler.lazy[key].declaration
+            if declaration.body is None:
+                self.load_body(declaration)
+            module, name = self.transpiler.lazy_factory(key)
+            exec(compile(module, "<lox>", "exec"), self.namespace)
+            factory = self.factories[key] = self.namespace[name]
+        return factory(*captured)(*arguments)
+
+
+class LazyFunction(NamedTuple):
+    """A function whose body was not parsed when it was transpiled."""
+
+    declaration: Function
+    upvalues: Tuple[str, ...]
+    method: bool
+    superclass: bool
+    initializer: bool
+
+
+class PythonTranspiler(ExprVisitor, StmtVisitor):
+    """Translates resolved statements into Python ``ast`` nodes."""
+
+    def __init__(self) -> None:
+        # Factory names are unique across every module of a session.
+        self.counter = itertools.count()
+        self.factories: List[ast.stmt] = []
+        # Functions left to transpile on their first call, by key.
+        self.lazy: List[LazyFunction] = []
+        self.line = 1
+        # The function being transpiled: the Lox name in each frame slot
+        # and of each upvalue, the globals it assigns and its temporaries.
+        self.names: Dict[int, str] = {}
+        self.upvalues: Tuple[str, ...] = ()
+        self.assigned: set = set()
+        self.temps = itertools.count()
+        # Where an initializer finds the "this" it returns.
+        self.initializer: Tuple[int, int] | None = None
+
+    def module(self, statements: List[Stmt]) -> ast.Module:
+        """A module running top-level statements one at a time."""
+        body = []
+        for statement in statements:
+            self.names = {}
+            code = self._statement(statement) or [ast.Pass()]
+            guard = ast.withitem(
+                context_expr=_call("lox_statement", _call("globals")),
+                optional_vars=None,
+            )
+            body.append(_at(ast.With(items=[guard], body=code), self.line))
+        body[:0] = self.factories
+        self.factories = []
+        return ast.fix_missing_locations(ast.Module(body=body, type_ignores=[]))
+
+    def lazy_factory(self, key: int) -> Tuple[ast.Module, str]:
+        """The module defining the factory of a lazily parsed function,
+        once its body is, and the factory's name."""
+        lazy = self.lazy[key]
+        name = self._factory(
+            lazy.declaration,
+            lazy.upvalues,
+            lazy.method,
+            lazy.superclass,
+            lazy.initializer,
+        )
+        module = ast.Module(body=self.factories, type_ignores=[])
+        self.factories = []
+        return ast.fix_missing_locations(module), name
+
+    # Helpers
+
+    def _statement(self, stmt: Stmt) -> List[ast.stmt]:
+        return stmt.accept(self)
+
+    def _statements(self, statements: List[Stmt]) -> List[ast.stmt]:
+        code = []
+        for statement in statements:
+            code.extend(self._statement(statement))
+        return code
+
+    def _expression(self, expr: Expr) -> ast.expr:
+        return expr.accept(self)
+
+    def _temp(self) -> str:
+        return f"t_{next(self.temps)}"
+
+    def _truthy(self, expr: Expr) -> ast.expr:
+        """A test of ``expr`` being truthy in Lox."""
+        if isinstance(expr, Binary) and expr.op.type in COMPARISONS:
+            return self._expression(expr)
+        if isinstance(expr, Unary) and expr.op.type == TokenType.BANG:
+            return self._expression(expr)
+        if isinstance(expr, Literal) and isinstance(expr.value, bool):
+            return ast.Constant(expr.value)
+        temp = self._temp()
+        value = ast.NamedExpr(target=_name(temp, True), value=self._expression(expr))
+        return ast.BoolOp(
+            op=ast.And(),
+            values=[_is(value, None, True), _is(_name(temp), False, True)],
+        )
+
+    # Variables
+
+    def _local(self, name: str, slot: int) -> str:
+        return f"l_{name}_{slot}"
+
+    def _load(self, resolved, lexeme: str, line: int) -> ast.expr:
+        if resolved is None:
+            return _at(_name(f"g_{lexeme}"), line)
+        kind, index = resolved
+        if kind == LOCAL:
+            return _name(self._local(lexeme, index))
+        if kind == CELL:
+            cell = _name(self._local(lexeme, index))
+        else:
+            cell = _name(f"u_{lexeme}_{index}")
+        return ast.Attribute(value=cell, attr="value", ctx=ast.Load())
+
+    def _define(self, stmt: Var | Function | Class, value: ast.expr) -> ast.stmt:
+        lexeme = stmt.name.lexeme
+        if stmt.slot is None:
+            target = f"g_{lexeme}"
+        else:
+            self.names[stmt.slot] = lexeme
+            target = self._local(lexeme, stmt.slot)
+            if stmt.cell:
+                # A fresh cell each time the declaration runs, so closures
+                # made in different loop iterations do not share it.
+                value = _call("lox_Cell", value)
+        return _at(ast.Assign(targets=[_name(target, True)], value=value), self.line)
+
+    def _declare_cell(self, stmt: Function | Class) -> ast.stmt | None:
+        """Put a captured declaration's cell in place before its value
+        exists (see ``Interpreter.declare_cell``)."""
+        if stmt.slot is None or not stmt.cell:
+            return None
+        self.names[stmt.slot] = stmt.name.lexeme
+        target = _name(self._local(stmt.name.lexeme, stmt.slot), True)
+        return ast.Assign(targets=[target], value=_call("lox_Cell"))
+
+    def _fill_cell(self, stmt: Function | Class, value: ast.expr) -> ast.stmt:
+        cell = _name(self._local(stmt.name.lexeme, stmt.slot))
+        target = ast.Attribute(value=cell, attr="value", ctx=ast.Store())
+        return ast.Assign(targets=[target], value=value)
+
+    def visit_variable(self, expr: Variable):
+        return self._load(expr.resolved, expr.name.lexeme, expr.name.line)
+
+    def visit_this(self, expr: This):
+        return self._load(expr.resolved, "this", expr.keyword.line)
+
+    def visit_super(self, expr: Super):
+        method = ast.Constant(f"p_{expr.method.lexeme}")
+        superclass = self._load(expr.resolved, "super", expr.keyword.line)
+        instance = self._load(expr.this, "this", expr.keyword.line)
+        return _at(_call("lox_super", superclass, instance, method), expr.method.line)
+
+    def visit_assign(self, expr: Assign):
+        value = self._expression(expr.value)
+        lexeme = expr.name.lexeme
+        if expr.resolved is None:
+            name = f"g_{lexeme}"
+            self.assigned.add(name)
+            # Reading the global first raises if it is undefined.
+            checked = ast.Subscript(
+                value=ast.Tuple(elts=[value, _name(name)], ctx=ast.Load()),
+                slice=ast.Constant(0),
+                ctx=ast.Load(),
+            )
+            assign = ast.NamedExpr(target=_name(name, True), value=checked)
+            return _at(assign, expr.name.line)
+        kind, index = expr.resolved
+        if kind == LOCAL:
+            return ast.NamedExpr(
+                target=_name(self._local(lexeme, index), True), value=value
+            )
+        if kind == CELL:
+            cell = _name(self._local(lexeme, index))
+        else:
+            cell = _name(f"u_{lexeme}_{index}")
+        return _call("lox_set_cell", cell, value)
+
+    # Expressions
+
+    def visit_literal(self, expr: Literal):
+        return ast.Constant(expr.value)
+
+    def visit_grouping(self, expr: Grouping):
+        return self._expression(expr.expression)
+
+    def visit_unary(self, expr: Unary):
+        right = self._expression(expr.right)
+        if expr.op.type == TokenType.MINUS:
+            return ast.UnaryOp(op=ast.USub(), operand=_call("float", right))
+        if expr.op.type == TokenType.BANG:
+            temp = self._temp()
+            value = ast.NamedExpr(target=_name(temp, True), value=right)
+            return ast.BoolOp(
+                op=ast.Or(), values=[_is(value, None), _is(_name(temp), False)]
+            )
+        return ast.Subscript(
+            value=ast.Tuple(elts=[right, ast.Constant(None)], ctx=ast.Load()),
+            slice=ast.Constant(1),
+            ctx=ast.Load(),
+        )
+
+    def visit_logical(self, expr: Logical):
+        temp = self._temp()
+        value = ast.NamedExpr(
+            target=_name(temp, True), value=self._expression(expr.left)
+        )
+        if expr.op.type == TokenType.OR:
+            test = ast.BoolOp(
+                op=ast.And(),
+                values=[_is(value, None, True), _is(_name(temp), False, True)],
+            )
+        else:
+            test = ast.BoolOp(
+                op=ast.Or(), values=[_is(value, None), _is(_name(temp), False)]
+            )
+        return ast.IfExp(
+            test=test, body=_name(temp), orelse=self._expression(expr.right)
+        )
+
+    def visit_binary(self, expr: Binary):
+        op = expr.op.type
+        left = self._expression(expr.left)
+        right = self._expression(expr.right)
+        if op in COMPARISONS:
+            compare = ast.Compare(
+                left=left, ops=[COMPARISONS[op]()], comparators=[right]
+            )
+            return compare
+        if op not in ARITHMETIC:
+            # A comma, or an operator the parser does not produce.
+            index = 1 if op == TokenType.COMMA else 2
+            return ast.Subscript(
+                value=ast.Tuple(elts=[left, right, ast.Constant(None)], ctx=ast.Load()),
+                slice=ast.Constant(index),
+                ctx=ast.Load(),
+            )
+
+        # Both operands are evaluated into temporaries, then checked;
+        # number literals need no check.
+        operands = []
+        checks = []
+        for node, code in ((expr.left, left), (expr.right, right)):
+            if isinstance(node, Literal) and type(node.value) is float:
+                operands.append(code)
+                continue
+            temp = self._temp()
+            operands.append(_name(temp))
+            checks.append(
+                _call("type", ast.NamedExpr(target=_name(temp, True), value=code))
+            )
+        result = ast.BinOp(left=operands[0], op=ARITHMETIC[op](), right=operands[1])
+        if op == TokenType.PLUS:
+            types, failure = _name("lox_addable"), _call("lox_add_error")
+            if len(checks) < 2:
+                types = ast.Tuple(elts=[_name("float")], ctx=ast.Load())
+        else:
+            types, failure = None, _call("lox_number_error")
+        if op == TokenType.SLASH:
+            failure = _call("lox_divide_error", *operands)
+        if not checks:
+            if op == TokenType.SLASH and not expr.right.value:
+                return _at(failure, expr.op.line)
+            return result
+
+        if types is None:
+            test = ast.Compare(
+                left=checks[0],
+                ops=[ast.Is()] * len(checks),
+                comparators=checks[1:] + [_name("float")],
+            )
+        else:
+            test = ast.Compare(
+                left=checks[0],
+                ops=[ast.Is()] * (len(checks) - 1) + [ast.In()],
+                comparators=checks[1:] + [types],
+            )
+        if op == TokenType.SLASH:
+            test = ast.BoolOp(op=ast.And(), values=[test, operands[1]])
+        return _at(ast.IfExp(test=test, body=result, orelse=failure), expr.op.line)
+
+    def visit_call(self, expr: Call):
+        # Plain functions called with their arity are called directly;
+        # anything else goes through lox_call, which checks it.
+        callee = self._temp()
+        temps = [self._temp() for _ in expr.arguments]
+        values = [
+            ast.NamedExpr(target=_name(temp, True), value=self._expression(argument))
+            for temp, argument in zip(temps, expr.arguments)
+        ]
+        is_function = ast.Compare(
+            left=_call("type", _name(callee)),
+            ops=[ast.Is()],
+            comparators=[_name("lox_function")],
+        )
+        code = ast.Attribute(value=_name(callee), attr="__code__", ctx=ast.Load())
+        arity = ast.Compare(
+            left=ast.Attribute(value=code, attr="co_argcount", ctx=ast.Load()),
+            ops=[ast.Eq()],
+            comparators=[ast.Constant(len(temps))],
+        )
+        first = ast.NamedExpr(
+            target=_name(callee, True), value=self._expression(expr.callee)
+        )
+        if values:
+            # The callee, then the arguments, are evaluated in a tuple.
+            tests = [ast.Tuple(elts=[first] + values, ctx=ast.Load())]
+            tests += [is_function, arity]
+        else:
+            is_function.left.args = [first]
+            tests = [is_function, arity]
+        arguments = [_name(temp) for temp in temps]
+        call = ast.IfExp(
+            test=ast.BoolOp(op=ast.And(), values=tests),
+            body=_call(_name(callee), *arguments),
+            orelse=_call("lox_call", _name(callee), *arguments),
+        )
+        return _at(call, expr.paren.line)
+
+    def visit_get(self, expr: Get):
+        temp = self._temp()
+        obj = ast.NamedExpr(
+            target=_name(temp, True), value=self._expression(expr.object)
+        )
+        get = ast.IfExp(
+            test=_call("isinstance", obj, _name("lox_Instance")),
+            body=ast.Attribute(
+                value=_name(temp), attr=f"p_{expr.name.lexeme}", ctx=ast.Load()
+            ),
+            orelse=_call("lox_property_error"),
+        )
+        return _at(get, expr.name.line)
+
+    def visit_set(self, expr: Set):
+        obj = _at(_call("lox_fields", self._expression(expr.object)), expr.name.line)
+        name = ast.Constant(f"p_{expr.name.lexeme}")
+        return _call("lox_set_field", obj, name, self._expression(expr.value))
+
+    # Statements
+
+    def visit_expression(self, stmt: Expression):
+        expr = stmt.expression
+        # Assignments whose value is unused become Python assignments.
+        if isinstance(expr, Assign) and expr.resolved is not None:
+            kind, index = expr.resolved
+            value = self._expression(expr.value)
+            lexeme = expr.name.lexeme
+            if kind == LOCAL:
+                target = _name(self._local(lexeme, index), True)
+            else:
+                cell = (
+                    self._local(lexeme, index)
+                    if kind == CELL
+                    else f"u_{lexeme}_{index}"
+                )
+                target = ast.Attribute(value=_name(cell), attr="value", ctx=ast.Store())
+            return [_at(ast.Assign(targets=[target], value=value), self.line)]
+        if isinstance(expr, Set):
+            temp = self._temp()
+            obj = _at(
+                _call("lox_fields", self._expression(expr.object)), expr.name.line
+            )
+            target = ast.Attribute(
+                value=_name(temp), attr=f"p_{expr.name.lexeme}", ctx=ast.Store()
+            )
+            return [
+                _at(ast.Assign(targets=[_name(temp, True)], value=obj), expr.name.line),
+                ast.Assign(targets=[target], value=self._expression(expr.value)),
+            ]
+        return [_at(ast.Expr(value=self._expression(expr)), self.line)]
+
+    def visit_print(self, stmt: Print):
+        value = self._expression(stmt.expression)
+        return [_at(ast.Expr(value=_call("lox_print", value)), self.line)]
+
+    def visit_var(self, stmt: Var):
+        self.line = stmt.name.line
+        if stmt.initializer is None:
+            value = ast.Constant(None)
+        else:
+            value = self._expression(stmt.initializer)
+        return [self._define(stmt, value)]
+
+    def visit_block(self, stmt: Block):
+        return self._statements(stmt.statements)
+
+    def visit_if(self, stmt: If):
+        test = self._truthy(stmt.condition)
+        body = self._statement(stmt.then_branch) or [ast.Pass()]
+        orelse = []
+        if stmt.else_branch is not None:
+            orelse = self._statement(stmt.else_branch)
+        return [_at(ast.If(test=test, body=body, orelse=orelse), self.line)]
+
+    def visit_while(self, stmt: While):
+        test = self._truthy(stmt.condition)
+        body = self._statement(stmt.body) or [ast.Pass()]
+        return [_at(ast.While(test=test, body=body, orelse=[]), self.line)]
+
+    def visit_for(self, stmt: For):
+        code = []
+        if stmt.initializer is not None:
+            code.extend(self._statement(stmt.initializer))
+        test = ast.Constant(True)
+        if stmt.condition is not None:
+            test = self._truthy(stmt.condition)
+        body = self._statement(stmt.body)
+        if stmt.increment is None:
+            code.append(ast.While(test=test, body=body or [ast.Pass()], orelse=[]))
+            return code
+        increment = ast.Expr(value=self._expression(stmt.increment))
+        if not _continues(stmt.body):
+            code.append(ast.While(test=test, body=body + [increment], orelse=[]))
+            return code
+
+        # A continue must still run the increment, so it runs at the top
+        # of every iteration but the first.
+        first = self._temp()
+        code.append(ast.Assign(targets=[_name(first, True)], value=ast.Constant(True)))
+        start = ast.If(
+            test=_name(first),
+            body=[ast.Assign(targets=[_name(first, True)], value=ast.Constant(False))],
+            orelse=[increment],
+        )
+        stop = ast.If(
+            test=ast.UnaryOp(op=ast.Not(), operand=test), body=[ast.Break()], orelse=[]
+        )
+        loop = ast.While(test=ast.Constant(True), body=[start, stop] + body, orelse=[])
+        code.append(loop)
+        return code
+
+    def visit_break(self, stmt: Break):
+        return [ast.Break()]
+
+    def visit_continue(self, stmt: Continue):
+        return [ast.Continue()]
+
+    def visit_return(self, stmt: Return):
+        self.line = stmt.keyword.line
+        if self.initializer is not None:
+            value = self._load(self.initializer, "this", self.line)
+        elif stmt.value is None:
+            value = ast.Constant(None)
+        else:
+            value = self._expression(stmt.value)
+        return [_at(ast.Return(value=value), self.line)]
+
+    def visit_function(self, stmt: Function):
+        self.line = stmt.name.line
+        cell = self._declare_cell(stmt)
+        closure = self._closure(stmt)
+        if cell is None:
+            return [self._define(stmt, closure)]
+        return [cell, self._fill_cell(stmt, closure)]
+
+    def visit_class(self, stmt: Class):
+        self.line = stmt.name.line
+        code = []
+        superclass = None
+        if stmt.super_cls is not None:
+            superclass = self._temp()
+            value = self._expression(stmt.super_cls)
+            code.append(ast.Assign(targets=[_name(superclass, True)], value=value))
+        cell = self._declare_cell(stmt)
+        if cell is not None:
+            code.append(cell)
+        keys, methods = [], []
+        for method in stmt.methods:
+            keys.append(ast.Constant(f"p_{method.name.lexeme}"))
+            methods.append(self._closure(method, True, superclass))
+        arguments = [
+            ast.Constant(stmt.name.lexeme),
+            ast.Dict(keys=keys, values=methods),
+        ]
+        line = stmt.name.line
+        if superclass is not None:
+            arguments.append(_name(superclass))
+            line = stmt.super_cls.name.line
+        klass = _at(_call("lox_class", *arguments), line)
+        if cell is None:
+            code.append(self._define(stmt, klass))
+        else:
+            code.append(self._fill_cell(stmt, klass))
+        return code
+
+    # Functions
+
+    def _closure(
+        self, stmt: Function, method: bool = False, superclass: str | None = None
+    ) -> ast.expr:
+        """A call of the function's factory with the cells it captures."""
+        upvalues = []
+        arguments = [] if superclass is None else [_name(superclass)]
+        for from_frame, index in stmt.captures:
+            if from_frame:
+                name = self.names[index]
+                arguments.append(_name(self._local(name, index)))
+            else:
+                name = self.upvalues[index]
+                arguments.append(_name(f"u_{name}_{index}"))
+            upvalues.append(name)
+        upvalues = tuple(upvalues)
+        initializer = method and stmt.name.lexeme == "init"
+        if stmt.body is None:
+            key = len(self.lazy)
+            self.lazy.append(
+                LazyFunction(
+                    stmt, upvalues, method, superclass is not None, initializer
+                )
+            )
+            factory = self._stub(key, stmt, upvalues, method, superclass is not None)
+        else:
+            factory = self._factory(
+                stmt, upvalues, method, superclass is not None, initializer
+            )
+        return _call(factory, *arguments)
+
+    def _factory(
+        self,
+        stmt: Function,
+        upvalues: Tuple[str, ...],
+        method: bool,
+        superclass: bool,
+        initializer: bool,
+    ) -> str:
+        enclosing = (
+            self.names,
+            self.upvalues,
+            self.assigned,
+            self.temps,
+            self.initializer,
+            self.line,
+        )
+        self.names, self.upvalues, self.assigned = {}, upvalues, set()
+        self.temps, self.initializer = itertools.count(), None
+        if initializer:
+            self.initializer = (CELL if 0 in stmt.cells else LOCAL, 0)
+        self.line = stmt.name.line
+        try:
+            parameters, prologue = self._parameters(stmt, method, superclass)
+            body = prologue + self._statements(stmt.body)
+            if initializer:
+                this = self._load(self.initializer, "this", self.line)
+                body.append(ast.Return(value=this))
+            if self.assigned:
+                body.insert(0, ast.Global(names=sorted(self.assigned)))
+            return self._define_factory(stmt, upvalues, superclass, parameters, body)
+        finally:
+            (
+                self.names,
+                self.upvalues,
+                self.assigned,
+                self.temps,
+                self.initializer,
+                self.line,
+            ) = enclosing
+
+    def _stub(
+        self,
+        key: int,
+        stmt: Function,
+        upvalues: Tuple[str, ...],
+        method: bool,
+        superclass: bool,
+    ) -> str:
+        """The factory of a function whose body is not parsed yet: its calls
+        go to ``lox_lazy``, which transpiles the body the first time."""
+        enclosing = self.names
+        self.names = {}
+        try:
+            parameters, _ = self._parameters(stmt, method, superclass)
+        finally:
+            self.names = enclosing
+        captured = [
+            _name(name) for name in self._factory_parameters(upvalues, superclass)
+        ]
+        call = _call(
+            "lox_lazy",
+            ast.Constant(key),
+            ast.Tuple(elts=captured, ctx=ast.Load()),
+            ast.Tuple(elts=[_name(name) for name in parameters], ctx=ast.Load()),
+        )
+        body = [ast.Return(value=call)]
+        return self._define_factory(stmt, upvalues, superclass, parameters, body)
+
+    def _parameters(
+        self, stmt: Function, method: bool, superclass: bool
+    ) -> Tuple[List[str], List[ast.stmt]]:
+        """Parameters of the Python function, and the prologue putting its
+        hidden "super" local and its captured parameters in place."""
+        slots = []
+        if method:
+            slots.append("this")
+            if superclass:
+                slots.append("super")
+        slots.extend(param.lexeme for param in stmt.params)
+        for slot, name in enumerate(slots):
+            self.names[slot] = name
+        parameters = [self._local(name, slot) for slot, name in enumerate(slots)]
+        prologue = []
+        if superclass:
+            value = _name("lox_superclass")
+            if 1 in stmt.cells:
+                value = _call("lox_Cell", value)
+            prologue.append(ast.Assign(targets=[_name("l_super_1", True)], value=value))
+            del parameters[1]
+        for slot in stmt.cells:
+            if slot < len(slots) and not (superclass and slot == 1):
+                name = self._local(slots[slot], slot)
+                cell = _call("lox_Cell", _name(name))
+                prologue.append(ast.Assign(targets=[_name(name, True)], value=cell))
+        return parameters, prologue
+
+    def _factory_parameters(self, upvalues: Tuple[str, ...], superclass: bool):
+        names = ["lox_superclass"] if superclass else []
+        names.extend(f"u_{name}_{index}" for index, name in enumerate(upvalues))
+        return names
+
+    def _define_factory(
+        self,
+        stmt: Function,
+        upvalues: Tuple[str, ...],
+        superclass: bool,
+        parameters: List[str],
+        body: List[ast.stmt],
+    ) -> str:
+        function = f"f_{stmt.name.lexeme}"
+        inner = ast.FunctionDef(
+            name=function,
+            args=_arguments(parameters),
+            body=body or [ast.Pass()],
+            decorator_list=[],
+            returns=None,
+        )
+        name = f"lox_make_{stmt.name.lexeme}_{next(self.counter)}"
+        factory = ast.FunctionDef(
+            name=name,
+            args=_arguments(self._factory_parameters(upvalues, superclass)),
+            body=[inner, ast.Return(value=_name(function))],
+            decorator_list=[],
+            returns=None,
+        )
+        self.factories.append(_at(factory, stmt.name.line))
+        return name
+
+
+def _arguments(names: List[str]) -> ast.arguments:
+    return ast.arguments(
+        posonlyargs=[],
+        args=[ast.arg(arg=name, annotation=None) for name in names],
+        vararg=None,
+        kwonlyargs=[],
+        kw_defaults=[],
+        kwarg=None,
+        defaults=[],
+    )
+
+
+def _continues(stmt: Stmt) -> bool:
+    """Whether ``stmt`` continues the loop whose body it is."""
+    if isinstance(stmt, Continue):
+        return True
+    if isinstance(stmt, Block):
+        return any(_continues(statement) for statement in stmt.statements)
+    if isinstance(stmt, If):
+        return _continues(stmt.then_branch) or (
+            stmt.else_branch is not None and _continues(stmt.else_branch)
+        )
+    return False
+
+
+def transpile_program(statements: List[Stmt], source: str) -> str:
+    """Python source of a whole resolved program, to run as a script.
+
+    Line numbers of the written source are not Lox lines, so the script
+    carries a ``LOX_LINES`` table mapping them back.
+    """
+    transpiler = PythonTranspiler()
+    module = transpiler.module(statements)
+    if transpiler.lazy:
+        raise ValueError("Every function body must be parsed to transpile a program.")
+    module.body.append(_at(ast.Expr(value=_call("lox_exit")), transpiler.line))
+    ast.fix_missing_locations(module)
+    text = ast.unparse(module)
+
+    header = [
+        f"# Transpiled from {source} by plox.",
+        "import logging",
+        "from lox.runtime import *",
+        # Report runtime errors the way plox.py does.
+        'logging.basicConfig(format="%(levelname)s: %(message)s")',
+    ]
+    offset = len(header) + 1
+    lines = {}
+    # Unparsing keeps the tree's shape, so the nodes of the reparsed text
+    # pair up with the generated ones; the innermost node of a line wins.
+    for generated, written in zip(ast.walk(module), ast.walk(ast.parse(text))):
+        assert type(generated) is type(written)
+        if hasattr(written, "lineno"):
+            lines[written.lineno + offset] = generated.lineno
+    header.append(f"LOX_LINES = {lines!r}")
+    return "\n".join(header) + "\n" + text + "\n"
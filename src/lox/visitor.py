@@ -61,6 +61,9 @@ class StmtVisitor(Visitor):
     def visit_while(self, stmt):
         pass
 
+    def visit_for(self, stmt):
+        pass
+
     def visit_break(self, stmt):
         pass
 
@@ -0,0 +1,408 @@
+"""Bytecode virtual machine engine (``--engine=vm``).
+
+``VirtualMachine`` runs the chunks ``BytecodeCompiler`` makes: a stack
+machine with one dispatch loop per call frame. Each Lox call runs its own
+loop over its function's chunk, with a value stack of its own and the
+call's frame (see ``Resolver``) for its locals; the closure's upvalues
+are passed to the loop alongside.
+
+As with the closure engine, runtime values, classes, instances, the
+globals table and the frame pool are shared with ``Interpreter``, and
+runtime errors carry the same tokens and messages.
+"""
+
+from typing import Dict, List
+
+from lox.abc import Stmt
+from lox.bytecode import BytecodeCompiler, Chunk, OpCode
+from lox.environment import Cell
+from lox.error import PloxRuntimeError, runtime_error
+from lox.functions import LoxCallable, LoxClass, LoxFunction, LoxInstance
+from lox.interpreter import Interpreter
+from lox.stmt import Class, Function
+
+# The opcodes as plain ints, for the dispatch loop to compare against.
+(
+    CONSTANT,
+    NIL,
+    TRUE,
+    FALSE,
+    POP,
+    GET_LOCAL,
+    SET_LOCAL,
+    STORE_LOCAL,
+    GET_CELL,
+    SET_CELL,
+    STORE_CELL,
+    NEW_CELL,
+    GET_UPVALUE,
+    SET_UPVALUE,
+    GET_GLOBAL,
+    SET_GLOBAL,
+    DEFINE_GLOBAL,
+    EQUAL,
+    NOT_EQUAL,
+    GREATER,
+    GREATER_EQUAL,
+    LESS,
+    LESS_EQUAL,
+    ADD,
+    SUBTRACT,
+    MULTIPLY,
+    DIVIDE,
+    NOT,
+    NEGATE,
+    PRINT,
+    JUMP,
+    JUMP_IF_FALSE,
+    JUMP_IF_TRUE,
+    POP_JUMP_IF_FALSE,
+    CALL,
+    RETURN,
+    CLOSURE,
+    CLASS,
+    GET_PROPERTY,
+    SET_PROPERTY,
+    GET_SUPER,
+    CHECK_INSTANCE,
+) = (op.value for op in OpCode)
+
+
+class VMFunction(LoxFunction):
+    """A closure whose body runs as bytecode."""
+
+    def __init__(
+        self,
+        declaration: Function,
+        upvalues: List[Cell],
+        is_initializer: bool,
+        super_cls: LoxClass | None = None,
+        bound: List[object] | None = None,
+        chunk: Chunk | None = None,
+    ) -> None:
+        super().__init__(declaration, upvalues, is_initializer, super_cls, bound)
+        # Compiled on first call, so lazily parsed bodies stay lazy.
+        self.chunk = chunk
+
+    def bind(self, instance: LoxInstance):
+        bound = [instance] if self.super_cls is None else [instance, self.super_cls]
+        return VMFunction(
+            self.declaration,
+            self.upvalues,
+            self.is_initializer,
+            self.super_cls,
+            bound,
+            self.chunk,
+        )
+
+    def run(self, interpreter: "VirtualMachine", frame: List[object]) -> object:
+        chunk = self.chunk
+        if chunk is None:
+            chunk = self.chunk = interpreter.compiler.body(self.declaration)
+        if self.bound is not None:
+            frame[: len(self.bound)] = self.bound
+        for slot in self.declaration.cells:
+            frame[slot] = Cell(frame[slot])
+
+        try:
+            value = interpreter.execute_chunk(chunk, frame, self.upvalues)
+        finally:
+            blank, free = interpreter.frames.free[len(frame)]
+            frame[:] = blank
+            free.append(frame)
+        if self.is_initializer:
+            return self.bound[0]
+        return value
+
+
+class VirtualMachine(Interpreter):
+    """Runs programs by compiling each top-level statement to bytecode."""
+
+    def __init__(self) -> None:
+        super().__init__()
+        self.compiler = BytecodeCompiler()
+
+    def interpret(self, stmts: Stmt | List[Stmt]):
+        if not isinstance(stmts, list):
+            stmts = [stmts]
+
+        for stmt in stmts:
+            try:
+                chunk = self.compiler.compile(stmt)
+                self.execute_chunk(chunk, [None] * chunk.frame_size, self.upvalues)
+            except PloxRuntimeError as error:
+                runtime_error(error)
+
+    def capture_from(self, func: Function, frame: list, upvalues: List[Cell]):
+        return [
+            frame[index] if from_frame else upvalues[index]
+            for from_frame, index in func.captures
+        ]
+
+    def execute_chunk(self, chunk: Chunk, frame: list, upvalues: List[Cell]):
+        """Run ``chunk`` in ``frame`` until it returns; returns the value."""
+        code = chunk.code
+        constants = chunk.constants
+        caches = chunk.caches
+        table = self.globals
+        stack: List[object] = []
+        push = stack.append
+        pop = stack.pop
+        ip = 0
+
+        # The most frequent instructions come first.
+        while True:
+            op = code[ip]
+            if op == GET_LOCAL:
+                push(frame[code[ip + 1]])
+                ip += 2
+            elif op == CONSTANT:
+                push(constants[code[ip + 1]])
+                ip += 2
+            elif op == GET_PROPERTY:
+                name = constants[code[ip + 1]]
+                obj = stack[-1]
+                if not isinstance(obj, LoxInstance):
+                    raise PloxRuntimeError(name, "Only instances have properties.")
+                stack[-1] = obj[name]
+                ip += 2
+            elif op == CALL:
+                count = code[ip + 1]
+                callee = stack[-1 - count]
+                if type(callee) is VMFunction:
+                    declaration = callee.declaration
+                    if declaration.body is not None and count == len(
+                        declaration.params
+                    ):
+                        # Move the arguments straight into a pooled frame
+                        # (FramePool.acquire, inlined).
+                        pool = self.frames
+                        blank, free = pool.free.get(declaration.frame_size) or pool.add(
+                            declaration.frame_size
+                        )
+                        if free:
+                            pool.hits += 1
+                            callee_frame = free.pop()
+                        else:
+                            pool.misses += 1
+                            callee_frame = list(blank)
+                        if count:
+                            slot = callee.first_param()
+                            callee_frame[slot : slot + count] = stack[-count:]
+                            del stack[-count:]
+                        stack[-1] = callee.run(self, callee_frame)
+                        ip += 2
+                        continue
+                arguments = stack[len(stack) - count :]
+                del stack[len(stack) - count :]
+                if not isinstance(callee, LoxCallable):
+                    raise PloxRuntimeError(
+                        chunk.tokens[ip], "Can only call functions and classes."
+                    )
+                if count != callee.arity():
+                    raise PloxRuntimeError(
+                        chunk.tokens[ip],
+                        f"Expected {callee.arity()} arguments but got {count}.",
+                    )
+                stack[-1] = callee(self, arguments)
+                ip += 2
+            elif op == POP_JUMP_IF_FALSE:
+                value = pop()
+                if value is None or value is False:
+                    ip = code[ip + 1]
+                else:
+                    ip += 2
+            elif op == GET_GLOBAL:
+                cache = caches[code[ip + 2]]
+                if cache[1] != table.version:
+                    cache[0] = table.slot(constants[code[ip + 1]])
+                    cache[1] = table.version
+                push(table.values[cache[0]])
+                ip += 3
+            elif op == ADD:
+                b = pop()
+                a = stack[-1]
+                if (isinstance(a, float) and isinstance(b, float)) or (
+                    isinstance(a, str) and isinstance(b, str)
+                ):
+                    stack[-1] = a + b
+                else:
+                    raise PloxRuntimeError(
+                        chunk.tokens[ip], "Operands must be two numbers or two strings."
+                    )
+                ip += 1
+            elif op == LESS:
+                b = pop()
+                stack[-1] = stack[-1] < b
+                ip += 1
+            elif op == SUBTRACT:
+                b = pop()
+                a = stack[-1]
+                if not (isinstance(a, float) and isinstance(b, float)):
+                    raise PloxRuntimeError(
+                        chunk.tokens[ip], "Operand must be a number."
+                    )
+                stack[-1] = a - b
+                ip += 1
+            elif op == SET_LOCAL:
+                frame[code[ip + 1]] = stack[-1]
+                ip += 2
+            elif op == STORE_LOCAL:
+                frame[code[ip + 1]] = pop()
+                ip += 2
+            elif op == POP:
+                pop()
+                ip += 1
+            elif op == JUMP:
+                ip = code[ip + 1]
+            elif op == RETURN:
+                return pop()
+            elif op == NIL:
+                push(None)
+                ip += 1
+            elif op == CHECK_INSTANCE:
+                if not isinstance(stack[-1], LoxInstance):
+                    raise PloxRuntimeError(
+                        constants[code[ip + 1]], "Only instances have fields."
+                    )
+                ip += 2
+            elif op == SET_PROPERTY:
+                value = pop()
+                stack[-1][constants[code[ip + 1]]] = value
+                stack[-1] = value
+                ip += 2
+            elif op == GET_CELL:
+                push(frame[code[ip + 1]].value)
+                ip += 2
+            elif op == GET_UPVALUE:
+                push(upvalues[code[ip + 1]].value)
+                ip += 2
+            elif op == EQUAL:
+                b = pop()
+                stack[-1] = stack[-1] == b
+                ip += 1
+            elif op == MULTIPLY:
+                b = pop()
+                a = stack[-1]
+                if not (isinstance(a, float) and isinstance(b, float)):
+                    raise PloxRuntimeError(
+                        chunk.tokens[ip], "Operand must be a number."
+                    )
+                stack[-1] = a * b
+                ip += 1
+            elif op == SET_GLOBAL:
+                cache = caches[code[ip + 2]]
+                if cache[1] != table.version:
+                    cache[0] = table.slot(constants[code[ip + 1]])
+                    cache[1] = table.version
+                table.values[cache[0]] = stack[-1]
+                ip += 3
+            elif op == SET_CELL:
+                frame[code[ip + 1]].value = stack[-1]
+                ip += 2
+            elif op == SET_UPVALUE:
+                upvalues[code[ip + 1]].value = stack[-1]
+                ip += 2
+            elif op == GET_SUPER:
+                name = constants[code[ip + 1]]
+                super_cls: LoxClass = pop()
+                method = super_cls.find_method(name.lexeme)
+                if method is None:
+                    raise PloxRuntimeError(name, f"Undefined property '{name.lexeme}'.")
+                stack[-1] = method.bind(stack[-1])
+                ip += 2
+            elif op == GREATER:
+                b = pop()
+                stack[-1] = stack[-1] > b
+                ip += 1
+            elif op == LESS_EQUAL:
+                b = pop()
+                stack[-1] = stack[-1] <= b
+                ip += 1
+            elif op == GREATER_EQUAL:
+                b = pop()
+                stack[-1] = stack[-1] >= b
+                ip += 1
+            elif op == NOT_EQUAL:
+                b = pop()
+                stack[-1] = stack[-1] != b
+                ip += 1
+            elif op == DIVIDE:
+                b = pop()
+                a = stack[-1]
+                if not (isinstance(a, float) and isinstance(b, float)):
+                    raise PloxRuntimeError(
+                        chunk.tokens[ip], "Operand must be a number."
+                    )
+                if b == 0:
+                    raise PloxRuntimeError(chunk.tokens[ip], "Division by zero.")
+                stack[-1] = a / b
+                ip += 1
+            elif op == TRUE:
+                push(True)
+                ip += 1
+            elif op == FALSE:
+                push(False)
+                ip += 1
+            elif op == NOT:
+                value = stack[-1]
+                stack[-1] = value is None or value is False
+                ip += 1
+            elif op == NEGATE:
+                stack[-1] = -float(stack[-1])
+                ip += 1
+            elif op == JUMP_IF_FALSE:
+                value = stack[-1]
+                if value is None or value is False:
+                    ip = code[ip + 1]
+                else:
+                    ip += 2
+            elif op == JUMP_IF_TRUE:
+                value = stack[-1]
+                if value is None or value is False:
+                    ip += 2
+                else:
+                    ip = code[ip + 1]
+            elif op == PRINT:
+                value = pop()
+                if isinstance(value, bool):
+                    print("true" if value else "false")
+                else:
+                    print(self.stringify(value))
+                ip += 1
+            elif op == STORE_CELL:
+                # A fresh cell each time the declaration runs, so closures
+                # made in different loop iterations do not share it.
+                frame[code[ip + 1]] = Cell(pop())
+                ip += 2
+            elif op == NEW_CELL:
+                frame[code[ip + 1]] = Cell()
+                ip += 2
+            elif op == DEFINE_GLOBAL:
+                table.define(constants[code[ip + 1]].lexeme, pop())
+                ip += 2
+            elif op == CLOSURE:
+                func: Function = constants[code[ip + 1]]
+                push(VMFunction(func, self.capture_from(func, frame, upvalues), False))
+                ip += 2
+            elif op == CLASS:
+                stmt: Class = constants[code[ip + 1]]
+                super_cls = None
+                if stmt.super_cls is not None:
+                    super_cls = pop()
+                    if not isinstance(super_cls, LoxClass):
+                        raise PloxRuntimeError(
+                            chunk.tokens[ip], "Superclass must be a class."
+                        )
+                methods: Dict[str, LoxFunction] = {}
+                for method in stmt.methods:
+                    methods[method.name.lexeme] = VMFunction(
+                        method,
+                        self.capture_from(method, frame, upvalues),
+                        method.name.lexeme == "init",
+                        super_cls,
+                    )
+                push(LoxClass(stmt.name.lexeme, super_cls, methods))
+                ip += 2
+            else:
+                raise ValueError(f"Unknown opcode {op}.")
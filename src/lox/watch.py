@@ -0,0 +1,159 @@
+import re
+import time
+from typing import Dict, Iterator, List, Tuple
+
+from lox import error
+from lox.abc import Stmt
+from lox.interpreter import Interpreter
+from lox.parser import Parser
+from lox.resolver import Resolver
+from lox.scanner import RegexScanner
+from lox.token import Token
+
+# Just enough of the lexical grammar to find where top-level declarations
+# end: strings and comments are skipped so their brackets do not count.
+BOUNDARY = re.compile(r'"[^"]*"?|//[^\n]*|[(){};]')
+ELSE = re.compile(r"(?:\s|//[^\n]*)*else\b")
+INDENT = re.compile(r"\s*")
+
+
+def split_declarations(source: str) -> Iterator[Tuple[int, str]]:
+    """Yield ``(line, text)`` for each top-level declaration in ``source``.
+
+    A declaration ends at a ``;`` or ``}`` outside any brackets, unless an
+    ``else`` follows. Comments stay with the declaration below them.
+    Unbalanced input simply yields one long chunk for the parser to reject.
+    """
+    line = 1
+    start = INDENT.match(source).end()
+    line += source.count("\n", 0, start)
+    paren = brace = 0
+    for match in BOUNDARY.finditer(source, start):
+        char = match.group()
+        if char == "(":
+            paren += 1
+        elif char == ")":
+            paren = max(paren - 1, 0)
+        elif char == "{":
+            brace += 1
+        elif char == "}":
+            brace = max(brace - 1, 0)
+        if char not in (";", "}") or paren or brace:
+            continue
+        if ELSE.match(source, match.end()):
+            continue
+
+        end = match.end()
+        yield line, source[start:end]
+        next_start = INDENT.match(source, end).end()
+        line += source.count("\n", start, next_start)
+        start = next_start
+
+    if start < len(source):
+        yield line, source[start:]
+
+
+class Unit:
+    """One compiled top-level declaration and the tokens it was built from."""
+
+    __slots__ = ("line", "tokens", "statements")
+
+    def __init__(self, line: int, tokens: List[Token], statements: List[Stmt]) -> None:
+        self.line = line
+        self.tokens = tokens
+        self.statements = statements
+
+    def move_to(self, line: int) -> None:
+        # The AST holds these same tokens, so error lines follow along.
+        delta = line - self.line
+        if delta:
+            for token in self.tokens:
+                token.line += delta
+            self.line = line
+
+
+class ReloadReport:
+    """Seconds spent per phase on one reload, and how much was reused."""
+
+    PHASES = ("split", "scan", "parse", "resolve", "execute")
+
+    def __init__(self) -> None:
+        self.seconds: Dict[str, float] = dict.fromkeys(self.PHASES, 0.0)
+        self.compiled = 0
+        self.reused = 0
+
+    def __str__(self) -> str:
+        total = self.compiled + self.reused
+        phases = " ".join(
+            f"{phase} {seconds * 1000:.1f}ms" for phase, seconds in self.seconds.items()
+        )
+        return f"[watch] recompiled {self.compiled}/{total} declarations; {phases}"
+
+
+class IncrementalCompiler:
+    """Compiles a script one top-level declaration at a time, across edits.
+
+    Each declaration is keyed by its source text. On recompiling, any
+    declaration whose text is unchanged reuses its resolved statements from
+    before, and only its token lines are shifted when it
+    moved. Top-level names are globals and are never in a resolver scope,
+    so every declaration resolves on its own.
+    """
+
+    def __init__(self) -> None:
+        self.units: Dict[str, List[Unit]] = {}
+        self.report = ReloadReport()
+
+    def compile(self, source: str) -> List[Stmt] | None:
+        """Parse and resolve ``source``; None if a compile error was reported."""
+        self.report = report = ReloadReport()
+        start = time.perf_counter()
+        chunks = list(split_declarations(source))
+        report.seconds["split"] = time.perf_counter() - start
+
+        previous, self.units = self.units, {}
+        statements: List[Stmt] = []
+        failed = False
+        for line, text in chunks:
+            pool = previous.get(text)
+            if pool:
+                unit = pool.pop()
+                unit.move_to(line)
+                report.reused += 1
+            else:
+                unit = self._compile_unit(line, text)
+                report.compiled += 1
+                if unit is None:
+                    failed = True
+                    continue
+            self.units.setdefault(text, []).append(unit)
+            statements.extend(unit.statements)
+
+        if failed:
+            return None
+        return statements
+
+    def _compile_unit(self, line: int, text: str) -> Unit | None:
+        seconds = self.report.seconds
+        had_error, error.has_error = error.has_error, False
+        try:
+            start = time.perf_counter()
+            scanner = RegexScanner(text)
+            scanner.line = line
+            tokens = scanner.scan_tokens()
+            scanned = time.perf_counter()
+            seconds["scan"] += scanned - start
+
+            statements = Parser(tokens).parse()
+            parsed = time.perf_counter()
+            seconds["parse"] += parsed - scanned
+            if error.has_error:
+                return None
+
+            Resolver(Interpreter()).resolve(statements)
+            seconds["resolve"] += time.perf_counter() - parsed
+            if error.has_error:
+                return None
+            return Unit(line, tokens, statements)
+        finally:
+            error.has_error = had_error or error.has_error
@@ -3,6 +3,9 @@ import os
 
 logger = logging.getLogger(__name__)
 
+# The engines that walk the AST, and so run its operator nodes.
+TREE_ENGINES = ("tree", "tree-exceptions")
+
 
 def validate_args(args):
     """Validate CLI arguments.
@@ -10,11 +13,45 @@ def validate_args(args):
     Rules:
     - Only an optional positional FILE is supported; if provided, ensure it exists.
     - With no FILE, we default to REPL mode.
+    - --mem-report needs a FILE to measure, --disassemble one to compile.
+    - --watch needs a FILE to watch, and compiles eagerly, so not --lazy.
+    - --profile-in/--profile-out and --infer-types need a FILE to run, and
+      --profile-in an existing profile. Only the tree-walking engines
+      quicken operators, so the profile options and --infer-types need one
+      of them. --watch, --mem-report and --disassemble ignore them.
     """
 
     positional = getattr(args, "file", None)
     if positional is not None and not os.path.isfile(positional):
         raise FileNotFoundError(f"The file at path '{positional}' does not exist.")
+    if positional is None and getattr(args, "mem_report", False):
+        raise ValueError("--mem-report requires a FILE.")
+    if positional is None and getattr(args, "disassemble", False):
+        raise ValueError("--disassemble requires a FILE.")
+    for option in ("profile_in", "profile_out", "infer_types"):
+        if positional is None and getattr(args, option, None):
+            raise ValueError(f"--{option.replace('_', '-')} requires a FILE.")
+    profile = getattr(args, "profile_in", None)
+    if profile is not None and not os.path.isfile(profile):
+        raise FileNotFoundError(f"The profile at path '{profile}' does not exist.")
+    engine = getattr(args, "engine", "tree")
+    for option in ("profile_in", "profile_out", "infer_types"):
+        if getattr(args, option, None) and engine not in TREE_ENGINES:
+            raise ValueError(
+                f"--{option.replace('_', '-')} cannot be combined with "
+                f"--engine={engine}."
+            )
+        for mode in ("watch", "mem_report", "disassemble"):
+            if getattr(args, option, None) and getattr(args, mode, False):
+                raise ValueError(
+                    f"--{option.replace('_', '-')} cannot be combined with "
+                    f"--{mode.replace('_', '-')}."
+                )
+    if getattr(args, "watch", False):
+        if positional is None:
+            raise ValueError("--watch requires a FILE.")
+        if getattr(args, "lazy", False):
+            raise ValueError("--watch cannot be combined with --lazy.")
 
     logger.debug(f"Args validated. file={positional}")
 
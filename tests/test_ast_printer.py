@@ -1,5 +1,7 @@
 from lox.ast_printer import AstPrinter
 from lox.expr import Binary, Grouping, Literal, Unary
+from lox.parser import Parser
+from lox.scanner import RegexScanner
 from lox.token import Token, TokenType
 
 
@@ -46,3 +48,13 @@ def test_nested_binary_expression():
 
     out = AstPrinter().print(expr)
     assert out == "(+ 1 (* 2 3))"
+
+
+def test_prints_for_statement():
+    source = "for (var i = 0; i < 3; i = i + 1) print i;\nfor (;;) break;\n"
+    stmts = Parser(RegexScanner(source).scan_tokens()).parse()
+    printer = AstPrinter()
+    assert printer.print(stmts[0]) == (
+        "(for (var i 0.0) (< i 3.0) (= i (+ i 1.0)) (print i))"
+    )
+    assert printer.print(stmts[1]) == "(for () () () (break))"
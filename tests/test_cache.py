@@ -0,0 +1,64 @@
+import io
+import os
+
+from lox.cache import ProgramCache
+from lox.interpreter import Interpreter
+from lox.parser import Parser
+from lox.resolver import Resolver
+from lox.scanner import RegexScanner
+
+SOURCE = (
+    "fun make() { var n = 0; fun inc() { n = n + 1; return n; } return inc; }\n"
+    "var counter = make();\n"
+    "counter();\n"
+    "for (var i = 0; i < 2; i = i + 1) print counter() + i;\n"
+)
+
+
+def compile_source(source: str, interpreter: Interpreter):
+    statements = Parser(RegexScanner(source).scan_tokens()).parse()
+    Resolver(interpreter).resolve(statements)
+    return statements
+
+
+def test_cached_program_keeps_resolution(tmp_path, capsys):
+    cache = ProgramCache(str(tmp_path))
+    key = cache.key(SOURCE, False, False)
+    assert cache.load(key) is None
+
+    interpreter = Interpreter()
+    cache.store(key, compile_source(SOURCE, interpreter))
+
+    Interpreter().interpret(cache.load(key))
+    assert capsys.readouterr().out.splitlines() == ["2", "4"]
+
+
+def test_key_depends_on_source_and_options():
+    assert ProgramCache.key(SOURCE, False) != ProgramCache.key(SOURCE + " ", False)
+    assert ProgramCache.key(SOURCE, False) != ProgramCache.key(SOURCE, True)
+    # A file is hashed a chunk at a time, to the same key.
+    assert ProgramCache.key(io.StringIO(SOURCE), False) == ProgramCache.key(
+        SOURCE, False
+    )
+
+
+def test_failed_store_leaves_nothing_behind(tmp_path):
+    cache = ProgramCache(str(tmp_path))
+    program: list = []
+    for _ in range(100_000):
+        program = [program]
+    # Too deep to pickle: RecursionError once the temporary file exists.
+    cache.store("deep", program)
+    assert os.listdir(tmp_path) == []
+
+
+def test_eviction_drops_least_recently_used(tmp_path):
+    cache = ProgramCache(str(tmp_path))
+    interpreter = Interpreter()
+    program = compile_source(SOURCE, interpreter)
+    cache.store("old", program)
+    os.utime(cache.path("old"), (0, 0))
+    cache.max_bytes = os.path.getsize(cache.path("old")) + 1
+    cache.store("new", program)
+    assert not os.path.exists(cache.path("old"))
+    assert os.path.exists(cache.path("new"))
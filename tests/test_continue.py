@@ -25,3 +25,15 @@ def test_continue_in_while_skips_body_rest_and_continues(capsys):
     )
     out_lines = run_source(source, capsys)
     assert out_lines == ["1", "3", "5"]
+
+
+def test_continue_in_for_still_runs_increment(capsys):
+    source = (
+        "var i;\n"
+        "for (i = 0; i < 5; i = i + 1) {\n"
+        "  if (i == 2) continue;\n"
+        "  print i;\n"
+        "}\n"
+    )
+    out_lines = run_source(source, capsys)
+    assert out_lines == ["0", "1", "3", "4"]
@@ -0,0 +1,177 @@
+import logging
+
+import pytest
+
+from lox import error
+from lox.bytecode import disassemble_program
+from lox.engines import ENGINES
+from lox.interpreter import Interpreter
+from lox.parser import Parser
+from lox.resolver import Resolver
+from lox.scanner import RegexScanner
+from lox.transpiler import transpile_program
+
+PROGRAMS = {
+    "expressions": (
+        'print 1 + 2 * 3 - 4 / 2; print "a" + "b"; print -(3);\n'
+        "print 1 < 2; print 2 <= 1; print 3 > 2; print 3 >= 4;\n"
+        'print 1 == 1; print nil == false; print "x" != "y"; print !nil;\n'
+        'print nil or "or"; print false and 1; print 1 and 2;\n',
+        ["5", "ab", "-3", "true", "false", "true", "false", "true", "false"]
+        + ["true", "true", "or", "false", "2"],
+    ),
+    "control flow": (
+        "var total = 0;\n"
+        "for (var i = 0; i < 10; i = i + 1) {\n"
+        "  if (i == 2) continue;\n"
+        "  if (i == 6) break;\n"
+        "  total = total + i;\n"
+        "}\n"
+        "var j = 0;\n"
+        "while (true) { j = j + 1; if (j < 3) continue; break; }\n"
+        "fun first(n) { for (var k = 0; ; k = k + 1) if (k * k > n) return k; }\n"
+        "print total; print j; print first(50);\n",
+        ["13", "3", "8"],
+    ),
+    "closures": (
+        "fun counter() { var n = 0; fun inc() { n = n + 1; return n; } return inc; }\n"
+        "var a = counter(); var b = counter();\n"
+        "print a(); print a(); print b();\n"
+        "var saved = nil;\n"
+        "for (var i = 0; i < 3; i = i + 1) {\n"
+        "  var j = i;\n"
+        "  fun get() { return j; }\n"
+        "  if (i == 0) saved = get; else print saved() + get();\n"
+        "}\n"
+        "fun outer(x) {\n"
+        "  fun middle() { fun inner() { x = x + 1; return x; } return inner; }\n"
+        "  var f = middle(); f(); return f;\n"
+        "}\n"
+        "print outer(10)();\n",
+        ["1", "2", "1", "1", "2", "12"],
+    ),
+    "classes": (
+        "class A {\n"
+        "  init(name) { this.name = name; }\n"
+        '  hello() { return "hi " + this.name; }\n'
+        "  getter() { fun get() { return this.name; } return get; }\n"
+        "}\n"
+        "class B < A {\n"
+        '  hello() { return super.hello() + "!"; }\n'
+        "}\n"
+        'var b = B("bo");\n'
+        "print b.hello(); print b.getter()();\n"
+        "var method = b.hello; print method();\n"
+        'print b.init("re").name; print b; print B; print clock() > 0;\n'
+        "fun local() { class C { me() { return C; } } return C().me(); }\n"
+        "print local();\n",
+        ["hi bo!", "bo", "hi bo!", "re", "<instance of B>", "<class B>", "true"]
+        + ["<class C>"],
+    ),
+    "recursion": (
+        "fun fib(n) { if (n < 2) return n; return fib(n - 1) + fib(n - 2); }\n"
+        "print fib(15);\n",
+        ["610"],
+    ),
+}
+
+ERRORS = {
+    "operand": ('print 1 - "a";', "[line 1] Operand must be a number."),
+    "plus": ('print 1 + "a";', "[line 1] Operands must be two numbers or two strings."),
+    "division": ("print 1 / 0;", "[line 1] Division by zero."),
+    "undefined": ("print nope;", "[line 1] Undefined variable 'nope'."),
+    "assign undefined": ("nope = 1;", "[line 1] Undefined variable 'nope'."),
+    "not callable": ('"text"();', "[line 1] Can only call functions and classes."),
+    "arity": ("fun f(a) {} f(1, 2);", "[line 1] Expected 1 arguments but got 2."),
+    "property": ("var x = 1; print x.y;", "[line 1] Only instances have properties."),
+    "field": ("var x = 1; x.y = 2;", "[line 1] Only instances have fields."),
+    "superclass": ("var x = 1; class A < x {}", "[line 1] Superclass must be a class."),
+    "in a call": (
+        "var a = 1;\nfun f() {\n  return a - nil;\n}\nf();",
+        "[line 3] Operand must be a number.",
+    ),
+    "undefined property": (
+        "class A {} var a = A(); print a.missing;",
+        "[line 1] Undefined property 'missing'.",
+    ),
+    "super method": (
+        "class A {} class B < A { m() { return super.m(); } } B().m();",
+        "[line 1] Undefined property 'm'.",
+    ),
+}
+
+
+def run(engine, source, capsys, caplog, lazy=False):
+    error.has_error = error.has_runtime_error = False
+    statements = Parser(RegexScanner(source).scan_tokens(), lazy=lazy).parse()
+    interpreter = ENGINES[engine]()
+    Resolver(interpreter).resolve(statements)
+    with caplog.at_level(logging.ERROR):
+        interpreter.interpret(statements)
+    errors = [record.getMessage().strip() for record in caplog.records]
+    caplog.clear()
+    return capsys.readouterr().out.splitlines(), errors
+
+
+@pytest.mark.parametrize("engine", list(ENGINES))
+@pytest.mark.parametrize("lazy", [False, True])
+@pytest.mark.parametrize("program", list(PROGRAMS))
+def test_engines_agree_on_output(engine, lazy, program, capsys, caplog):
+    source, expected = PROGRAMS[program]
+    assert run(engine, source, capsys, caplog, lazy=lazy) == (expected, [])
+
+
+@pytest.mark.parametrize("engine", list(ENGINES))
+@pytest.mark.parametrize("case", list(ERRORS))
+def test_engines_report_the_same_runtime_errors(engine, case, capsys, caplog):
+    source, message = ERRORS[case]
+    out, errors = run(engine, source, capsys, caplog)
+    assert errors == [message]
+    assert error.has_runtime_error
+    error.has_runtime_error = False
+
+
+@pytest.mark.parametrize("engine", list(ENGINES))
+def test_engines_keep_state_across_inputs(engine, capsys, caplog):
+    interpreter = ENGINES[engine]()
+    resolver = Resolver(interpreter)
+    for source in ["fun add(a, b) { return a + b; }", "var x = add(1, 2);"]:
+        statements = Parser(RegexScanner(source).scan_tokens()).parse()
+        resolver.resolve(statements)
+        interpreter.interpret(statements)
+    statements = Parser(RegexScanner("print add(x, x);").scan_tokens()).parse()
+    resolver.resolve(statements)
+    interpreter.interpret(statements)
+    assert capsys.readouterr().out.splitlines() == ["6"]
+
+
+def test_disassembly_lists_every_function_and_jump():
+    source = (
+        "fun f(n) { while (n > 0) { n = n - 1; if (n == 2) break; } return n; }\n"
+        "class A { m() { return f(5); } }\n"
+    )
+    statements = Parser(RegexScanner(source).scan_tokens()).parse()
+    Resolver(Interpreter()).resolve(statements)
+    listing = disassemble_program(statements)
+    names = [line for line in listing.splitlines() if line.startswith("==")]
+    assert names == ["== <script> ==", "== <script> ==", "== f ==", "== m =="]
+    assert "CLOSURE           0 (<fn f>)" in listing
+    assert "GET_GLOBAL        0 0 (f)" in listing
+    # break leaves the loop with a jump past its end
+    assert "JUMP              " in listing
+
+
+def test_transpiled_script_reports_lox_lines(capsys, caplog):
+    source = 'var a = 1;\nfun f() {\n  return a - "b";\n}\nprint a;\nf();\n'
+    statements = Parser(RegexScanner(source).scan_tokens()).parse()
+    Resolver(Interpreter()).resolve(statements)
+    script = transpile_program(statements, "test.lox")
+    assert script.startswith("# Transpiled from test.lox by plox.")
+    error.has_runtime_error = False
+    with caplog.at_level(logging.ERROR), pytest.raises(SystemExit) as exit:
+        exec(compile(script, "test.py", "exec"), {})
+    assert exit.value.code == 70
+    assert capsys.readouterr().out.splitlines() == ["1"]
+    errors = [record.getMessage().strip() for record in caplog.records]
+    assert errors == ["[line 3] Operand must be a number."]
+    error.has_runtime_error = False
@@ -0,0 +1,157 @@
+from dataclasses import fields
+
+from lox.abc import Expr, Stmt
+from lox.environment import LOCAL
+from lox.expr import Variable
+from lox.interpreter import Interpreter
+from lox.parser import Parser
+from lox.resolver import Resolver
+from lox.scanner import RegexScanner
+
+SOURCE = (
+    "var g = 1;\n"
+    "fun f(a, b) {\n"
+    "  var c = a;\n"
+    "  { var d = b; print c + d + g; }\n"
+    "  class K { get() { return this; } }\n"
+    "  return K;\n"
+    "}\n"
+    "print f(2, 3);\n"
+)
+
+
+def test_locals_resolve_to_frame_slots(capsys):
+    statements = Parser(RegexScanner(SOURCE).scan_tokens()).parse()
+    interpreter = Interpreter()
+    Resolver(interpreter).resolve(statements)
+
+    slots = {}
+    stack = list(statements)
+    while stack:
+        node = stack.pop()
+        if isinstance(node, Variable):
+            slots[node.name.lexeme] = node.resolved
+        elif isinstance(node, (Expr, Stmt)):
+            stack.extend(getattr(node, field.name) for field in fields(node))
+        elif isinstance(node, list):
+            stack.extend(node)
+    # a, b are the first slots of f's frame, then c; the inner block's d
+    # shares the frame.
+    assert slots.pop("g") is slots.pop("f") is None
+    assert slots == {
+        "a": (LOCAL, 0),
+        "b": (LOCAL, 1),
+        "c": (LOCAL, 2),
+        "d": (LOCAL, 3),
+        "K": (LOCAL, 4),
+    }
+
+    interpreter.interpret(statements)
+    assert capsys.readouterr().out.splitlines() == ["6", "<class K>"]
+
+
+def test_global_slots_follow_redefinition_and_interpreters(capsys):
+    def compile(source):
+        statements = Parser(RegexScanner(source).scan_tokens()).parse()
+        Resolver(Interpreter()).resolve(statements)
+        return statements
+
+    show = compile("print x;")
+    first = Interpreter()
+    first.interpret(compile("var x = 1;"))
+    first.interpret(show)
+    # Redefining keeps the slot; defining a new name changes the layout.
+    first.interpret(compile('var x = "one"; var y = 2;'))
+    first.interpret(show)
+
+    # The same nodes run against another interpreter's globals.
+    second = Interpreter()
+    second.interpret(compile("var y = 0; var x = 3;"))
+    second.interpret(show)
+    assert capsys.readouterr().out.splitlines() == ["1", "one", "3"]
+
+
+def test_captured_locals_get_a_fresh_cell_per_declaration(capsys):
+    source = (
+        "fun f() {\n"
+        "  var fns = nil;\n"
+        "  for (var i = 0; i < 2; i = i + 1) {\n"
+        "    var j = i;\n"
+        "    { var j = 10; print j; }\n"
+        "    fun get() { return j; }\n"
+        "    if (i == 0) fns = get; else print fns() + get();\n"
+        "  }\n"
+        "}\n"
+        "f();\n"
+    )
+    statements = Parser(RegexScanner(source).scan_tokens()).parse()
+    Resolver(Interpreter()).resolve(statements)
+    function = statements[0]
+    loop = function.body[1]
+    body = loop.body
+    # Every scope shares f's frame: fns, i, j, the inner block's j, get.
+    assert function.frame_size == 5
+    assert loop.frame_size is None
+    assert body.frame_size is None
+    # Only j is captured; get's closure holds its cell and nothing else.
+    declarations = [loop.initializer, body.statements[0], body.statements[2]]
+    assert [stmt.cell for stmt in declarations] == [False, True, False]
+    assert body.statements[2].captures == ((True, 2),)
+
+    Interpreter().interpret(statements)
+    assert capsys.readouterr().out.splitlines() == ["10", "10", "1"]
+
+
+def test_closures_keep_only_the_cells_they_use(capsys):
+    source = (
+        "fun make() {\n"
+        "  var unused = 1;\n"
+        "  var count = 0;\n"
+        "  fun outer(step) {\n"
+        "    fun inner() { count = count + step; return count; }\n"
+        "    return inner;\n"
+        "  }\n"
+        "  var add = outer(2);\n"
+        "  add();\n"
+        "  print count;\n"
+        "  return add;\n"
+        "}\n"
+        "var add = make();\n"
+        "print add();\n"
+    )
+    statements = Parser(RegexScanner(source).scan_tokens()).parse()
+    interpreter = Interpreter()
+    Resolver(interpreter).resolve(statements)
+    interpreter.interpret(statements)
+    # The assignment through the closure is seen by make's frame, and the
+    # closure holds count's cell and the captured parameter, not ``unused``.
+    assert capsys.readouterr().out.splitlines() == ["2", "4"]
+    add = interpreter.globals.get(statements[1].name)
+    assert [cell.value for cell in add.upvalues] == [4.0, 2.0]
+
+
+def test_calls_reuse_pooled_frames(capsys):
+    source = (
+        "fun sum(n) { if (n == 0) return 0; var rest = sum(n - 1); return n + rest; }\n"
+        "print sum(5);\n"
+        "fun keep(x) { fun get() { return x; } return get; }\n"
+        "var one = keep(1);\n"
+        "var two = keep(2);\n"
+        "print one() + sum(5) + two();\n"
+    )
+    statements = Parser(RegexScanner(source).scan_tokens()).parse()
+    interpreter = Interpreter()
+    Resolver(interpreter).resolve(statements)
+    interpreter.interpret(statements)
+    assert capsys.readouterr().out.splitlines() == ["15", "18"]
+
+    pool = interpreter.frames
+    # The first sum(5) nests six two-slot frames, which the keep calls and
+    # the second sum(5) reuse; only the first get() needs a new empty one.
+    assert (pool.hits, pool.misses) == (9, 7)
+    # Released frames hold nothing; captured parameters live on in cells.
+    assert all(
+        frame == [None] * size
+        for size, (_, free) in pool.free.items()
+        for frame in free
+    )
@@ -0,0 +1,88 @@
+import json
+
+from lox import operators
+from lox.feedback import Profile, source_digest
+from lox.interpreter import Interpreter
+from lox.parser import Parser
+from lox.resolver import Resolver
+from lox.scanner import RegexScanner
+
+SOURCE = (
+    "fun fib(n) { if (n < 2) return n; return fib(n - 1) + fib(n - 2); }\n"
+    "fun twice(s) { return s + s; }\n"
+    'print fib(10); print twice("ab");\n'
+)
+
+
+def compile_source(source: str, interpreter: Interpreter, lazy: bool = False):
+    statements = Parser(RegexScanner(source).scan_tokens(), lazy=lazy).parse()
+    Resolver(interpreter).resolve(statements)
+    return statements
+
+
+def test_profile_warm_starts_a_later_run(tmp_path, capsys):
+    interpreter = Interpreter()
+    statements = compile_source(SOURCE, interpreter, lazy=True)
+    interpreter.interpret(statements)
+    # The + of fib specializes once, however deep the recursion below it.
+    assert interpreter.quickening.specializations == 5
+    path = str(tmp_path / "profile.json")
+    Profile.record(source_digest(SOURCE), statements).save(path)
+
+    interpreter = Interpreter()
+    statements = compile_source(SOURCE, interpreter, lazy=True)
+    Profile.load(path, source_digest(SOURCE)).apply(statements, interpreter)
+    fib, twice = statements[0], statements[1]
+    assert fib.body is not None and twice.body is not None
+    assert twice.body[0].value.operate is operators.concatenate
+    interpreter.interpret(statements)
+    assert interpreter.quickening.specializations == 0
+    assert capsys.readouterr().out.splitlines() == ["55", "abab"] * 2
+
+
+def test_profile_of_other_source_is_ignored(tmp_path):
+    interpreter = Interpreter()
+    statements = compile_source(SOURCE, interpreter)
+    interpreter.interpret(statements)
+    path = str(tmp_path / "profile.json")
+    Profile.record(source_digest(SOURCE), statements).save(path)
+
+    profile = Profile.load(path, source_digest(SOURCE + "print 1;"))
+    assert profile.operators == {} and profile.functions == set()
+
+
+def test_unreadable_profiles_are_ignored(tmp_path, caplog):
+    digest = source_digest(SOURCE)
+    truncated = tmp_path / "truncated.json"
+    truncated.write_text('{"format": 1, "sou')
+    incomplete = tmp_path / "incomplete.json"
+    incomplete.write_text(json.dumps({"format": 1, "source": digest}))
+    for path in (tmp_path / "missing.json", truncated, incomplete):
+        profile = Profile.load(str(path), digest)
+        assert profile.operators == {} and profile.functions == set()
+    assert len(caplog.records) == 3
+
+
+def test_profile_binds_operator_functions_only(tmp_path, capsys):
+    interpreter = Interpreter()
+    statements = compile_source(SOURCE, interpreter)
+    fib = statements[0]
+    minus, plus = fib.body[1].value.left.arguments[0], fib.body[1].value
+    path = tmp_path / "profile.json"
+    # A helper of lox.operators, and a unary function at a binary site.
+    recorded = {str(minus.op.offset): "specialize", str(plus.op.offset): "negate"}
+    path.write_text(
+        json.dumps(
+            {
+                "format": 1,
+                "source": source_digest(SOURCE),
+                "operators": recorded,
+                "functions": [],
+            }
+        )
+    )
+    Profile.load(str(path), source_digest(SOURCE)).apply(statements, interpreter)
+    assert minus.operate is operators.subtract
+    assert plus.operate is operators.add
+    interpreter.interpret(statements)
+    assert capsys.readouterr().out.splitlines() == ["55", "abab"]
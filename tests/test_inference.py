@@ -0,0 +1,63 @@
+import logging
+
+from lox import error, operators
+from lox.inference import infer_types
+from lox.interpreter import Interpreter
+from lox.parser import Parser
+from lox.resolver import Resolver
+from lox.scanner import RegexScanner
+
+
+def compile_source(source: str, interpreter: Interpreter):
+    statements = Parser(RegexScanner(source).scan_tokens()).parse()
+    Resolver(interpreter).resolve(statements)
+    return statements
+
+
+def test_numeric_loops_over_locals_are_proven(capsys):
+    interpreter = Interpreter()
+    statements = compile_source(
+        "fun run() {\n"
+        '  var total = 0; var text = "";\n'
+        "  for (var i = 0; i < 4; i = i + 1) {\n"
+        '    total = total + i * 2; text = text + "x";\n'
+        "  }\n"
+        "  return total / -2 + text;\n"
+        "}\n",
+        interpreter,
+    )
+    report = infer_types(statements)
+    # Every site but the last +, whose operands are a number and a string.
+    assert (report.monomorphic, report.sites) == (7, 8)
+    loop = statements[0].body[2]
+    assert loop.condition.operate is operators.less_any
+    assert loop.increment.value.operate is operators.add_unchecked
+    assert statements[0].body[3].value.operate is operators.add
+
+
+def test_unknown_values_stay_checked(capsys, caplog):
+    interpreter = Interpreter()
+    statements = compile_source(
+        # A parameter, a variable a closure captures, one that is not
+        # always a number and a global are not proven.
+        "fun f(a) { print a + 1; a = 1; }\n"
+        "fun g() { var n = 1; fun h() { n = nil; } h(); return n - 1; }\n"
+        "fun k() { var m = 1; m = nil; return m * 2; }\n"
+        "var x = 1; print x * 2;\n"
+        'f("s"); g(); k();\n'
+        "{ var zero = 0; print 1 / zero; }\n",
+        interpreter,
+    )
+    report = infer_types(statements)
+    assert (report.monomorphic, report.sites) == (1, 5)
+    with caplog.at_level(logging.ERROR):
+        interpreter.interpret(statements)
+    errors = [record.getMessage().strip() for record in caplog.records]
+    assert errors == [
+        "[line 1] Operands must be two numbers or two strings.",
+        "[line 2] Operand must be a number.",
+        "[line 3] Operand must be a number.",
+        "[line 6] Division by zero.",
+    ]
+    assert capsys.readouterr().out.splitlines() == ["2"]
+    error.has_runtime_error = False
@@ -0,0 +1,56 @@
+from lox import error
+from lox.interpreter import Interpreter
+from lox.parser import Parser
+from lox.resolver import Resolver
+from lox.scanner import RegexScanner
+
+SOURCE = (
+    "var x = 10;\n"
+    "fun outer() {\n"
+    "  var y = 1;\n"
+    "  fun inner() { return x + y; }\n"
+    "  return inner;\n"
+    "}\n"
+    "class A { init(v) { this.v = v; } get() { return this.v; } }\n"
+    "class B < A { get() { return super.get() * 2; } }\n"
+    "fun unused() { print ; }\n"
+)
+
+
+def run_lazy(source: str, capsys, strict: bool = False):
+    parser = Parser(RegexScanner(source).scan_tokens(), lazy=True, strict=strict)
+    stmts = parser.parse()
+    interp = Interpreter()
+    Resolver(interp).resolve(stmts)
+    interp.interpret(stmts)
+    captured = capsys.readouterr()
+    return stmts, captured.out.strip().splitlines()
+
+
+def test_lazy_bodies_run_closures_and_methods(capsys, monkeypatch):
+    monkeypatch.setattr(error, "has_error", False)
+    source = SOURCE + "print outer()();\nprint B(4).get();\n"
+    stmts, out = run_lazy(source, capsys)
+    assert out == ["11", "8"]
+    # Only the bodies that ran were parsed.
+    assert stmts[1].body is not None
+    assert stmts[4].body is None
+    assert not error.has_error
+
+
+def test_lazy_syntax_error_is_reported_on_first_call(capsys, caplog, monkeypatch):
+    monkeypatch.setattr(error, "has_error", False)
+    monkeypatch.setattr(error, "has_runtime_error", False)
+    _, out = run_lazy(SOURCE + "unused();\n", capsys)
+    assert out == []
+    assert "[line 9] Error at ';': Expect expression." in caplog.text
+    assert "Function body failed to compile." in caplog.text
+    assert error.has_error
+
+
+def test_strict_reports_syntax_errors_up_front(caplog, monkeypatch):
+    monkeypatch.setattr(error, "has_error", False)
+    tokens = RegexScanner(SOURCE).scan_tokens()
+    stmts = Parser(tokens, lazy=True, strict=True).parse()
+    assert "[line 9] Error at ';': Expect expression." in caplog.text
+    assert stmts[1].body is None and stmts[1].lazy_body.statements is not None
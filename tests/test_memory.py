@@ -0,0 +1,15 @@
+from lox.memory import measure_ast
+from lox.parser import Parser
+from lox.scanner import RegexScanner
+
+
+def test_ast_nodes_have_no_instance_dict():
+    source = "class A { m() { return this.x; } }\nfor (var i = 0; i < 2; i = i + 1) print -i;\n"
+    stmts = Parser(RegexScanner(source).scan_tokens()).parse()
+    report = measure_ast(stmts)
+    assert report.node_counts["Class"] == 1
+    assert report.node_counts["Function"] == 1
+    assert report.node_counts["Unary"] == 1
+    assert not hasattr(stmts[0], "__dict__")
+    assert not hasattr(stmts[0].methods[0].body[0].value, "__dict__")
+    assert report.total > 0
@@ -0,0 +1,66 @@
+import logging
+
+from lox import error, operators
+from lox.interpreter import Interpreter
+from lox.parser import Parser
+from lox.resolver import Resolver
+from lox.scanner import RegexScanner
+
+
+def compile_source(source: str, interpreter: Interpreter):
+    statements = Parser(RegexScanner(source).scan_tokens()).parse()
+    Resolver(interpreter).resolve(statements)
+    return statements
+
+
+def test_sites_specialize_to_the_types_they_see(capsys):
+    interpreter = Interpreter()
+    statements = compile_source(
+        'fun f(a, b) { return a + b; } print f(1, 2); print f("a", "b");\n'
+        "var x = 0; while (x < 3) x = x - -1; print x;\n",
+        interpreter,
+    )
+    interpreter.interpret(statements)
+    assert capsys.readouterr().out.splitlines() == ["3", "ab", "3"]
+    plus = statements[0].body[0].value
+    loop = statements[4]
+    assert plus.operate is operators.add_any
+    assert loop.condition.operate is operators.less_floats
+    assert loop.body.expression.value.operate is operators.subtract_floats
+    assert loop.body.expression.value.right.operate is operators.negate_float
+    # The + that deoptimized was counted when it specialized to numbers.
+    assert interpreter.quickening.specializations == 4
+
+
+def test_deoptimized_sites_keep_their_errors(capsys, caplog):
+    interpreter = Interpreter()
+    statements = compile_source(
+        "fun f(a, b) { return a - b; } print f(5, 1); print f(5, nil);\n"
+        "fun g(a, b) { return a / b; } print g(4, 2); print g(1, 0);\n",
+        interpreter,
+    )
+    with caplog.at_level(logging.ERROR):
+        interpreter.interpret(statements)
+    errors = [record.getMessage().strip() for record in caplog.records]
+    assert errors == [
+        "[line 1] Operand must be a number.",
+        "[line 2] Division by zero.",
+    ]
+    assert capsys.readouterr().out.splitlines() == ["4", "2"]
+    assert interpreter.quickening.deopts == 2
+    error.has_runtime_error = False
+
+
+def test_recursive_operands_quicken_their_site_once(capsys):
+    interpreter = Interpreter()
+    statements = compile_source(
+        "fun fib(n) { if (n < 2) return n; return fib(n - 1) + fib(n - 2); }\n"
+        "print fib(10);\n",
+        interpreter,
+    )
+    interpreter.interpret(statements)
+    assert capsys.readouterr().out.splitlines() == ["55"]
+    plus = statements[0].body[1].value
+    assert plus.operate is operators.add_floats
+    # <, the two - and + each specialize once, however deep the recursion.
+    assert interpreter.quickening.specializations == 4
@@ -0,0 +1,31 @@
+from lox import error
+from lox.ast_printer import AstPrinter
+from lox.expr import Assign, Logical
+from lox.parser import Parser
+from lox.scanner import RegexScanner
+
+
+def parse_expression(source: str):
+    statements = Parser(RegexScanner(source + ";").scan_tokens()).parse()
+    return statements[0].expression
+
+
+def test_binary_precedence_and_left_associativity():
+    expr = parse_expression("1 - 2 - 3 * 4 / -5 < 6 == !7")
+    out = AstPrinter().print(expr)
+    assert out == "(== (< (- (- 1.0 2.0) (/ (* 3.0 4.0) (- 5.0))) 6.0) (! 7.0))"
+
+
+def test_logical_binds_looser_than_equality_and_assignment_is_right_assoc():
+    expr = parse_expression("a = b = 1 == 2 or 3 and 4")
+    assert isinstance(expr, Assign) and isinstance(expr.value, Assign)
+    logical = expr.value.value
+    assert isinstance(logical, Logical) and logical.op.lexeme == "or"
+    assert isinstance(logical.right, Logical) and logical.right.op.lexeme == "and"
+
+
+def test_missing_left_hand_operand_is_reported(caplog, monkeypatch):
+    monkeypatch.setattr(error, "has_error", False)
+    Parser(RegexScanner("print * 2 + 3;").scan_tokens()).parse()
+    assert "[line 1] Error at '*': Missing left-hand operand." in caplog.text
+    assert error.has_error
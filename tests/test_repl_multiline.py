@@ -10,7 +10,6 @@ def run_with_interpreter(interpreter: Interpreter, source: str, capsys):
 	tokens = scanner.scan_tokens()
 	parser = Parser(tokens)
 	stmts = parser.parse()
-	interpreter.locals.clear()
 	Resolver(interpreter).resolve(stmts)
 	interpreter.interpret(stmts)
 	captured = capsys.readouterr()
@@ -1,17 +1,19 @@
+import pytest
+
 from lox.interpreter import Interpreter
 from lox.parser import Parser
 from lox.resolver import Resolver
 from lox.scanner import Scanner
 
 
-def run_with_interpreter(interpreter: Interpreter, source: str, capsys):
+def run_with_interpreter(
+    interpreter: Interpreter, source: str, capsys, resolver: Resolver | None = None
+):
     scanner = Scanner(source)
     tokens = scanner.scan_tokens()
     parser = Parser(tokens)
     stmts = parser.parse()
-    # Clear any prior locals resolution info before resolving new AST
-    interpreter.locals.clear()
-    Resolver(interpreter).resolve(stmts)
+    (resolver or Resolver(interpreter)).resolve(stmts)
     interpreter.interpret(stmts)
     captured = capsys.readouterr()
     return captured.out.strip().splitlines()
@@ -23,3 +25,36 @@ def test_vars_persist_across_runs(capsys):
     assert out1 == []  # declaration prints nothing
     out2 = run_with_interpreter(interp, "print a;", capsys)
     assert out2 == ["1"]
+
+
+def test_closures_keep_resolution_across_runs(capsys):
+    interp = Interpreter()
+    source = "fun make() { var n = 0; fun inc() { n = n + 1; return n; } return inc; }"
+    run_with_interpreter(interp, source + " var counter = make();", capsys)
+    run_with_interpreter(interp, "counter();", capsys)
+    assert run_with_interpreter(interp, "print counter();", capsys) == ["2"]
+
+
+def test_one_resolver_serves_the_whole_session(capsys):
+    interp = Interpreter()
+    resolver = Resolver(interp)
+    run_with_interpreter(
+        interp, "fun add(a, b) { return a + b; }", capsys, resolver=resolver
+    )
+    run_with_interpreter(interp, "{ var x = 1; print add(x, 2); }", capsys, resolver)
+    assert run_with_interpreter(interp, "print add(3, 4);", capsys, resolver) == ["7"]
+
+
+def test_resolver_starts_at_top_level_after_a_failed_input(capsys):
+    interp = Interpreter()
+    resolver = Resolver(interp)
+    broken = Parser(Scanner("fun f() { var x = 1; }").scan_tokens()).parse()
+    broken[0].body.append(None)  # fails while inside f's scope
+    with pytest.raises(AttributeError):
+        resolver.resolve(broken)
+
+    stmts = Parser(Scanner("var y = 2;").scan_tokens()).parse()
+    resolver.resolve(stmts)
+    assert stmts[0].slot is None  # a global, not a local of f
+    interp.interpret(stmts)
+    assert run_with_interpreter(interp, "print y;", capsys, resolver) == ["2"]
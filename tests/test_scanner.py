@@ -1,6 +1,9 @@
+import io
+
 import pytest
 
-from lox.scanner import Scanner
+from lox import error
+from lox.scanner import RegexScanner, Scanner, StreamScanner
 from lox.token import TokenType
 
 
@@ -68,3 +71,54 @@ def test_scan_keyword_continue():
     assert toks[0].lexeme == "continue"
     assert types[1] == TokenType.SEMICOLON
     assert types[-1] == TokenType.EOF
+
+
+def test_regex_scanner_matches_scanner():
+    source = (
+        'var s = "multi\nline"; // comment\n'
+        "fun f(a, b) { return a >= b or !(a <= 1.5) and b != nil; }\n"
+        "print f(1, 2) == true;\t_x1 = 3.14 / 2 - -1;\n"
+    )
+    expected = [
+        (t.type, t.lexeme, t.literal, t.line) for t in Scanner(source).scan_tokens()
+    ]
+    actual = [
+        (t.type, t.lexeme, t.literal, t.line)
+        for t in RegexScanner(source).scan_tokens()
+    ]
+    assert actual == expected
+
+
+def test_regex_scanner_reports_errors(caplog, monkeypatch):
+    monkeypatch.setattr(error, "has_error", False)
+    toks = RegexScanner('@ "open\n').scan_tokens()
+    assert [t.type for t in toks] == [TokenType.EOF]
+    assert toks[-1].line == 2
+    assert "[line 1] Error : Unexpected character." in caplog.text
+    assert "[line 2] Error : Unterminated string." in caplog.text
+
+
+@pytest.mark.parametrize("chunk_size", [1, 2, 3, 7, 64])
+def test_stream_scanner_handles_chunk_boundaries(chunk_size):
+    source = (
+        'var long_name = "a string\nacross lines";\n'
+        "// a comment that is longer than a chunk\n"
+        "print 12.5 >= 3 != false; x.y <= 1.0;\n"
+    )
+    expected = [
+        (t.type, t.lexeme, t.literal, t.line)
+        for t in RegexScanner(source).scan_tokens()
+    ]
+    stream = StreamScanner(io.StringIO(source), chunk_size=chunk_size)
+    actual = [(t.type, t.lexeme, t.literal, t.line) for t in stream]
+    assert actual == expected
+
+
+def test_tokens_are_compact_and_interned():
+    source = 'var name = "text"; print name + 1.50;'
+    toks = RegexScanner(source).scan_tokens()
+    assert not hasattr(toks[0], "__dict__")
+    assert toks[1].lexeme is toks[6].lexeme  # interned identifiers
+    assert toks[3].lexeme == '"text"'
+    assert toks[8].lexeme == "1.50"
+    assert toks[8].offset == source.index("1.50")
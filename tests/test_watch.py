@@ -0,0 +1,51 @@
+from lox import error
+from lox.interpreter import Interpreter
+from lox.watch import IncrementalCompiler, split_declarations
+
+SOURCE = (
+    "// helpers\n"
+    "fun add(a, b) { return a + b; }\n"
+    "class Box { init(v) { this.v = v; } }\n"
+    "if (true) { print add(1, 2); } else print 0;\n"
+    'var s = "};";\n'
+    "for (var i = 0; i < 2; i = i + 1) print Box(i).v;\n"
+)
+
+
+def run(statements, capsys):
+    Interpreter().interpret(statements)
+    return capsys.readouterr().out.splitlines()
+
+
+def test_split_declarations():
+    chunks = list(split_declarations("\n" + SOURCE + "  \n"))
+    assert [line for line, _ in chunks] == [2, 4, 5, 6, 7]
+    assert chunks[0][1].startswith("// helpers\nfun add")
+    assert chunks[2][1].endswith("else print 0;")
+    assert chunks[3][1] == 'var s = "};";'
+
+
+def test_unchanged_declarations_are_reused(capsys):
+    compiler = IncrementalCompiler()
+    statements = compiler.compile(SOURCE)
+    function = statements[0]
+    assert run(statements, capsys) == ["3", "0", "1"]
+    assert compiler.report.compiled == 5
+
+    edited = SOURCE.replace("add(1, 2)", "add(3, 4)")
+    statements = compiler.compile("\n\n" + edited)
+    assert run(statements, capsys) == ["7", "0", "1"]
+    assert (compiler.report.compiled, compiler.report.reused) == (1, 4)
+    assert statements[0] is function
+    # The reused declaration moved down two lines, and so did its tokens.
+    assert function.name.line == 4
+
+
+def test_compile_error_recovers(capsys):
+    compiler = IncrementalCompiler()
+    assert compiler.compile(SOURCE.replace("print 0;", "print ;")) is None
+    assert error.has_error
+    error.has_error = False
+
+    assert run(compiler.compile(SOURCE), capsys) == ["3", "0", "1"]
+    assert (compiler.report.compiled, compiler.report.reused) == (1, 4)